@@ -25,6 +25,8 @@ python manage.py collectstatic --noinput
 if [ $# -gt 0 ]; then
     exec "$@"
 else
+    # Workers must share one cache (core.E001 in apps/core/checks.py)
+    python manage.py check --deploy --fail-level ERROR
     echo "Starting Gunicorn..."
     # 120s timeout to handle slow initial requests/migrations if they overlap
     exec gunicorn saudapakka.wsgi:application --bind 0.0.0.0:8000 --workers 3 --timeout 120
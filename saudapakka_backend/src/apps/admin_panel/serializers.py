@@ -54,7 +54,10 @@ class AdminUserDetailSerializer(UserSerializer):
                 "total_price": p.total_price,
                 "verification_status": p.verification_status,
                 "created_at": p.created_at,
-                "views_count": p.views_count
+                "views_count": p.views_count,
+                "saves_count": p.saves_count,
+                "contact_reveals_count": p.contact_reveals_count,
+                "inquiries_count": p.inquiries_count
             }
             for p in props
         ]
@@ -68,10 +71,16 @@ class APIKeySerializer(serializers.ModelSerializer):
     user_email = serializers.EmailField(source='user.email', read_only=True)
     user_name = serializers.CharField(source='user.full_name', read_only=True)
     key = serializers.SerializerMethodField()
+    # Annotated by AdminAPIKeyList from APIKeyUsage (flushed every few minutes)
+    requests_today = serializers.IntegerField(read_only=True, default=0)
+    requests_last_30_days = serializers.IntegerField(read_only=True, default=0)
+    throttled_last_30_days = serializers.IntegerField(read_only=True, default=0)
 
     class Meta:
         model = ExternalAPIKey
-        fields = ['id', 'user_id', 'user_email', 'user_name', 'name', 'key', 'is_active', 'created_at']
+        fields = ['id', 'user_id', 'user_email', 'user_name', 'name', 'key', 'is_active', 'created_at',
+                  'rate_limit_per_minute', 'burst', 'daily_quota',
+                  'requests_today', 'requests_last_30_days', 'throttled_last_30_days']
         read_only_fields = ['id', 'is_active', 'created_at']
 
     def get_key(self, obj):
@@ -1,13 +1,14 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework import status, permissions, generics
+from rest_framework import status, permissions, generics, filters
 from django.contrib.auth import get_user_model
 from django.db.models import Count, Q
 from django.utils import timezone
 from datetime import timedelta
 from apps.properties.models import Property
 from apps.mandates.models import Mandate
-from django.db.models import Count, Avg, Q
+from django.db.models import Count, Avg, Q, Sum
+from django.db.models.functions import Coalesce
 
 # Import models from other apps
 from apps.properties.models import Property
@@ -87,6 +88,9 @@ class AdminPropertyList(generics.ListAPIView):
     # For now, we assume PropertySerializer exists.
     from apps.properties.serializers import AdminPropertySerializer 
     serializer_class = AdminPropertySerializer
+    # ?ordering=-saves_count etc.; the counters are plain columns, no joins
+    filter_backends = [filters.OrderingFilter]
+    ordering_fields = ['created_at', 'total_price', 'views_count', 'saves_count', 'contact_reveals_count', 'inquiries_count']
 
     def get_queryset(self):
         status_param = self.request.query_params.get('status', 'PENDING')
@@ -283,7 +287,13 @@ class AdminAPIKeyList(generics.ListCreateAPIView):
     
     def get_queryset(self):
         from apps.users.models import ExternalAPIKey
-        return ExternalAPIKey.objects.all().select_related('user').order_by('-created_at')
+        today = timezone.localdate()
+        recent = Q(usage__day__gt=today - timedelta(days=30))
+        return ExternalAPIKey.objects.all().select_related('user').annotate(
+            requests_today=Coalesce(Sum('usage__requests', filter=Q(usage__day=today)), 0),
+            requests_last_30_days=Coalesce(Sum('usage__requests', filter=recent), 0),
+            throttled_last_30_days=Coalesce(Sum('usage__throttled', filter=recent), 0),
+        ).order_by('-created_at')
     
     def get_serializer_class(self):
         from .serializers import APIKeySerializer
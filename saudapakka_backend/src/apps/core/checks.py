@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+# Backends whose entries are private to one process
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def cache_is_shared():
+    """True if every worker process sees the same default cache."""
+    return settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHES
+
+
+@register(deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Reveal quotas, API key rate limits, the Sandbox circuit breaker and
+    latency stats, and the KYC polling slots count across all gunicorn workers: with a per-process
+    cache each worker keeps its own copy. A deploy check, run by the
+    entrypoint before gunicorn starts; runserver and tests are one process.
+    """
+    if cache_is_shared():
+        return []
+    return [Error(
+        'The default cache is local to each process, but the app needs a cache shared by all workers.',
+        hint='Set CACHE_URL, e.g. rediscache://redis:6379/1.',
+        id='core.E001',
+    )]
@@ -0,0 +1,100 @@
+from django.core.files.base import File
+from django.db.models.fields.files import FieldFile
+
+# Marker for a file that has been assigned but not written to storage yet.
+# It never compares equal to a loaded value, so the field is always dirty.
+_UNSAVED_FILE = object()
+
+
+def _field_state(value):
+    """Normalizes a raw attribute value into something comparable."""
+    if isinstance(value, FieldFile):
+        return value.name if value._committed else _UNSAVED_FILE
+    if isinstance(value, File):
+        return _UNSAVED_FILE
+    return value
+
+
+class DirtyFieldsMixin:
+    """
+    Remembers the column values an instance was loaded with so that
+    save() only writes the columns that actually changed.
+
+    - Instances loaded from the DB get a snapshot of their concrete fields.
+    - save() without explicit update_fields is narrowed to the dirty fields
+      (a no-op save issues no query at all).
+    - Subclasses can call has_changed() to skip derived-field work.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_loaded_values()
+        return instance
+
+    def _tracked_fields(self):
+        # Generated columns are computed by the database and never written
+        return [f for f in self._meta.concrete_fields if not f.primary_key and not f.generated]
+
+    def _snapshot_loaded_values(self, attnames=None):
+        loaded = self.__dict__.setdefault('_loaded_values', {})
+        for field in self._tracked_fields():
+            if attnames is not None and field.attname not in attnames:
+                continue
+            if field.attname in self.__dict__:
+                loaded[field.attname] = _field_state(self.__dict__[field.attname])
+
+    def get_dirty_fields(self):
+        """Returns the names of fields that differ from the loaded snapshot."""
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return [f.name for f in self._tracked_fields()]
+
+        dirty = []
+        for field in self._tracked_fields():
+            if field.attname not in self.__dict__:
+                # Deferred and never touched
+                continue
+            current = _field_state(self.__dict__[field.attname])
+            if field.attname not in loaded or loaded[field.attname] != current:
+                dirty.append(field.name)
+        return dirty
+
+    def has_changed(self, *field_names):
+        """True if the instance is new or any of the given fields is dirty."""
+        if self._state.adding:
+            return True
+        dirty = set(self.get_dirty_fields())
+        return any(name in dirty for name in field_names)
+
+    def save(self, *args, **kwargs):
+        narrow = (
+            not args
+            and not self._state.adding
+            and getattr(self, '_loaded_values', None) is not None
+            and kwargs.get('update_fields') is None
+            and not kwargs.get('force_insert')
+        )
+        if narrow:
+            update_fields = self.get_dirty_fields()
+            if update_fields:
+                # auto_now columns are refreshed by pre_save, so they ride along
+                update_fields += [
+                    f.name for f in self._tracked_fields()
+                    if getattr(f, 'auto_now', False) and f.name not in update_fields
+                ]
+            kwargs['update_fields'] = update_fields
+
+        updating = not self._state.adding and kwargs.get('update_fields') != []
+        super().save(*args, **kwargs)
+        if updating:
+            # The database may have recomputed generated columns: drop the
+            # stale values so they are reloaded (deferred) on next access
+            for field in self._meta.concrete_fields:
+                if field.generated:
+                    self.__dict__.pop(field.attname, None)
+        self._snapshot_loaded_values()
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        self._snapshot_loaded_values(set(fields) if fields is not None else None)
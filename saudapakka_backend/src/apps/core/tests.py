@@ -0,0 +1,144 @@
+from django.db import connection
+from django.db.models.signals import post_save
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from apps.mandates.models import Mandate
+from apps.properties.models import Property
+from apps.users.models import User
+from .checks import check_shared_cache
+
+
+def make_user(n, **kwargs):
+    return User.objects.create(
+        email=f'user{n}@example.com', username=f'user{n}', first_name=f'User{n}', last_name='Test',
+        phone_number=f'90000000{n:02d}', **kwargs,
+    )
+
+
+def make_property(owner, **kwargs):
+    values = dict(
+        owner=owner, title='2 BHK in Kothrud', property_type='FLAT', total_price=5000000,
+        address_line='Lane 4', locality='Kothrud', city='Pune', pincode='411038',
+    )
+    values.update(kwargs)
+    return Property.objects.create(**values)
+
+
+class DirtyFieldsMixinTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user(1)
+        cls.property_id = make_property(cls.owner).pk
+
+    def setUp(self):
+        self.post_saves = []
+        post_save.connect(self._record_post_save, sender=Property)
+        self.addCleanup(post_save.disconnect, self._record_post_save, sender=Property)
+
+    def _record_post_save(self, sender, instance, update_fields, **kwargs):
+        self.post_saves.append(update_fields)
+
+    def _updates(self, context):
+        return [q['sql'] for q in context.captured_queries if q['sql'].startswith('UPDATE')]
+
+    def test_unchanged_instance_saves_without_a_query(self):
+        prop = Property.objects.get(pk=self.property_id)
+        with CaptureQueriesContext(connection) as context:
+            prop.save()
+        self.assertEqual(context.captured_queries, [])
+        # Django skips the signals of an update_fields=[] save
+        self.assertEqual(self.post_saves, [])
+
+    def test_save_writes_only_changed_columns(self):
+        prop = Property.objects.get(pk=self.property_id)
+        prop.title = '3 BHK in Kothrud'
+        with CaptureQueriesContext(connection) as context:
+            prop.save()
+        [update] = self._updates(context)
+        self.assertIn('"title"', update)
+        self.assertNotIn('"total_price"', update)
+        self.assertNotIn('"description"', update)
+        self.assertEqual(self.post_saves, [frozenset({'title'})])
+        self.assertEqual(Property.objects.get(pk=self.property_id).title, '3 BHK in Kothrud')
+
+    def test_snapshot_follows_saves_and_refreshes(self):
+        prop = Property.objects.get(pk=self.property_id)
+        prop.title = 'Renamed'
+        prop.save()
+        self.assertEqual(prop.get_dirty_fields(), [])
+
+        Property.objects.filter(pk=self.property_id).update(title='Changed elsewhere')
+        prop.refresh_from_db(fields=['title'])
+        self.assertEqual(prop.get_dirty_fields(), [])
+        self.assertEqual(prop.title, 'Changed elsewhere')
+
+    def test_explicit_update_fields_are_respected(self):
+        prop = Property.objects.get(pk=self.property_id)
+        prop.title = 'Not written'
+        prop.description = 'Written'
+        prop.save(update_fields=['description'])
+        stored = Property.objects.values('title', 'description').get(pk=self.property_id)
+        self.assertEqual(stored, {'title': '2 BHK in Kothrud', 'description': 'Written'})
+
+    def test_deferred_fields_are_not_written(self):
+        prop = Property.objects.only('id', 'title').get(pk=self.property_id)
+        prop.title = 'Only title loaded'
+        with CaptureQueriesContext(connection) as context:
+            prop.save()
+        [update] = self._updates(context)
+        self.assertNotIn('"locality"', update)
+        self.assertEqual(Property.objects.get(pk=self.property_id).locality, 'Kothrud')
+
+    def test_new_instance_is_fully_dirty(self):
+        prop = Property(owner=self.owner, title='New')
+        self.assertTrue(prop.has_changed('owner'))
+        self.assertIn('title', prop.get_dirty_fields())
+
+    def test_whatsapp_number_is_derived_only_when_owner_changes(self):
+        prop = Property.objects.get(pk=self.property_id)
+        self.assertEqual(prop.whatsapp_number, self.owner.phone_number)
+
+        other = make_user(2)
+        Property.objects.filter(pk=self.property_id).update(whatsapp_number=None)
+        prop = Property.objects.get(pk=self.property_id)
+        prop.title = 'Title change only'
+        with self.assertNumQueries(1):
+            prop.save()
+        self.assertIsNone(prop.whatsapp_number)
+
+        prop.owner = other
+        prop.save()
+        self.assertEqual(Property.objects.get(pk=self.property_id).whatsapp_number, other.phone_number)
+
+
+class MandateSaveTests(TestCase):
+    def test_status_change_keeps_number_and_writes_only_status_columns(self):
+        seller = make_user(1)
+        mandate = Mandate.objects.create(
+            property_item=make_property(seller), seller=seller, deal_type='WITH_PLATFORM', initiated_by='SELLER',
+        )
+        mandate = Mandate.objects.get(pk=mandate.pk)
+        number = mandate.mandate_number
+        mandate.status = 'REJECTED'
+        with CaptureQueriesContext(connection) as context:
+            mandate.save()
+        [update] = [q['sql'] for q in context.captured_queries]
+        self.assertIn('"status"', update)
+        self.assertNotIn('"mandate_number"', update)
+        self.assertNotIn('"seller_id"', update)
+        self.assertEqual(Mandate.objects.get(pk=mandate.pk).mandate_number, number)
+
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+REDIS = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://redis:6379/1'}}
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    @override_settings(CACHES=LOCMEM)
+    def test_process_local_cache_is_rejected(self):
+        self.assertEqual([e.id for e in check_shared_cache(None)], ['core.E001'])
+
+    @override_settings(CACHES=REDIS)
+    def test_shared_cache_is_accepted(self):
+        self.assertEqual(check_shared_cache(None), [])
@@ -0,0 +1,20 @@
+# Generated by Django 5.0.2 on 2026-10-19 05:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mandates', '0005_mandate_mandate_number'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MandateNumberCounter',
+            fields=[
+                ('day', models.DateField(primary_key=True, serialize=False)),
+                ('last_value', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.0.2 on 2026-10-19 05:06
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Case, Count, IntegerField, Value, When
+
+
+def close_duplicate_open_mandates(apps, schema_editor):
+    # The constraint can't be added while a property has several open
+    # mandates: keep the newest ACTIVE one (else the newest PENDING one) and
+    # close the rest - ACTIVE as terminated, PENDING as expired
+    Mandate = apps.get_model('mandates', 'Mandate')
+    open_mandates = Mandate.objects.filter(status__in=['PENDING', 'ACTIVE'])
+    duplicated = (
+        open_mandates.order_by().values('property_item')
+        .annotate(total=Count('pk')).filter(total__gt=1).values_list('property_item', flat=True)
+    )
+    superseded = []
+    for property_id in duplicated:
+        ids = open_mandates.filter(property_item_id=property_id).order_by(
+            Case(When(status='ACTIVE', then=Value(0)), default=Value(1), output_field=IntegerField()),
+            '-created_at',
+        ).values_list('pk', flat=True)
+        superseded.extend(ids[1:])
+    Mandate.objects.filter(pk__in=superseded, status='ACTIVE').update(status='TERMINATED')
+    Mandate.objects.filter(pk__in=superseded, status='PENDING').update(status='EXPIRED')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mandates', '0006_mandatenumbercounter'),
+        ('properties', '0018_property_views_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(close_duplicate_open_mandates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='mandate',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['PENDING', 'ACTIVE'])), fields=('property_item',), name='unique_open_mandate_per_property'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.2 on 2026-10-19 06:49
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mandates', '0007_mandate_unique_open_mandate_per_property'),
+        ('properties', '0028_comparablerefresh'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='mandate',
+            name='unique_open_mandate_per_property',
+        ),
+        migrations.AddConstraint(
+            model_name='mandate',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'ACTIVE'), models.Q(('renewed_from__isnull', True), ('status', 'PENDING')), _connector='OR'), fields=('property_item',), name='unique_open_mandate_per_property'),
+        ),
+        migrations.AddConstraint(
+            model_name='mandate',
+            constraint=models.UniqueConstraint(condition=models.Q(('renewed_from__isnull', False), ('status', 'PENDING')), fields=('property_item',), name='unique_pending_renewal_per_property'),
+        ),
+    ]
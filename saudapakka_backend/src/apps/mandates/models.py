@@ -1,13 +1,47 @@
 import uuid
 from datetime import timedelta
-from django.db import models
+from django.db import models, connection
 from django.utils import timezone
 from django.conf import settings
+from apps.core.mixins import DirtyFieldsMixin
 
 def get_acceptance_expiry():
     return timezone.now() + timedelta(days=7)
 
-class Mandate(models.Model):
+class MandateNumberCounter(models.Model):
+    """
+    Per-day counter backing mandate numbers.
+    Format: SP + YYMMDD + 5-digit sequence (e.g. SP26011400007).
+    """
+    day = models.DateField(primary_key=True)
+    last_value = models.PositiveIntegerField(default=0)
+
+    @classmethod
+    def allocate(cls, day=None):
+        """
+        Atomically reserves the next number for `day` (default: today).
+        The upsert takes a row lock, so concurrent callers are serialized
+        by Postgres and never see the same value - no retry loop needed.
+        """
+        day = day or timezone.now().date()
+        table = cls._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {table} (day, last_value) VALUES (%s, 1)
+                ON CONFLICT (day) DO UPDATE SET last_value = {table}.last_value + 1
+                RETURNING last_value
+                """,
+                [day],
+            )
+            value = cursor.fetchone()[0]
+        # Date-first numbers keep new keys at the right edge of the unique index
+        return f"SP{day.strftime('%y%m%d')}{value:05d}"
+
+    def __str__(self):
+        return f"{self.day}: {self.last_value}"
+
+class Mandate(DirtyFieldsMixin, models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     
     # RENAMED from 'property' to 'property_item' to avoid conflict with @property decorator
@@ -57,6 +91,26 @@ class Mandate(models.Model):
     is_near_expiry_notified = models.BooleanField(default=False)
     
     mandate_number = models.CharField(max_length=20, blank=True, null=True, unique=True)
+
+    # A property may only have one open (PENDING/ACTIVE) mandate. A pending
+    # renewal is counted separately: it waits beside the mandate it renews,
+    # which stays ACTIVE until the renewal is accepted
+    OPEN_MANDATE_CONSTRAINT = 'unique_open_mandate_per_property'
+    PENDING_RENEWAL_CONSTRAINT = 'unique_pending_renewal_per_property'
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['property_item'],
+                condition=models.Q(status='ACTIVE') | models.Q(status='PENDING', renewed_from__isnull=True),
+                name='unique_open_mandate_per_property',
+            ),
+            models.UniqueConstraint(
+                fields=['property_item'],
+                condition=models.Q(status='PENDING', renewed_from__isnull=False),
+                name='unique_pending_renewal_per_property',
+            ),
+        ]
     
     @property
     def is_expired(self):
@@ -71,33 +125,6 @@ class Mandate(models.Model):
             return max(0, delta.days)
         return 0
 
-    def generate_mandate_number(self):
-        # Format: DDMMYY(Init2)x(Accept2)
-        # Example: 140126QAxSB
-        
-        # 1. Date (Created At or Now)
-        date_str = (self.created_at or timezone.now()).strftime('%d%m%y')
-        
-        # 2. Initiator
-        initiator_name = "XX"
-        acceptor_name = "XX"
-        
-        if self.initiated_by == 'SELLER' and self.seller:
-            initiator_name = (self.seller.first_name or self.seller.email or "SE")[:2].upper()
-            if self.broker:
-                acceptor_name = (self.broker.first_name or self.broker.email or "BR")[:2].upper()
-            else:
-                acceptor_name = "PE" # Pending
-                
-        elif self.initiated_by == 'BROKER' and self.broker:
-            initiator_name = (self.broker.first_name or self.broker.email or "BR")[:2].upper()
-            if self.seller:
-                acceptor_name = (self.seller.first_name or self.seller.email or "SE")[:2].upper()
-            else:
-                acceptor_name = "PE"
-        
-        return f"{date_str}{initiator_name}x{acceptor_name}"
-
     def save(self, *args, **kwargs):
         if self.status == 'ACTIVE' and not self.signed_at:
             self.signed_at = timezone.now()
@@ -107,13 +134,11 @@ class Mandate(models.Model):
         if self.status == 'ACTIVE' and self.start_date and not self.end_date:
             self.end_date = self.start_date + timedelta(days=90)
             
-        # Generate Mandate Number
-        new_number = self.generate_mandate_number()
-        # Only update if it changed or if it's new, but careful about uniqueness?
-        # The user wants it to reflect the names, so it SHOULD update if names/acceptor change.
-        # But ID usually shouldn't change. However, for "Pending" -> "Accepted", it makes sense to update "PE" to "SB".
-        self.mandate_number = new_number
-            
+        # Assign Mandate Number once; it never changes afterwards
+        if not self.mandate_number:
+            self.mandate_number = MandateNumberCounter.allocate()
+
+        # Only the modified columns are written (see DirtyFieldsMixin)
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from .models import Mandate
-from apps.properties.serializers import PropertySerializer
+from apps.properties.serializers import PropertySerializer, PropertySummarySerializer
 
 class MandateSerializer(serializers.ModelSerializer):
     # 1. Expand property details using the renamed source 'property_item'
@@ -72,4 +72,12 @@ class MandateSerializer(serializers.ModelSerializer):
             elif cat == 'BUILDER':
                 return "Builder"
             return "Property Owner" # Default for Seller/Buyer
-        return "Unknown"
\ No newline at end of file
+        return "Unknown"
+
+class MandateListSerializer(MandateSerializer):
+    """
+    List variant: same mandate fields, but property_details is a compact
+    summary + thumbnail instead of the full PropertySerializer (which runs
+    its own mandate/saved/image queries per row). Detail views keep the full nesting.
+    """
+    property_details = PropertySummarySerializer(source='property_item', read_only=True)
@@ -0,0 +1,213 @@
+import threading
+from datetime import date, timedelta
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+
+from apps.core.tests import make_property, make_user
+from apps.uploads.tests import JPEG, MediaRootMixin
+from .models import Mandate, MandateNumberCounter
+from .views import save_open_mandate
+
+
+def make_mandate(prop, seller, **kwargs):
+    values = dict(property_item=prop, seller=seller, deal_type='WITH_PLATFORM', initiated_by='SELLER')
+    values.update(kwargs)
+    return Mandate.objects.create(**values)
+
+
+class MandateNumberCounterTests(TransactionTestCase):
+    def test_sequence_is_per_day(self):
+        self.assertEqual(MandateNumberCounter.allocate(date(2026, 1, 14)), 'SP26011400001')
+        self.assertEqual(MandateNumberCounter.allocate(date(2026, 1, 14)), 'SP26011400002')
+        self.assertEqual(MandateNumberCounter.allocate(date(2026, 1, 15)), 'SP26011500001')
+
+    def test_concurrent_allocations_are_unique_and_contiguous(self):
+        threads, per_thread, day = 8, 25, date(2026, 1, 14)
+        numbers, errors = [], []
+        barrier = threading.Barrier(threads)
+
+        def allocate():
+            try:
+                barrier.wait()
+                for _ in range(per_thread):
+                    numbers.append(MandateNumberCounter.allocate(day))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=allocate) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(errors, [])
+        total = threads * per_thread
+        self.assertEqual(sorted(numbers), [f'SP260114{n:05d}' for n in range(1, total + 1)])
+        self.assertEqual(MandateNumberCounter.objects.get(day=day).last_value, total)
+
+
+class OpenMandateConstraintTests(TransactionTestCase):
+    def test_concurrent_creates_leave_one_open_mandate(self):
+        seller = make_user(1)
+        prop = make_property(seller)
+        threads = 10
+        created, rejected, errors = [], [], []
+        barrier = threading.Barrier(threads)
+
+        def create():
+            try:
+                barrier.wait()
+                created.append(save_open_mandate(lambda: make_mandate(prop, seller)))
+            except ValidationError:
+                rejected.append(True)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=create) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual((len(created), len(rejected)), (1, threads - 1))
+        self.assertEqual(Mandate.objects.filter(property_item=prop, status__in=['PENDING', 'ACTIVE']).count(), 1)
+
+
+class RenewMandateTests(MediaRootMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = make_user(1)
+        cls.property = make_property(cls.seller)
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller)
+
+    def renew(self, mandate):
+        return self.client.post(f'/api/mandates/{mandate.pk}/renew_mandate/')
+
+    def accept(self, mandate):
+        return self.client.post(f'/api/mandates/{mandate.pk}/accept_and_sign/', {
+            'signature': SimpleUploadedFile('sign.jpg', JPEG, 'image/jpeg'),
+            'selfie': SimpleUploadedFile('selfie.jpg', JPEG, 'image/jpeg'),
+        }, format='multipart')
+
+    def active_mandate(self, days_left):
+        today = timezone.now().date()
+        return make_mandate(
+            self.property, self.seller, status='ACTIVE',
+            start_date=today - timedelta(days=90 - days_left), end_date=today + timedelta(days=days_left),
+        )
+
+    def test_near_expiry_mandate_is_superseded_once_its_renewal_is_accepted(self):
+        old = self.active_mandate(days_left=3)
+        response = self.renew(old)
+        self.assertEqual(response.status_code, 201, response.data)
+        old.refresh_from_db()
+        self.assertEqual(old.status, 'ACTIVE')
+        renewal = Mandate.objects.get(renewed_from=old)
+        self.assertEqual(renewal.status, 'PENDING')
+
+        self.assertEqual(self.accept(renewal).status_code, 200)
+        old.refresh_from_db()
+        renewal.refresh_from_db()
+        self.assertEqual((old.status, renewal.status), ('EXPIRED', 'ACTIVE'))
+
+    def test_rejected_renewal_leaves_the_mandate_active(self):
+        old = self.active_mandate(days_left=3)
+        renewal = Mandate.objects.get(pk=self.renew(old).data['id'])
+        self.assertEqual(self.client.post(f'/api/mandates/{renewal.pk}/reject/').status_code, 200)
+        old.refresh_from_db()
+        self.assertEqual(old.status, 'ACTIVE')
+
+    def test_one_pending_renewal_per_mandate(self):
+        old = self.active_mandate(days_left=3)
+        self.assertEqual(self.renew(old).status_code, 201)
+        self.assertEqual(self.renew(old).status_code, 400)
+        self.assertEqual(Mandate.objects.filter(renewed_from=old).count(), 1)
+
+    def test_active_mandate_without_an_end_date_is_not_renewable(self):
+        old = self.active_mandate(days_left=60)
+        Mandate.objects.filter(pk=old.pk).update(end_date=None)
+        self.assertEqual(self.renew(old).status_code, 400)
+        old.refresh_from_db()
+        self.assertEqual(old.status, 'ACTIVE')
+
+    def test_expired_mandate_can_be_renewed(self):
+        old = make_mandate(self.property, self.seller, status='EXPIRED')
+        self.assertEqual(self.renew(old).status_code, 201)
+
+    def test_active_mandate_outside_the_window_is_kept(self):
+        old = self.active_mandate(days_left=60)
+        response = self.renew(old)
+        self.assertEqual(response.status_code, 400)
+        old.refresh_from_db()
+        self.assertEqual(old.status, 'ACTIVE')
+        self.assertFalse(Mandate.objects.filter(renewed_from=old).exists())
+
+    def test_renewal_is_rejected_while_another_mandate_is_pending(self):
+        old = make_mandate(self.property, self.seller, status='EXPIRED')
+        make_mandate(self.property, self.seller)
+        self.assertEqual(self.renew(old).status_code, 400)
+
+
+class MandateListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = make_user(1)
+        cls.broker = make_user(2, is_active_broker=True)
+        cls.outsider = make_user(3)
+        cls.staff = make_user(4, is_staff=True)
+        cls.sold = make_mandate(make_property(cls.seller), cls.seller)
+        cls.brokered = make_mandate(
+            make_property(cls.outsider), cls.outsider, broker=cls.broker, deal_type='WITH_BROKER', initiated_by='BROKER',
+        )
+        # The seller is also broker on their own listing: must be listed once
+        cls.both = make_mandate(make_property(cls.seller), cls.seller, broker=cls.seller, deal_type='WITH_BROKER')
+
+    def list_ids(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get('/api/mandates/')
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data]
+
+    def test_users_see_the_mandates_they_are_party_to(self):
+        self.assertCountEqual(self.list_ids(self.seller), [str(self.sold.pk), str(self.both.pk)])
+        self.assertCountEqual(self.list_ids(self.broker), [str(self.brokered.pk)])
+        self.assertCountEqual(self.list_ids(self.outsider), [str(self.brokered.pk)])
+        self.assertCountEqual(self.list_ids(self.staff), [str(m.pk) for m in (self.sold, self.brokered, self.both)])
+
+    def test_union_filter_hides_other_mandates_from_detail(self):
+        client = APIClient()
+        client.force_authenticate(self.broker)
+        self.assertEqual(client.get(f'/api/mandates/{self.sold.pk}/').status_code, 404)
+
+    def test_list_query_count_does_not_grow_with_rows(self):
+        client = APIClient()
+        client.force_authenticate(self.seller)
+        with CaptureQueriesContext(connection) as context:
+            client.get('/api/mandates/')
+        baseline = len(context.captured_queries)
+        for _ in range(5):
+            make_mandate(make_property(self.seller), self.seller, status='EXPIRED')
+        with self.assertNumQueries(baseline):
+            response = client.get('/api/mandates/')
+        self.assertEqual(len(response.data), 7)
+        self.assertEqual(
+            set(response.data[0]['property_details']),
+            {'id', 'title', 'property_type', 'property_type_display', 'listing_type', 'city', 'locality',
+             'total_price', 'verification_status', 'thumbnail'},
+        )
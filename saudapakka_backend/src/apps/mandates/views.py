@@ -1,14 +1,32 @@
 from rest_framework import viewsets, permissions, status, filters, exceptions
-from django.db.models import Q
+from django.db import IntegrityError, transaction
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.utils import timezone
 from .models import Mandate
-from .serializers import MandateSerializer
+from .serializers import MandateSerializer, MandateListSerializer
 from rest_framework.exceptions import ValidationError
 from apps.notifications.models import Notification
 from apps.users.models import User
 
+OPEN_MANDATE_ERROR = "This property already has an active or pending mandate."
+
+# Matches the near-expiry warning sent by check_mandates
+RENEWAL_WINDOW_DAYS = 7
+
+def save_open_mandate(save):
+    """
+    Runs `save` in a savepoint and turns a violation of the one-open-mandate
+    constraints into a clean 400 instead of a 500.
+    """
+    try:
+        with transaction.atomic():
+            return save()
+    except IntegrityError as e:
+        if Mandate.OPEN_MANDATE_CONSTRAINT in str(e) or Mandate.PENDING_RENEWAL_CONSTRAINT in str(e):
+            raise ValidationError(OPEN_MANDATE_ERROR)
+        raise
+
 class MandateViewSet(viewsets.ModelViewSet):
     serializer_class = MandateSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -19,12 +37,25 @@ class MandateViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
+        queryset = Mandate.objects.select_related('property_item', 'seller', 'broker')
+        if self.action == 'list':
+            # Only the thumbnail is needed for the list summary
+            queryset = queryset.prefetch_related('property_item__images')
+
         if user.is_staff:
-            return Mandate.objects.all()
+            return queryset
             
-        return Mandate.objects.filter(
-            Q(seller=user) | Q(broker=user)
-        ).distinct()
+        # UNION of the seller and broker branches (each can use its FK index)
+        # instead of an OR filter + DISTINCT over the whole row
+        own_ids = Mandate.objects.filter(seller=user).values('pk').union(
+            Mandate.objects.filter(broker=user).values('pk')
+        )
+        return queryset.filter(pk__in=own_ids)
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return MandateListSerializer
+        return MandateSerializer
 
     def notify_user(self, recipient, title, message, action_url=None):
         if recipient:
@@ -75,10 +106,8 @@ class MandateViewSet(viewsets.ModelViewSet):
         if initiated_by == 'BROKER' and not user.is_active_broker:
              raise ValidationError("You must be an active broker to initiate as BROKER.")
              
-        # Check for existing processing/active mandates for this property
-        property_obj = serializer.validated_data.get('property_item')
-        if Mandate.objects.filter(property_item=property_obj, status__in=['PENDING', 'ACTIVE']).exists():
-             raise ValidationError("This property already has an active or pending mandate.")
+        # One open (pending/active) mandate per property is enforced by the
+        # unique_open_mandate_per_property constraint; see save_open_mandate.
         
         mandate = None
         recipient = None
@@ -98,13 +127,13 @@ class MandateViewSet(viewsets.ModelViewSet):
             if not sys_broker_sig: raise ValidationError("Broker signature is mandatory.")
             if not sys_broker_selfie: raise ValidationError("Broker verification selfie is mandatory.")
             
-            mandate = serializer.save(
+            mandate = save_open_mandate(lambda: serializer.save(
                 broker=user, 
                 initiated_by='BROKER', 
                 seller=seller,
                 broker_signature=sys_broker_sig,
                 broker_selfie=sys_broker_selfie
-            )
+            ))
             recipient = mandate.seller
 
         elif initiated_by == 'SELLER':
@@ -118,13 +147,13 @@ class MandateViewSet(viewsets.ModelViewSet):
             if not sys_seller_selfie: raise ValidationError("Seller verification selfie is mandatory.")
 
             if deal_type == 'WITH_PLATFORM':
-                 mandate = serializer.save(
+                 mandate = save_open_mandate(lambda: serializer.save(
                      seller=user, 
                      initiated_by='SELLER', 
                      deal_type='WITH_PLATFORM',
                      seller_signature=sys_seller_sig,
                      seller_selfie=sys_seller_selfie
-                 )
+                 ))
                  # Notify all admins
                  admins = User.objects.filter(is_superuser=True)
                  for admin in admins:
@@ -138,12 +167,12 @@ class MandateViewSet(viewsets.ModelViewSet):
                 broker_id = self.request.data.get('broker')
                 if not broker_id:
                      raise ValidationError("You must specify which Broker you are hiring.")
-                mandate = serializer.save(
+                mandate = save_open_mandate(lambda: serializer.save(
                     seller=user, 
                     initiated_by='SELLER',
                     seller_signature=sys_seller_sig,
                     seller_selfie=sys_seller_selfie
-                )
+                ))
                 recipient = mandate.broker
 
         # Send Notification to Partner (if not platform)
@@ -209,7 +238,14 @@ class MandateViewSet(viewsets.ModelViewSet):
 
         mandate.status = 'ACTIVE'
         mandate.start_date = timezone.now().date()
-        mandate.save()
+        with transaction.atomic():
+            # An accepted renewal supersedes the mandate it renews, which was
+            # kept ACTIVE while the renewal was pending
+            if mandate.renewed_from_id:
+                Mandate.objects.select_for_update().filter(
+                    pk=mandate.renewed_from_id, status='ACTIVE'
+                ).update(status='EXPIRED')
+            save_open_mandate(mandate.save)
 
         # Notify the OTHER party (the initiator)
         # If deal type is Platform, and Admin just signed, notify Seller.
@@ -284,33 +320,47 @@ class MandateViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'])
     def renew_mandate(self, request, pk=None):
         old_mandate = self.get_object()
-        
-        if old_mandate.status != 'EXPIRED' and not old_mandate.is_near_expiry_notified:
-             # Allow early renewal? "after the expiry there is button for renewal"
-             # Let's allow renewal if expired OR near expiry
-             pass
-        
-        # Create new mandate based on old one
-        new_mandate = Mandate.objects.create(
-            property_item=old_mandate.property_item,
-            seller=old_mandate.seller,
-            broker=old_mandate.broker,
-            deal_type=old_mandate.deal_type,
-            initiated_by=old_mandate.initiated_by, 
-            is_exclusive=old_mandate.is_exclusive,
-            commission_rate=old_mandate.commission_rate,
-            fixed_amount=old_mandate.fixed_amount,
-            status='PENDING',
-            renewed_from=old_mandate
-        )
-        
-        # Update initiator based on who is requesting renewal
+
+        # Initiator is whoever is requesting renewal
+        initiated_by = old_mandate.initiated_by
         if request.user == old_mandate.seller:
-            new_mandate.initiated_by = 'SELLER'
+            initiated_by = 'SELLER'
         elif request.user == old_mandate.broker:
-            new_mandate.initiated_by = 'BROKER'
-            
-        new_mandate.save()
+            initiated_by = 'BROKER'
+
+        with transaction.atomic():
+            old_mandate = Mandate.objects.select_for_update().get(pk=old_mandate.pk)
+            # Renewal is allowed if expired OR near expiry. A near-expiry
+            # mandate stays ACTIVE until its renewal is accepted (see
+            # accept_and_sign); if the renewal is rejected it simply runs out
+            if old_mandate.status == 'ACTIVE':
+                near_expiry = old_mandate.is_near_expiry_notified or (
+                    old_mandate.end_date and old_mandate.days_remaining <= RENEWAL_WINDOW_DAYS
+                )
+                if not near_expiry:
+                    raise ValidationError(
+                        f"An active mandate can only be renewed in its last {RENEWAL_WINDOW_DAYS} days."
+                    )
+            # Only the mandate being renewed may still be open on the property
+            open_mandates = Mandate.objects.filter(
+                property_item_id=old_mandate.property_item_id, status__in=['PENDING', 'ACTIVE']
+            ).exclude(pk=old_mandate.pk)
+            if open_mandates.exists():
+                raise ValidationError(OPEN_MANDATE_ERROR)
+
+            # Create new mandate based on old one
+            new_mandate = save_open_mandate(lambda: Mandate.objects.create(
+                property_item=old_mandate.property_item,
+                seller=old_mandate.seller,
+                broker=old_mandate.broker,
+                deal_type=old_mandate.deal_type,
+                initiated_by=initiated_by,
+                is_exclusive=old_mandate.is_exclusive,
+                commission_rate=old_mandate.commission_rate,
+                fixed_amount=old_mandate.fixed_amount,
+                status='PENDING',
+                renewed_from=old_mandate
+            ))
 
         return Response(MandateSerializer(new_mandate).data, status=status.HTTP_201_CREATED)
 
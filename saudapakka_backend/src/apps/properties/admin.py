@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Property, PropertyImage, PropertyFloorPlan, SavedProperty
+from .models import Property, PropertyImage, PropertyFloorPlan, SavedProperty, SavedSearch, ContactReveal, ContactRevealRollup
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -22,6 +22,38 @@ class SavedPropertyAdmin(admin.ModelAdmin):
     readonly_fields = ['saved_at']
     date_hierarchy = 'saved_at'
 
+@admin.register(SavedSearch)
+class SavedSearchAdmin(admin.ModelAdmin):
+    list_display = ['name', 'user', 'city_key', 'property_type', 'notify', 'last_notified_at', 'created_at']
+    list_filter = ['notify', 'property_type']
+    search_fields = ['name', 'user__email']
+    readonly_fields = ['city_key', 'property_type', 'last_notified_at', 'created_at']
+
+@admin.register(ContactReveal)
+class ContactRevealAdmin(admin.ModelAdmin):
+    # Append-only audit log: read-only in the admin
+    list_display = ['created_at', 'user', 'property', 'ip_address']
+    list_select_related = ['user', 'property']
+    search_fields = ['user__email', 'ip_address']
+    date_hierarchy = 'created_at'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(ContactRevealRollup)
+class ContactRevealRollupAdmin(admin.ModelAdmin):
+    # Busiest users/listings first for abuse review
+    list_display = ['day', 'kind', 'subject_id', 'reveals', 'distinct_counterparts']
+    list_filter = ['kind', 'day']
+    search_fields = ['subject_id']
+    ordering = ['-day', '-reveals']
+
 @admin.register(Property)
 class PropertyAdmin(admin.ModelAdmin):
     inlines = [PropertyImageInline, PropertyFloorPlanInline]
@@ -0,0 +1,273 @@
+import heapq
+import math
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max, Q
+
+from .models import ComparableRefresh, Property, PropertyComparable, normalize_location
+
+# Neighbours kept per listing
+K = 10
+
+# Weights of the distance terms; each term is ~1.0 for a "clearly different" pair
+WEIGHTS = {'location': 1.0, 'sub_type': 0.5, 'bhk': 0.75, 'area': 1.0, 'price': 1.5}
+# Location term reaches 1.0 at this distance
+LOCATION_SCALE_KM = 5.0
+# Listings further away than this (and in another city) are never compared
+SEARCH_RADIUS_KM = 25.0
+# Used for a term when either side lacks the data
+MISSING_PENALTY = 1.0
+
+COLUMNS = (
+    'id', 'verification_status', 'listing_type', 'property_type', 'sub_type', 'city', 'locality',
+    'latitude', 'longitude', 'bhk_config', 'carpet_area', 'super_builtup_area', 'plot_area', 'total_price',
+)
+
+
+def comparables_cache_key(property_id):
+    return f'properties:comparables:{property_id}'
+
+
+def _features(row):
+    if row['property_type'] in ('PLOT', 'LAND'):
+        area = row['plot_area']
+    else:
+        area = row['carpet_area'] or row['super_builtup_area'] or row['plot_area']
+    price = row['total_price']
+    return {
+        'id': row['id'],
+        'eligible': row['verification_status'] == 'VERIFIED',
+        'segment': (row['listing_type'], row['property_type']),
+        'city': normalize_location(row['city']),
+        'locality': normalize_location(row['locality']),
+        'lat': row['latitude'],
+        'lng': row['longitude'],
+        'sub_type': row['sub_type'],
+        'bhk': float(row['bhk_config']) if row['bhk_config'] is not None else None,
+        'log_area': math.log(area) if area and area > 0 else None,
+        'log_price': math.log(price) if price and price > 0 else None,
+    }
+
+
+def _haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 6371.0 * 2 * math.asin(math.sqrt(a))
+
+
+def _log_gap(a, b):
+    # 1.0 per doubling
+    return abs(a - b) / math.log(2) if a is not None and b is not None else MISSING_PENALTY
+
+
+def distance(a, b):
+    """Weighted distance between two feature dicts (same segment assumed)."""
+    if None not in (a['lat'], a['lng'], b['lat'], b['lng']):
+        location = _haversine_km(a['lat'], a['lng'], b['lat'], b['lng']) / LOCATION_SCALE_KM
+    elif a['city'] == b['city']:
+        location = 0.0 if a['locality'] == b['locality'] else 1.0
+    else:
+        location = 3.0
+    bhk = abs(a['bhk'] - b['bhk']) if a['bhk'] is not None and b['bhk'] is not None else MISSING_PENALTY
+    return (
+        WEIGHTS['location'] * location
+        + WEIGHTS['sub_type'] * (a['sub_type'] != b['sub_type'])
+        + WEIGHTS['bhk'] * bhk
+        + WEIGHTS['area'] * _log_gap(a['log_area'], b['log_area'])
+        + WEIGHTS['price'] * _log_gap(a['log_price'], b['log_price'])
+    )
+
+
+def _candidates(subject):
+    """Verified listings of the same segment in the same city or search radius."""
+    listing_type, property_type = subject['segment']
+    nearby = Q(city__iexact=subject['city'])
+    if subject['lat'] is not None and subject['lng'] is not None:
+        dlat = SEARCH_RADIUS_KM / 111.0
+        dlng = SEARCH_RADIUS_KM / (111.0 * max(math.cos(math.radians(subject['lat'])), 0.01))
+        nearby |= Q(
+            latitude__range=(subject['lat'] - dlat, subject['lat'] + dlat),
+            longitude__range=(subject['lng'] - dlng, subject['lng'] + dlng),
+        )
+    rows = (
+        Property.objects.filter(nearby, verification_status='VERIFIED',
+                                listing_type=listing_type, property_type=property_type)
+        .exclude(pk=subject['id']).values(*COLUMNS)
+    )
+    return [_features(row) for row in rows]
+
+
+def _load(property_ids):
+    return {row['id']: _features(row) for row in Property.objects.filter(pk__in=property_ids).values(*COLUMNS)}
+
+
+def _drop_cached(property_ids):
+    # After commit, so a concurrent read can't re-cache the old lists
+    keys = [comparables_cache_key(pk) for pk in property_ids]
+    if keys:
+        transaction.on_commit(partial(cache.delete_many, keys))
+
+
+def refresh_comparables(property_ids):
+    """Recomputes the neighbour lists of the given listings from scratch."""
+    for subject in _load(property_ids).values():
+        nearest = heapq.nsmallest(
+            K, ((distance(subject, other), other['id']) for other in _candidates(subject))
+        )
+        with transaction.atomic():
+            PropertyComparable.objects.filter(property_id=subject['id']).delete()
+            PropertyComparable.objects.bulk_create([
+                PropertyComparable(property_id=subject['id'], comparable_id=other_id, distance=dist)
+                for dist, other_id in nearest
+            ])
+    _drop_cached(property_ids)
+
+
+def update_comparables(property_id):
+    """
+    Incremental maintenance after a listing changed:
+    - its own list is recomputed;
+    - lists that contained it keep it (distance updated) while it still
+      ranks, otherwise they are recomputed;
+    - lists it now beats the worst entry of get it merged in and trimmed to K.
+    Lists that were never computed are left until they are first read.
+    """
+    subject = _load([property_id]).get(property_id)
+    if subject is None:
+        return
+    refresh_comparables([property_id])
+
+    touched = set()
+    recompute = set()
+    containing = {
+        row.property_id: row
+        for row in PropertyComparable.objects.filter(comparable_id=property_id)
+    }
+    if containing:
+        owners = _load(containing)
+        # Size and worst distance of each list's *other* members
+        others = {
+            row['property_id']: row for row in
+            PropertyComparable.objects.filter(property_id__in=containing).exclude(comparable_id=property_id)
+            .values('property_id').annotate(worst=Max('distance'), size=Count('id'))
+        }
+        for owner_id, row in containing.items():
+            owner = owners.get(owner_id)
+            if owner is None or not subject['eligible'] or owner['segment'] != subject['segment']:
+                recompute.add(owner_id)
+                continue
+            row.distance = distance(owner, subject)
+            rest = others.get(owner_id, {'size': 0, 'worst': 0.0})
+            # Still ranks if the list was not full or it beats another member
+            if rest['size'] < K - 1 or row.distance <= rest['worst']:
+                row.save(update_fields=['distance'])
+                touched.add(owner_id)
+            else:
+                recompute.add(owner_id)
+
+    if subject['eligible']:
+        candidates = [c for c in _candidates(subject) if c['id'] not in containing]
+        stats = {
+            row['property_id']: row for row in
+            PropertyComparable.objects.filter(property_id__in=[c['id'] for c in candidates])
+            .values('property_id').annotate(worst=Max('distance'), size=Count('id'))
+        }
+        entering = []
+        for candidate in candidates:
+            current = stats.get(candidate['id'])
+            if current is None:
+                continue
+            dist = distance(candidate, subject)
+            if current['size'] < K or dist < current['worst']:
+                entering.append(PropertyComparable(property_id=candidate['id'], comparable_id=property_id, distance=dist))
+        if entering:
+            PropertyComparable.objects.bulk_create(entering, ignore_conflicts=True)
+            owners = {row.property_id for row in entering}
+            _trim(owners)
+            touched |= owners
+
+    if recompute:
+        refresh_comparables(list(recompute))
+    _drop_cached(touched)
+
+
+def process_pending_refreshes(batch_size=100):
+    """
+    Does one batch of queued ComparableRefresh work; returns the number of
+    rows done. Rows are claimed with SKIP LOCKED and removed in the same
+    transaction as the work, so a failed batch stays queued.
+    """
+    with transaction.atomic():
+        batch = list(
+            ComparableRefresh.objects.select_for_update(skip_locked=True).order_by('created_at')
+            .values_list('pk', 'property_id', 'kind')[:batch_size]
+        )
+        if not batch:
+            return 0
+        ComparableRefresh.objects.filter(pk__in=[pk for pk, _, _ in batch]).delete()
+        recompute = {property_id for _, property_id, kind in batch if kind == ComparableRefresh.RECOMPUTE}
+        if recompute:
+            refresh_comparables(list(recompute))
+        for _, property_id, kind in batch:
+            if kind == ComparableRefresh.UPDATE:
+                update_comparables(property_id)
+    return len(batch)
+
+
+def _trim(property_ids):
+    """Drops entries beyond the K nearest for the given lists."""
+    ranked = {}
+    for entry_id, owner_id, dist in (
+        PropertyComparable.objects.filter(property_id__in=property_ids)
+        .order_by('property_id', 'distance').values_list('id', 'property_id', 'distance')
+    ):
+        ranked.setdefault(owner_id, []).append(entry_id)
+    extra = [entry_id for entries in ranked.values() for entry_id in entries[K:]]
+    if extra:
+        PropertyComparable.objects.filter(id__in=extra).delete()
+
+
+def get_comparables(property_obj, request):
+    """
+    Cached comparables payload for the detail page. Reads never compute: a
+    list that was never built is queued and reads as empty until then.
+    """
+    from .serializers import ComparablePropertySerializer
+
+    key = comparables_cache_key(property_obj.pk)
+    data = cache.get(key)
+    if data is not None:
+        return data
+
+    entries = list(
+        PropertyComparable.objects.filter(property=property_obj).order_by('distance')
+        .select_related('comparable').prefetch_related('comparable__images')
+    )
+    if not entries:
+        # Possibly never computed (listing not refreshed since deployment).
+        # The empty payload is cached; the refresh drops it
+        ComparableRefresh.enqueue([property_obj.pk], ComparableRefresh.RECOMPUTE)
+
+    serialized = ComparablePropertySerializer(
+        [entry.comparable for entry in entries], many=True, context={'request': request}
+    ).data
+    comparables = [
+        {**item, 'distance': round(entry.distance, 3)} for item, entry in zip(serialized, entries)
+    ]
+    rates = sorted(
+        entry.comparable.effective_price_per_sqft for entry in entries
+        if entry.comparable.effective_price_per_sqft is not None
+    )
+    median = None
+    if rates:
+        middle = len(rates) // 2
+        median = rates[middle] if len(rates) % 2 else (rates[middle - 1] + rates[middle]) / 2
+    data = {
+        'comparables': comparables,
+        'median_price_per_sqft': f'{median:.2f}' if median is not None else None,
+    }
+    cache.set(key, data, settings.PROPERTY_COMPARABLES_CACHE_TIMEOUT)
+    return data
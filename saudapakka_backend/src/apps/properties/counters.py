@@ -0,0 +1,42 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Property, SavedProperty
+
+
+def bump_counters(property_id, **deltas):
+    """Atomically adds deltas to counter columns, e.g. bump_counters(pk, saves_count=1)."""
+    Property.objects.filter(pk=property_id).update(
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+
+
+def _saves_count():
+    return Coalesce(Subquery(
+        SavedProperty.objects.filter(property=OuterRef('pk')).order_by()
+        .values('property').annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+# Counter -> expression rebuilding it from its source of truth. The reveal
+# counters have none: the ContactReveal log is buffered and best effort
+# (reveals.py), so it lags behind them and can't be used to correct them.
+COUNTER_SOURCES = {
+    'saves_count': _saves_count,
+}
+
+
+def reconcile_counters(batch_size=5000):
+    """
+    Rebuilds the counters in COUNTER_SOURCES in batched UPDATEs and returns
+    the number of listings whose counters had drifted.
+    """
+    property_ids = list(Property.objects.order_by('pk').values_list('pk', flat=True))
+    fixed = 0
+    for start in range(0, len(property_ids), batch_size):
+        batch = Property.objects.filter(pk__in=property_ids[start:start + batch_size])
+        expressions = {field: source() for field, source in COUNTER_SOURCES.items()}
+        drifted = batch.alias(**{f'_actual_{field}': expr for field, expr in expressions.items()})
+        drifted = drifted.exclude(**{field: F(f'_actual_{field}') for field in expressions})
+        fixed += Property.objects.filter(pk__in=drifted.values('pk')).update(**expressions)
+    return fixed
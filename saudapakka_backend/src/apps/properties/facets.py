@@ -0,0 +1,94 @@
+from django.core.exceptions import EmptyResultSet
+from django.db import connection
+from django.db.models import Case, CharField, Value, When
+
+from .models import Property
+
+# Columns that get a facet, in response order
+FACET_FIELDS = (
+    'property_type', 'sub_type', 'bhk_config', 'furnishing_status',
+    'availability_status', 'facing', 'city',
+)
+
+# (key, label, min_price, max_price) -- bounds map onto ?min_price= / ?max_price=
+PRICE_BANDS = (
+    ('under_25l', 'Under ₹25 Lac', None, 2500000),
+    ('25l_50l', '₹25 Lac - ₹50 Lac', 2500000, 5000000),
+    ('50l_1cr', '₹50 Lac - ₹1 Cr', 5000000, 10000000),
+    ('1cr_2cr', '₹1 Cr - ₹2 Cr', 10000000, 20000000),
+    ('2cr_5cr', '₹2 Cr - ₹5 Cr', 20000000, 50000000),
+    ('above_5cr', 'Above ₹5 Cr', 50000000, None),
+)
+
+
+def price_band_expression():
+    whens = [
+        When(total_price__lt=upper, then=Value(key))
+        for key, label, lower, upper in PRICE_BANDS if upper is not None
+    ]
+    return Case(*whens, default=Value(PRICE_BANDS[-1][0]), output_field=CharField())
+
+
+def compute_facets(queryset):
+    """
+    Counts per facet value for everything matched by `queryset`, in a single
+    GROUPING SETS query (one grouping set per facet plus () for the total).
+    """
+    columns = FACET_FIELDS + ('price_band',)
+    inner = queryset.order_by().annotate(price_band=price_band_expression()).values('pk', *columns)
+    try:
+        inner_sql, params = inner.query.sql_with_params()
+    except EmptyResultSet:
+        # e.g. an empty __in filter: nothing can match
+        rows = []
+    else:
+        quoted = [connection.ops.quote_name(column) for column in columns]
+        select = ', '.join(quoted)
+        sets = ', '.join(f'({column})' for column in quoted)
+        sql = (
+            f'SELECT GROUPING({select}), {select}, COUNT(*) '
+            f'FROM ({inner_sql}) AS filtered '
+            f'GROUP BY GROUPING SETS ({sets}, ())'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+
+    # GROUPING() sets a bit for every column that is *not* grouped; the first
+    # argument is the most significant bit.
+    everything = (1 << len(columns)) - 1
+    facet_by_grouping = {
+        everything ^ (1 << (len(columns) - 1 - index)): index for index in range(len(columns))
+    }
+
+    total = 0
+    counts = {column: [] for column in columns}
+    for row in rows:
+        grouping, values, count = row[0], row[1:-1], row[-1]
+        if grouping == everything:
+            total = count
+            continue
+        index = facet_by_grouping[grouping]
+        counts[columns[index]].append((values[index], count))
+
+    facets = {
+        field: _facet_buckets(Property._meta.get_field(field), counts[field])
+        for field in FACET_FIELDS
+    }
+    band_counts = dict(counts['price_band'])
+    facets['price_band'] = [
+        {'value': key, 'label': label, 'min_price': lower, 'max_price': upper, 'count': band_counts[key]}
+        for key, label, lower, upper in PRICE_BANDS if key in band_counts
+    ]
+    return {'total': total, 'facets': facets}
+
+
+def _facet_buckets(model_field, counts):
+    labels = {value: str(label) for value, label in model_field.flatchoices}
+    buckets = []
+    for value, count in sorted(counts, key=lambda item: (-item[1], str(item[0]))):
+        if value in (None, ''):
+            continue
+        value = str(value) if not isinstance(value, str) else value
+        buckets.append({'value': value, 'label': labels.get(value, value), 'count': count})
+    return buckets
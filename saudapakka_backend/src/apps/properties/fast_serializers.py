@@ -0,0 +1,170 @@
+from rest_framework import serializers
+
+from .models import Property, PropertyImage, PropertyFloorPlan, SavedProperty
+from .serializers import PropertySerializer
+
+
+def _identity(value):
+    return value
+
+
+class FastPropertyListSerializer:
+    """
+    Read-only fast path for property list pages.
+
+    Produces the same output as PropertySerializer(many=True) but builds the
+    dicts straight from values() rows:
+    - one converter per field is resolved up front (no per-row field dispatch),
+    - choice labels come from precomputed maps instead of get_*_display(),
+    - images, floor plans, owners, open mandates and saved state are fetched
+      with one query each for the whole page instead of per row.
+    Honours the same ?profile= / ?fields= / ?expand= selection.
+    """
+
+    # Plain column types whose DRF representation is the DB value itself
+    PASSTHROUGH_FIELDS = (
+        serializers.CharField, serializers.ChoiceField, serializers.IntegerField,
+        serializers.BooleanField, serializers.FloatField,
+    )
+    # Computed fields resolved per page rather than per row
+    RELATED_FIELDS = (
+        'owner_details', 'images', 'floor_plans', 'has_active_mandate',
+        'active_mandate_id', 'is_saved',
+    )
+
+    def __init__(self, request):
+        self.request = request
+        # Instantiated once only to reuse its (already pruned) field objects
+        self.serializer = PropertySerializer(context={'request': request})
+        self.converters = {}
+        self.columns = {'id'}
+        for name, field in self.serializer.fields.items():
+            if name in self.RELATED_FIELDS:
+                continue
+            column, converter = self._build_converter(name, field)
+            self.columns.add(column)
+            self.converters[name] = (column, converter)
+        if 'owner_details' in self.serializer.fields:
+            self.columns.add('owner_id')
+
+    def _build_converter(self, name, field):
+        sources = PropertySerializer.FIELD_SOURCES.get(name)
+        if name in ('has_7_12', 'has_mojani'):
+            return sources[0], bool
+
+        if field.source.startswith('get_') and field.source.endswith('_display'):
+            # get_<field>_display -> precomputed label map
+            model_field = Property._meta.get_field(sources[0])
+            labels = {value: str(label) for value, label in model_field.flatchoices}
+            return sources[0], lambda value: None if value is None else labels.get(value, value)
+
+        model_field = Property._meta.get_field(field.source)
+        if isinstance(field, serializers.RelatedField):
+            return model_field.attname, lambda value: None if value is None else str(value)
+        if isinstance(field, serializers.FileField):
+            return model_field.attname, self._file_url_converter(model_field.storage)
+        if isinstance(field, self.PASSTHROUGH_FIELDS):
+            return model_field.attname, _identity
+
+        # Decimals, dates, datetimes, UUIDs: reuse DRF's own formatting
+        to_representation = field.to_representation
+        return model_field.attname, lambda value: None if value is None else to_representation(value)
+
+    def _file_url_converter(self, storage):
+        request = self.request
+
+        def convert(name):
+            if not name:
+                return None
+            url = storage.url(name)
+            return request.build_absolute_uri(url) if request is not None else url
+        return convert
+
+    def serialize(self, queryset):
+        rows = list(queryset.prefetch_related(None).values(*self.columns))
+        ids = [row['id'] for row in rows]
+        fields = self.serializer.fields
+        # One getter per output field, in PropertySerializer's key order
+        getters = []
+        for name in fields:
+            if name in self.converters:
+                column, converter = self.converters[name]
+                getters.append((name, lambda row, column=column, converter=converter: converter(row[column])))
+            else:
+                getters.append((name, getattr(self, f'_load_{name}')(ids, rows)))
+
+        return [{name: get(row) for name, get in getters} for row in rows]
+
+    # --- Per-page loaders: each returns a row -> value function ---
+
+    def _load_images(self, ids, rows):
+        convert = self._file_url_converter(PropertyImage._meta.get_field('image').storage)
+        images = {}
+        for image in PropertyImage.objects.filter(property_id__in=ids).order_by('id').values(
+                'id', 'property_id', 'image', 'is_thumbnail'):
+            images.setdefault(image['property_id'], []).append({
+                'id': image['id'],
+                'image': convert(image['image']),
+                'is_thumbnail': image['is_thumbnail'],
+            })
+        return lambda row: images.get(row['id'], [])
+
+    def _load_floor_plans(self, ids, rows):
+        convert = self._file_url_converter(PropertyFloorPlan._meta.get_field('image').storage)
+        created_at = serializers.DateTimeField().to_representation
+        plans = {}
+        for plan in PropertyFloorPlan.objects.filter(property_id__in=ids).values(
+                'id', 'property_id', 'image', 'floor_number', 'floor_name', 'order', 'created_at'):
+            plans.setdefault(plan['property_id'], []).append({
+                'id': plan['id'],
+                'image': convert(plan['image']),
+                'floor_number': plan['floor_number'],
+                'floor_name': plan['floor_name'],
+                'order': plan['order'],
+                'created_at': created_at(plan['created_at']),
+            })
+        return lambda row: plans.get(row['id'], [])
+
+    def _load_owner_details(self, ids, rows):
+        from apps.users.models import User
+        convert = self._file_url_converter(User._meta.get_field('profile_picture').storage)
+        owners = {}
+        owner_ids = {row['owner_id'] for row in rows}
+        for user in User.objects.filter(id__in=owner_ids).values(
+                'id', 'first_name', 'last_name', 'is_active_seller', 'is_active_broker', 'profile_picture'):
+            owners[user['id']] = {
+                'id': str(user['id']),
+                'first_name': user['first_name'],
+                'last_name': user['last_name'],
+                'full_name': f"{user['first_name']} {user['last_name']}".strip(),
+                'is_active_seller': user['is_active_seller'],
+                'is_active_broker': user['is_active_broker'],
+                'profile_picture': convert(user['profile_picture']),
+            }
+        return lambda row: owners.get(row['owner_id'])
+
+    def _open_mandates(self, ids):
+        if not hasattr(self, '_open_mandate_ids'):
+            from apps.mandates.models import Mandate
+            self._open_mandate_ids = dict(
+                Mandate.objects.filter(property_item_id__in=ids, status__in=['ACTIVE', 'PENDING'])
+                .values_list('property_item_id', 'id')
+            )
+        return self._open_mandate_ids
+
+    def _load_has_active_mandate(self, ids, rows):
+        open_mandates = self._open_mandates(ids)
+        return lambda row: row['id'] in open_mandates
+
+    def _load_active_mandate_id(self, ids, rows):
+        open_mandates = self._open_mandates(ids)
+        return lambda row: str(open_mandates[row['id']]) if row['id'] in open_mandates else None
+
+    def _load_is_saved(self, ids, rows):
+        user = getattr(self.request, 'user', None)
+        if not (user and user.is_authenticated):
+            return lambda row: False
+        saved = set(
+            SavedProperty.objects.filter(user=user, property_id__in=ids).values_list('property_id', flat=True)
+        )
+        return lambda row: row['id'] in saved
@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from apps.properties.models import LocationSuggestion
+
+class Command(BaseCommand):
+    help = 'Recomputes the city/locality/project autocomplete index from the live (verified) listings.'
+
+    def handle(self, *args, **options):
+        total = LocationSuggestion.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt location suggestions: {total} terms.'))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from apps.properties.ranking import recompute_rank_scores
+
+class Command(BaseCommand):
+    help = 'Recomputes Property.rank_score (promotion, freshness, views, saves). Run periodically, e.g. hourly.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        updated = recompute_rank_scores(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Recomputed rank scores for {updated} listings.'))
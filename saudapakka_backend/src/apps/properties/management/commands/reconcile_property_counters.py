@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from apps.properties.counters import COUNTER_SOURCES, reconcile_counters
+
+class Command(BaseCommand):
+    help = 'Rebuilds the denormalized Property engagement counters from their source tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        fixed = reconcile_counters(batch_size=options['batch_size'])
+        counters = ', '.join(COUNTER_SOURCES)
+        self.stdout.write(self.style.SUCCESS(f'Reconciled {counters}: {fixed} listings corrected.'))
@@ -0,0 +1,36 @@
+import time
+from django.core.management.base import BaseCommand
+from apps.properties.comparables import process_pending_refreshes, refresh_comparables
+from apps.properties.models import Property
+
+class Command(BaseCommand):
+    help = (
+        'Recomputes the precomputed comparable-listing lists (all listings, or the given ids). '
+        'With --pending, works through the updates queued by listing saves and deletes '
+        '(run with --loop as a worker, or from cron every minute).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('property_ids', nargs='*', help='Only refresh these listings')
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--pending', action='store_true', help='Process queued updates instead')
+        parser.add_argument('--loop', action='store_true', help='Keep processing the queue until interrupted (--pending)')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds to sleep when the queue is empty (--loop)')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if options['pending']:
+            while True:
+                done = process_pending_refreshes(batch_size)
+                if done:
+                    self.stdout.write(f'Processed {done} queued comparable updates.')
+                if done < batch_size:
+                    if not options['loop']:
+                        break
+                    time.sleep(options['interval'])
+            return
+
+        ids = options['property_ids'] or list(Property.objects.values_list('id', flat=True))
+        for start in range(0, len(ids), batch_size):
+            refresh_comparables(ids[start:start + batch_size])
+        self.stdout.write(self.style.SUCCESS(f'Refreshed comparables for {len(ids)} listings.'))
@@ -0,0 +1,20 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from apps.properties.reveals import rollup_contact_reveals
+
+class Command(BaseCommand):
+    help = 'Builds daily per-user and per-property ContactReveal rollups (default: yesterday and today).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat, help='Last day to roll up (YYYY-MM-DD), default today')
+        parser.add_argument('--days', type=int, default=2, help='Number of days ending at --date')
+
+    def handle(self, *args, **options):
+        last = options['date'] or timezone.localdate()
+        for offset in range(options['days'] - 1, -1, -1):
+            day = last - timedelta(days=offset)
+            written = rollup_contact_reveals(day)
+            self.stdout.write(f'{day}: {written} rollup rows')
+        self.stdout.write(self.style.SUCCESS('Contact reveal rollups updated.'))
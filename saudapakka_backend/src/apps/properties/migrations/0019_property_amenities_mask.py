@@ -0,0 +1,43 @@
+# Generated by Django 5.0.2 on 2026-10-19 05:09
+
+from django.db import migrations, models
+from django.db.models import Case, IntegerField, Value, When
+
+
+# Frozen copy of Property.AMENITY_FIELDS at the time of this migration
+AMENITY_FIELDS = (
+    'has_power_backup', 'has_lift', 'has_swimming_pool', 'has_club_house',
+    'has_gym', 'has_park', 'has_reserved_parking', 'has_security',
+    'is_vastu_compliant', 'has_intercom', 'has_piped_gas', 'has_wifi',
+    'has_drainage_line', 'has_one_gate_entry', 'has_jogging_park', 'has_children_park',
+    'has_temple', 'has_water_line', 'has_street_light', 'has_internal_roads',
+)
+
+
+def backfill_amenities_mask(apps, schema_editor):
+    # Single UPDATE: sum of one CASE per flag
+    Property = apps.get_model('properties', 'Property')
+    mask = Value(0)
+    for bit, field in enumerate(AMENITY_FIELDS):
+        mask = mask + Case(
+            When(**{field: True}, then=Value(1 << bit)),
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+    Property.objects.update(amenities_mask=mask)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0018_property_views_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='amenities_mask',
+            field=models.IntegerField(default=0, editable=False, help_text='Bitmask of the amenity flags (kept in sync on save)'),
+        ),
+        migrations.RunPython(backfill_amenities_mask, migrations.RunPython.noop),
+    ]
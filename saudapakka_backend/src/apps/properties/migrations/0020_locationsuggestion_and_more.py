@@ -0,0 +1,61 @@
+# Generated by Django 5.0.2 on 2026-10-19 05:14
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_location_suggestions(apps, schema_editor):
+    # Initial fill (same rules as LocationSuggestion.rebuild at this point)
+    Property = apps.get_model('properties', 'Property')
+    LocationSuggestion = apps.get_model('properties', 'LocationSuggestion')
+    counts = {}
+    rows = (
+        Property.objects.filter(verification_status='VERIFIED').order_by()
+        .values('city', 'locality', 'project_name').annotate(listings=Count('pk'))
+    )
+    for row in rows:
+        city = ' '.join((row['city'] or '').split())
+        terms = [('CITY', city, '')] if city else []
+        terms += [
+            (kind, ' '.join(row[field].split()), city)
+            for kind, field in (('LOCALITY', 'locality'), ('PROJECT', 'project_name'))
+            if row[field] and row[field].strip()
+        ]
+        for kind, term, term_city in terms:
+            entry = counts.setdefault((kind, term.lower(), term_city.lower()), [0, term, term_city])
+            entry[0] += row['listings']
+
+    LocationSuggestion.objects.bulk_create([
+        LocationSuggestion(kind=kind, term=term, normalized=normalized, city=city, city_key=city_key, listing_count=count)
+        for (kind, normalized, city_key), (count, term, city) in counts.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0019_property_amenities_mask'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LocationSuggestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('CITY', 'City'), ('LOCALITY', 'Locality'), ('PROJECT', 'Project')], max_length=10)),
+                ('term', models.CharField(help_text='Display text (as first listed)', max_length=255)),
+                ('normalized', models.CharField(help_text='Lower-cased, whitespace-collapsed term', max_length=255)),
+                ('city', models.CharField(blank=True, help_text='City of a locality/project; blank for cities', max_length=100)),
+                ('city_key', models.CharField(blank=True, help_text='Normalized city', max_length=100)),
+                ('listing_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['normalized'], name='location_suggestion_prefix', opclasses=['varchar_pattern_ops'])],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='locationsuggestion',
+            constraint=models.UniqueConstraint(fields=('kind', 'normalized', 'city_key'), name='unique_location_suggestion'),
+        ),
+        migrations.RunPython(populate_location_suggestions, migrations.RunPython.noop),
+    ]
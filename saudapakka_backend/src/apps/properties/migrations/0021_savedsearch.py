@@ -0,0 +1,34 @@
+# Generated by Django 5.0.2 on 2026-10-19 05:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0020_locationsuggestion_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SavedSearch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('query', models.JSONField(default=dict, help_text='Validated PropertyFilter parameters')),
+                ('notify', models.BooleanField(default=True, help_text='Send a notification for new matching listings')),
+                ('city_key', models.CharField(blank=True, editable=False, max_length=100)),
+                ('property_type', models.CharField(blank=True, editable=False, max_length=50)),
+                ('last_notified_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saved_searches', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['city_key', 'property_type'], name='saved_search_match_keys')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.0.2 on 2026-10-19 05:39
+
+import django.db.models.expressions
+import django.db.models.functions.comparison
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0021_savedsearch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='effective_price_per_sqft',
+            field=models.GeneratedField(db_index=True, db_persist=True, expression=models.Case(models.When(property_type__in=['PLOT', 'LAND'], then=django.db.models.expressions.CombinedExpression(models.F('total_price'), '/', django.db.models.functions.comparison.NullIf(models.F('plot_area'), models.Value(Decimal('0'))))), default=django.db.models.expressions.CombinedExpression(models.F('total_price'), '/', django.db.models.functions.comparison.NullIf(django.db.models.functions.comparison.Coalesce(models.F('carpet_area'), models.F('super_builtup_area'), models.F('plot_area')), models.Value(Decimal('0'))))), output_field=models.DecimalField(decimal_places=2, max_digits=15, null=True)),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='monthly_maintenance',
+            field=models.GeneratedField(db_index=True, db_persist=True, expression=models.Case(models.When(maintenance_interval='YEARLY', then=django.db.models.expressions.CombinedExpression(models.F('maintenance_charges'), '/', models.Value(Decimal('12')))), default=models.F('maintenance_charges')), output_field=models.DecimalField(decimal_places=2, max_digits=10)),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.2 on 2026-10-19 05:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0022_property_effective_price_per_sqft_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PropertyComparable',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('distance', models.FloatField()),
+                ('comparable', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='comparable_of', to='properties.property')),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='comparables', to='properties.property')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['property', 'distance'], name='property_comparable_rank')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='propertycomparable',
+            constraint=models.UniqueConstraint(fields=('property', 'comparable'), name='unique_property_comparable'),
+        ),
+    ]
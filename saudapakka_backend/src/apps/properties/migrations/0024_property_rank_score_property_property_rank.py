@@ -0,0 +1,24 @@
+# Generated by Django 5.0.2 on 2026-10-19 05:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0023_propertycomparable_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='rank_score',
+            field=models.FloatField(default=0, editable=False, help_text='Feed ranking, recomputed by recompute_rank_scores'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['verification_status', 'rank_score', 'created_at'], name='property_rank'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.0.2 on 2026-10-19 05:45
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_saves_count(apps, schema_editor):
+    # Reveals/inquiries were never recorded; they start at 0
+    Property = apps.get_model('properties', 'Property')
+    SavedProperty = apps.get_model('properties', 'SavedProperty')
+    saves = SavedProperty.objects.filter(property=OuterRef('pk')).order_by().values('property') \
+        .annotate(total=Count('pk')).values('total')
+    Property.objects.update(saves_count=Coalesce(Subquery(saves), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0024_property_rank_score_property_property_rank'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='contact_reveals_count',
+            field=models.IntegerField(default=0, editable=False, help_text='Owner contact details revealed'),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='inquiries_count',
+            field=models.IntegerField(default=0, editable=False, help_text='Distinct users who revealed the contact'),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='saves_count',
+            field=models.IntegerField(default=0, editable=False, help_text='Users who saved this listing'),
+        ),
+        migrations.RunPython(backfill_saves_count, migrations.RunPython.noop),
+    ]
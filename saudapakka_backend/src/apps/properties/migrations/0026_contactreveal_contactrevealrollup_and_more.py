@@ -0,0 +1,50 @@
+# Generated by Django 5.0.2 on 2026-10-19 05:47
+
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0025_property_contact_reveals_count_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContactReveal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('property', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='properties.property')),
+                ('user', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ContactRevealRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('kind', models.CharField(choices=[('USER', 'User'), ('PROPERTY', 'Property')], max_length=10)),
+                ('subject_id', models.UUIDField(help_text='User id or Property id, depending on kind')),
+                ('reveals', models.PositiveIntegerField(default=0)),
+                ('distinct_counterparts', models.PositiveIntegerField(default=0, help_text='Distinct listings (per user) or users (per property)')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'day', '-reveals'], name='contact_reveal_rollup_top')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='contactrevealrollup',
+            constraint=models.UniqueConstraint(fields=('day', 'kind', 'subject_id'), name='unique_contact_reveal_rollup'),
+        ),
+        migrations.AddIndex(
+            model_name='contactreveal',
+            index=django.contrib.postgres.indexes.BrinIndex(fields=['created_at'], name='contact_reveal_created_brin'),
+        ),
+    ]
@@ -0,0 +1,94 @@
+# Generated by Django 5.0.2 on 2026-10-19 06:08
+
+import apps.uploads.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0026_contactreveal_contactrevealrollup_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='property',
+            name='building_commencement_certificate',
+            field=models.FileField(blank=True, max_length=255, null=True, storage=apps.uploads.storage.media_storage, upload_to='properties/docs/'),
+        ),
+        migrations.AlterField(
+            model_name='property',
+            name='building_completion_certificate',
+            field=models.FileField(blank=True, max_length=255, null=True, storage=apps.uploads.storage.media_storage, upload_to='properties/docs/'),
+        ),
+        migrations.AlterField(
+            model_name='property',
+            name='doc_7_12_or_pr_card',
+            field=models.FileField(blank=True, max_length=255, null=True, storage=apps.uploads.storage.media_storage, upload_to='properties/docs/'),
+        ),
+        migrations.AlterField(
+            model_name='property',
+            name='electricity_bill',
+            field=models.FileField(blank=True, max_length=255, null=True, storage=apps.uploads.storage.media_storage, upload_to='properties/docs/'),
+        ),
+        migrations.AlterField(
+            model_name='property',
+            name='floor_plan',
+            field=models.ImageField(blank=True, null=True, storage=apps.uploads.storage.media_storage, upload_to='properties/floor_plans/'),
+        ),
+        migrations.AlterField(
+            model_name='property',
+            name='gst_registration',
+            field=models.FileField(blank=True, max_length=255, null=True, storage=apps.uploads.storage.media_storage, upload_to='properties/docs/'),
+        ),
+        migrations.AlterField(
+            model_name='property',
+            name='layout_order',
+            field=models.FileField(blank=True, max_length=255, null=True, storage=apps.uploads.storage.media_storage, upload_to='properties/docs/'),
+        ),
+        migrations.AlterField(
+            model_name='property',
+            name='layout_sanction',
+            field=models.FileField(blank=True, max_length=255, null=True, storage=apps.uploads.storage.media_storage, upload_to='properties/docs/'),
+        ),
+        migrations.AlterField(
+            model_name='property',
+            name='mojani_nakasha',
+            field=models.FileField(blank=True, max_length=255, null=True, storage=apps.uploads.storage.media_storage, upload_to='properties/docs/'),
+        ),
+        migrations.AlterField(
+            model_name='property',
+            name='na_order_or_gunthewari',
+            field=models.FileField(blank=True, max_length=255, null=True, storage=apps.uploads.storage.media_storage, upload_to='properties/docs/'),
+        ),
+        migrations.AlterField(
+            model_name='property',
+            name='rera_project_certificate',
+            field=models.FileField(blank=True, max_length=255, null=True, storage=apps.uploads.storage.media_storage, upload_to='properties/docs/'),
+        ),
+        migrations.AlterField(
+            model_name='property',
+            name='sale_deed',
+            field=models.FileField(blank=True, max_length=255, null=True, storage=apps.uploads.storage.media_storage, upload_to='properties/docs/'),
+        ),
+        migrations.AlterField(
+            model_name='property',
+            name='sale_deed_registration_copy',
+            field=models.FileField(blank=True, max_length=255, null=True, storage=apps.uploads.storage.media_storage, upload_to='properties/docs/'),
+        ),
+        migrations.AlterField(
+            model_name='property',
+            name='title_search_report',
+            field=models.FileField(blank=True, max_length=255, null=True, storage=apps.uploads.storage.media_storage, upload_to='properties/docs/'),
+        ),
+        migrations.AlterField(
+            model_name='propertyfloorplan',
+            name='image',
+            field=models.ImageField(max_length=255, storage=apps.uploads.storage.media_storage, upload_to='properties/floor_plans/'),
+        ),
+        migrations.AlterField(
+            model_name='propertyimage',
+            name='image',
+            field=models.ImageField(storage=apps.uploads.storage.media_storage, upload_to='properties/'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.2 on 2026-10-19 06:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0027_alter_property_building_commencement_certificate_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComparableRefresh',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('UPDATE', 'Update'), ('RECOMPUTE', 'Recompute')], max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='properties.property')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='comparablerefresh',
+            constraint=models.UniqueConstraint(fields=('property', 'kind'), name='unique_comparable_refresh'),
+        ),
+    ]
@@ -1,11 +1,21 @@
 import uuid
-from django.db import models
+from decimal import Decimal
+from functools import lru_cache, partial
+from django.db import connection, models, transaction
+from django.db.models import Case, Count, F, Q, Value, When
+from django.db.models.functions import Coalesce, Greatest, NullIf
 from pgvector.django import VectorField
 from django.conf import settings
-from django.db.models.signals import post_delete
+from django.core.cache import cache
+from django.contrib.postgres.indexes import BrinIndex
+from django.utils import timezone
+from django.db.models.signals import post_delete, pre_delete
 from django.dispatch import receiver
+from apps.core.mixins import DirtyFieldsMixin
+from apps.uploads.storage import media_storage
+from apps.uploads.tombstones import record_deletions
 
-class Property(models.Model):
+class Property(DirtyFieldsMixin, models.Model):
     # --- Identifiers ---
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     owner = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='properties')
@@ -78,6 +88,29 @@ class Property(models.Model):
     maintenance_charges = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     maintenance_interval = models.CharField(max_length=10, choices=[('MONTHLY', 'Monthly'), ('YEARLY', 'Yearly')], default='MONTHLY')
 
+    # Derived metrics computed and stored by the database (indexed for filters/sorting).
+    # Plots and land are priced on plot area; built units on carpet, then super built-up area.
+    effective_price_per_sqft = models.GeneratedField(
+        expression=Case(
+            When(property_type__in=['PLOT', 'LAND'], then=F('total_price') / NullIf(F('plot_area'), Value(Decimal(0)))),
+            default=F('total_price') / NullIf(
+                Coalesce(F('carpet_area'), F('super_builtup_area'), F('plot_area')), Value(Decimal(0))
+            ),
+        ),
+        output_field=models.DecimalField(max_digits=15, decimal_places=2, null=True),
+        db_persist=True,
+        db_index=True,
+    )
+    monthly_maintenance = models.GeneratedField(
+        expression=Case(
+            When(maintenance_interval='YEARLY', then=F('maintenance_charges') / Value(Decimal(12))),
+            default=F('maintenance_charges'),
+        ),
+        output_field=models.DecimalField(max_digits=10, decimal_places=2),
+        db_persist=True,
+        db_index=True,
+    )
+
     # --- 3. Location ---
     project_name = models.CharField(max_length=255, blank=True)
     address_line = models.TextField()
@@ -129,26 +162,55 @@ class Property(models.Model):
     has_street_light = models.BooleanField(default=False)
     has_internal_roads = models.BooleanField(default=False)
 
+    # Bit i of amenities_mask mirrors AMENITY_FIELDS[i] (append only!)
+    AMENITY_FIELDS = (
+        'has_power_backup', 'has_lift', 'has_swimming_pool', 'has_club_house',
+        'has_gym', 'has_park', 'has_reserved_parking', 'has_security',
+        'is_vastu_compliant', 'has_intercom', 'has_piped_gas', 'has_wifi',
+        'has_drainage_line', 'has_one_gate_entry', 'has_jogging_park', 'has_children_park',
+        'has_temple', 'has_water_line', 'has_street_light', 'has_internal_roads',
+    )
+    # Public amenity names used by ?amenities= ('lift', 'vastu_compliant', ...)
+    AMENITY_BITS = {field.split('_', 1)[1]: 1 << bit for bit, field in enumerate(AMENITY_FIELDS)}
+
+    amenities_mask = models.IntegerField(default=0, editable=False, help_text="Bitmask of the amenity flags (kept in sync on save)")
+
     # --- 7. Media & Docs ---
     video_url = models.URLField(blank=True, null=True, help_text="YouTube/Hosted link")
-    floor_plan = models.ImageField(upload_to='properties/floor_plans/', null=True, blank=True)
+    floor_plan = models.ImageField(upload_to='properties/floor_plans/', storage=media_storage, null=True, blank=True)
     
     # Verification Documents (Comprehensive List)
-    building_commencement_certificate = models.FileField(upload_to='properties/docs/', null=True, blank=True, max_length=255)
-    building_completion_certificate = models.FileField(upload_to='properties/docs/', null=True, blank=True, max_length=255)
-    layout_sanction = models.FileField(upload_to='properties/docs/', null=True, blank=True, max_length=255)
-    layout_order = models.FileField(upload_to='properties/docs/', null=True, blank=True, max_length=255)
-    na_order_or_gunthewari = models.FileField(upload_to='properties/docs/', null=True, blank=True, max_length=255)
-    mojani_nakasha = models.FileField(upload_to='properties/docs/', null=True, blank=True, max_length=255)
-    doc_7_12_or_pr_card = models.FileField(upload_to='properties/docs/', null=True, blank=True, max_length=255)
-    title_search_report = models.FileField(upload_to='properties/docs/', null=True, blank=True, max_length=255)
+    building_commencement_certificate = models.FileField(upload_to='properties/docs/', storage=media_storage, null=True, blank=True, max_length=255)
+    building_completion_certificate = models.FileField(upload_to='properties/docs/', storage=media_storage, null=True, blank=True, max_length=255)
+    layout_sanction = models.FileField(upload_to='properties/docs/', storage=media_storage, null=True, blank=True, max_length=255)
+    layout_order = models.FileField(upload_to='properties/docs/', storage=media_storage, null=True, blank=True, max_length=255)
+    na_order_or_gunthewari = models.FileField(upload_to='properties/docs/', storage=media_storage, null=True, blank=True, max_length=255)
+    mojani_nakasha = models.FileField(upload_to='properties/docs/', storage=media_storage, null=True, blank=True, max_length=255)
+    doc_7_12_or_pr_card = models.FileField(upload_to='properties/docs/', storage=media_storage, null=True, blank=True, max_length=255)
+    title_search_report = models.FileField(upload_to='properties/docs/', storage=media_storage, null=True, blank=True, max_length=255)
     
     # Optional Verification Documents
-    rera_project_certificate = models.FileField(upload_to='properties/docs/', null=True, blank=True, max_length=255)
-    gst_registration = models.FileField(upload_to='properties/docs/', null=True, blank=True, max_length=255)
-    sale_deed_registration_copy = models.FileField(upload_to='properties/docs/', null=True, blank=True, max_length=255)
-    electricity_bill = models.FileField(upload_to='properties/docs/', null=True, blank=True, max_length=255)
-    sale_deed = models.FileField(upload_to='properties/docs/', null=True, blank=True, max_length=255)
+    rera_project_certificate = models.FileField(upload_to='properties/docs/', storage=media_storage, null=True, blank=True, max_length=255)
+    gst_registration = models.FileField(upload_to='properties/docs/', storage=media_storage, null=True, blank=True, max_length=255)
+    sale_deed_registration_copy = models.FileField(upload_to='properties/docs/', storage=media_storage, null=True, blank=True, max_length=255)
+    electricity_bill = models.FileField(upload_to='properties/docs/', storage=media_storage, null=True, blank=True, max_length=255)
+    sale_deed = models.FileField(upload_to='properties/docs/', storage=media_storage, null=True, blank=True, max_length=255)
+
+    DOCUMENT_FIELDS = (
+        'building_commencement_certificate',
+        'building_completion_certificate',
+        'layout_sanction',
+        'layout_order',
+        'na_order_or_gunthewari',
+        'mojani_nakasha',
+        'doc_7_12_or_pr_card',
+        'title_search_report',
+        'rera_project_certificate',
+        'gst_registration',
+        'sale_deed_registration_copy',
+        'electricity_bill',
+        'sale_deed',
+    )
 
     # --- 8. Contact Info ---
     listed_by = models.CharField(max_length=20, choices=[
@@ -167,27 +229,133 @@ class Property(models.Model):
     
     # Metrics
     views_count = models.IntegerField(default=0, help_text="Total number of views")
+    # Denormalized engagement counters, see counters.py
+    saves_count = models.IntegerField(default=0, editable=False, help_text="Users who saved this listing")
+    contact_reveals_count = models.IntegerField(default=0, editable=False, help_text="Owner contact details revealed")
+    inquiries_count = models.IntegerField(default=0, editable=False, help_text="Distinct users who revealed the contact")
+    rank_score = models.FloatField(default=0, editable=False, help_text="Feed ranking, recomputed by recompute_rank_scores")
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # ?ordering=relevance and the featured feed over live listings
+            models.Index(fields=['verification_status', 'rank_score', 'created_at'], name='property_rank'),
+        ]
+
     def save(self, *args, **kwargs):
         # Auto-set whatsapp_number from owner's phone if not provided
-        if not self.whatsapp_number and self.owner and self.owner.phone_number:
-            self.whatsapp_number = self.owner.phone_number
+        # (only when owner/number changed, so plain updates don't load the owner)
+        if self.has_changed('owner', 'whatsapp_number'):
+            if not self.whatsapp_number and self.owner and self.owner.phone_number:
+                self.whatsapp_number = self.owner.phone_number
         
-        # Auto-calculation logic removed to allow manual entry
-        super().save(*args, **kwargs)
+        if self.has_changed(*self.AMENITY_FIELDS):
+            self.amenities_mask = sum(
+                1 << bit for bit, field in enumerate(self.AMENITY_FIELDS) if getattr(self, field)
+            )
+            if kwargs.get('update_fields') is not None and not set(self.AMENITY_FIELDS).isdisjoint(kwargs['update_fields']):
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'amenities_mask'}
+
+        update_fields = kwargs.get('update_fields')
+        # Keep the location autocomplete counts in step with live listings
+        track_locations = self._writes_changes(self.LOCATION_FIELDS, update_fields)
+        # Neighbour lists (see comparables.py) depend on these
+        track_comparables = self._writes_changes(self.COMPARABLE_FIELDS, update_fields)
+        # New or (un)promoted listings get a score now instead of at the next batch run
+        track_ranking = self._writes_changes(self.RANKING_FIELDS, update_fields)
+        if not (track_locations or track_comparables or track_ranking):
+            # Auto-calculation logic removed to allow manual entry
+            # Only the modified columns are written (see DirtyFieldsMixin)
+            super().save(*args, **kwargs)
+            return
 
+        if track_locations:
+            old_values = None if self._state.adding else self._loaded_location_values()
+            went_live = self.verification_status == 'VERIFIED' and (
+                old_values is None or old_values['verification_status'] != 'VERIFIED'
+            )
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if track_locations:
+                LocationSuggestion.apply(added=self.location_terms(), removed=self.location_terms_for(old_values))
+                if went_live:
+                    # Saved-search alerts go out once the listing is committed
+                    from .saved_searches import notify_saved_search_matches
+                    transaction.on_commit(partial(notify_saved_search_matches, [self.pk]))
+            if track_comparables:
+                # Done by the refresh_comparables --pending worker, not in the request
+                ComparableRefresh.enqueue([self.pk], ComparableRefresh.UPDATE)
+            if track_ranking:
+                from .ranking import recompute_rank_scores
+                transaction.on_commit(partial(recompute_rank_scores, [self.pk]))
+
+    def _writes_changes(self, field_names, update_fields):
+        """True if any of field_names changed and will be written by this save."""
+        return self.has_changed(*field_names) and (
+            update_fields is None or not set(field_names).isdisjoint(update_fields)
+        )
+
+    # Promotion flags that feed rank_score
+    RANKING_FIELDS = ('is_featured', 'priority_listing')
+
+    # Fields that feed PropertyComparable neighbour lists
+    COMPARABLE_FIELDS = (
+        'verification_status', 'listing_type', 'property_type', 'sub_type', 'city', 'locality',
+        'latitude', 'longitude', 'bhk_config', 'carpet_area', 'super_builtup_area', 'plot_area', 'total_price',
+    )
+
+    # Fields that feed LocationSuggestion
+    LOCATION_FIELDS = ('city', 'locality', 'project_name', 'verification_status')
+
+    def location_terms(self):
+        """(kind, term, city) autocomplete entries this listing contributes while live."""
+        return self.location_terms_for({field: getattr(self, field) for field in self.LOCATION_FIELDS})
+
+    @staticmethod
+    def location_terms_for(values):
+        """Same as location_terms() for a dict of LOCATION_FIELDS values."""
+        if not values or values['verification_status'] != 'VERIFIED':
+            return []
+        city = (values['city'] or '').strip()
+        terms = [(kind, values[field], city) for kind, field in (
+            (LocationSuggestion.LOCALITY, 'locality'),
+            (LocationSuggestion.PROJECT, 'project_name'),
+        ) if values[field] and values[field].strip()]
+        if city:
+            terms.append((LocationSuggestion.CITY, city, ''))
+        return terms
+
+    def _loaded_location_values(self):
+        loaded = getattr(self, '_loaded_values', None) or {}
+        if all(field in loaded for field in self.LOCATION_FIELDS):
+            return {field: loaded[field] for field in self.LOCATION_FIELDS}
+        # Loaded with only()/defer(): read the stored values
+        return Property.objects.filter(pk=self.pk).values(*self.LOCATION_FIELDS).first()
+
+    @classmethod
+    def amenities_to_mask(cls, names):
+        """['lift', 'gym'] -> bitmask. Raises KeyError on unknown names."""
+        mask = 0
+        for name in names:
+            mask |= cls.AMENITY_BITS[name]
+        return mask
+
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def mask_to_amenities(mask):
+        """Bitmask -> tuple of amenity names (cached per distinct mask)."""
+        return tuple(name for name, bit in Property.AMENITY_BITS.items() if mask & bit)
 
 
 class PropertyImage(models.Model):
     property = models.ForeignKey(Property, related_name='images', on_delete=models.CASCADE)
-    image = models.ImageField(upload_to='properties/')
+    image = models.ImageField(upload_to='properties/', storage=media_storage)
     is_thumbnail = models.BooleanField(default=False)
 
 class PropertyFloorPlan(models.Model):
     property = models.ForeignKey(Property, related_name='floor_plans', on_delete=models.CASCADE)
-    image = models.ImageField(upload_to='properties/floor_plans/', max_length=255)
+    image = models.ImageField(upload_to='properties/floor_plans/', storage=media_storage, max_length=255)
     floor_number = models.IntegerField(blank=True, null=True, help_text="Floor number (e.g., 0 for ground)")
     floor_name = models.CharField(max_length=100, blank=True, help_text="Floor name/description")
     order = models.IntegerField(default=0, help_text="Display order")
@@ -207,37 +375,276 @@ class SavedProperty(models.Model):
     class Meta:
         unique_together = ('user', 'property')
 
+class SavedSearch(models.Model):
+    """
+    A buyer's saved listing search (PropertyFilter query parameters).
+    Listings that go live and match it are announced via Notification,
+    see saved_searches.notify_saved_search_matches().
+    """
+    MAX_PER_USER = 20
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='saved_searches')
+    name = models.CharField(max_length=100)
+    query = models.JSONField(default=dict, help_text="Validated PropertyFilter parameters")
+    notify = models.BooleanField(default=True, help_text="Send a notification for new matching listings")
+
+    # Match keys derived from query ('' = any); only searches whose keys fit a
+    # new listing are evaluated against it. The city filter is icontains, so
+    # city_key is only set for a value naming exactly one known city
+    city_key = models.CharField(max_length=100, blank=True, editable=False)
+    property_type = models.CharField(max_length=50, blank=True, editable=False)
+
+    last_notified_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['city_key', 'property_type'], name='saved_search_match_keys'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.user})"
+
+    def save(self, *args, **kwargs):
+        self.city_key = exact_city_key(self.query.get('city'))
+        self.property_type = self.query.get('property_type') or ''
+        super().save(*args, **kwargs)
+
 class RecentlyViewed(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     property = models.ForeignKey(Property, on_delete=models.CASCADE)
     viewed_at = models.DateTimeField(auto_now=True)
 
+def normalize_location(value):
+    """Case- and whitespace-insensitive form used for matching location terms."""
+    return ' '.join((value or '').split()).lower()
+
+def exact_city_key(value):
+    """
+    The normalized city if `value` is a known city (LocationSuggestion) that
+    no other known city contains, else '' (a partial name such as "pun"
+    could match several).
+    """
+    key = normalize_location(value)
+    if not key:
+        return ''
+    cities = LocationSuggestion.objects.filter(kind=LocationSuggestion.CITY, normalized__contains=key)
+    return key if list(cities.values_list('normalized', flat=True)[:2]) == [key] else ''
+
+class LocationSuggestion(models.Model):
+    """
+    Autocomplete index: distinct cities, localities and project names of
+    live (VERIFIED) listings with the number of listings using each.
+    Updated incrementally from Property.save()/delete; the
+    rebuild_location_suggestions command recomputes it from scratch.
+    """
+    CITY = 'CITY'
+    LOCALITY = 'LOCALITY'
+    PROJECT = 'PROJECT'
+    KIND_CHOICES = [(CITY, 'City'), (LOCALITY, 'Locality'), (PROJECT, 'Project')]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    term = models.CharField(max_length=255, help_text="Display text (as first listed)")
+    normalized = models.CharField(max_length=255, help_text="Lower-cased, whitespace-collapsed term")
+    city = models.CharField(max_length=100, blank=True, help_text="City of a locality/project; blank for cities")
+    city_key = models.CharField(max_length=100, blank=True, help_text="Normalized city")
+    listing_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'normalized', 'city_key'], name='unique_location_suggestion'),
+        ]
+        indexes = [
+            # Serves "normalized LIKE 'prefix%'" lookups
+            models.Index(fields=['normalized'], name='location_suggestion_prefix', opclasses=['varchar_pattern_ops']),
+        ]
+
+    def __str__(self):
+        return f"{self.term} ({self.get_kind_display()}, {self.listing_count})"
+
+    @staticmethod
+    def _accumulate(deltas, entries, step):
+        # deltas: (kind, normalized, city_key) -> [count, term, city]
+        for kind, term, city in entries:
+            key = (kind, normalize_location(term), normalize_location(city))
+            entry = deltas.setdefault(key, [0, ' '.join(term.split()), ' '.join(city.split())])
+            entry[0] += step
+
+    @classmethod
+    def rebuild(cls):
+        """Recomputes the whole index from the live listings; returns the term count."""
+        counts = {}
+        rows = (
+            Property.objects.filter(verification_status='VERIFIED').order_by()
+            .values(*Property.LOCATION_FIELDS).annotate(listings=Count('pk'))
+        )
+        for row in rows:
+            cls._accumulate(counts, Property.location_terms_for(row), row['listings'])
+
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create([
+                cls(kind=kind, term=term, normalized=normalized, city=city, city_key=city_key, listing_count=count)
+                for (kind, normalized, city_key), (count, term, city) in counts.items()
+            ], batch_size=1000)
+        return len(counts)
+
+    @classmethod
+    def apply(cls, added=(), removed=()):
+        """Applies listing count deltas for (kind, term, city) entries."""
+        deltas = {}
+        cls._accumulate(deltas, added, 1)
+        cls._accumulate(deltas, removed, -1)
+
+        increments = [(key, entry) for key, entry in deltas.items() if entry[0] > 0]
+        decrements = [(key, entry) for key, entry in deltas.items() if entry[0] < 0]
+        if increments:
+            table = cls._meta.db_table
+            rows = ', '.join(['(%s, %s, %s, %s, %s, %s)'] * len(increments))
+            params = []
+            for (kind, normalized, city_key), (count, term, city) in increments:
+                params += [kind, term, normalized, city, city_key, count]
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"""
+                    INSERT INTO {table} (kind, term, normalized, city, city_key, listing_count) VALUES {rows}
+                    ON CONFLICT (kind, normalized, city_key)
+                    DO UPDATE SET listing_count = {table}.listing_count + EXCLUDED.listing_count
+                    """,
+                    params,
+                )
+        if decrements:
+            gone = Q()
+            for (kind, normalized, city_key), (count, term, city) in decrements:
+                match = Q(kind=kind, normalized=normalized, city_key=city_key)
+                cls.objects.filter(match).update(listing_count=Greatest(F('listing_count') + count, 0))
+                gone |= match
+            cls.objects.filter(gone, listing_count=0).delete()
+
+class PropertyComparable(models.Model):
+    """
+    Precomputed neighbour list: the k verified listings most similar to
+    `property` (smaller distance = more similar). Maintained by comparables.py.
+    """
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='comparables')
+    comparable = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='comparable_of')
+    distance = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['property', 'comparable'], name='unique_property_comparable'),
+        ]
+        indexes = [
+            models.Index(fields=['property', 'distance'], name='property_comparable_rank'),
+        ]
+
+    def __str__(self):
+        return f"{self.property_id} ~ {self.comparable_id} ({self.distance:.3f})"
+
+class ComparableRefresh(models.Model):
+    """
+    Neighbour-list work queued by listing saves and deletes (and by reads
+    of never-computed lists), done by the refresh_comparables --pending
+    worker: UPDATE runs comparables.update_comparables() for an edited
+    listing, RECOMPUTE rebuilds the listing's own list from scratch.
+    """
+    UPDATE = 'UPDATE'
+    RECOMPUTE = 'RECOMPUTE'
+
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='+')
+    kind = models.CharField(max_length=10, choices=[(UPDATE, 'Update'), (RECOMPUTE, 'Recompute')])
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            # Queuing the same work twice is a no-op
+            models.UniqueConstraint(fields=['property', 'kind'], name='unique_comparable_refresh'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.property_id}"
+
+    @classmethod
+    def enqueue(cls, property_ids, kind):
+        cls.objects.bulk_create([cls(property_id=pk, kind=kind) for pk in property_ids], ignore_conflicts=True)
+
+class ContactReveal(models.Model):
+    """
+    Append-only audit log of owner contact reveals (get_contact_details).
+    Rows are written in batches by reveals.ContactRevealBuffer and never
+    updated, and keep their ids after the user or listing is deleted
+    (no database constraint, nothing cascades into the log).
+    """
+    property = models.ForeignKey(Property, on_delete=models.DO_NOTHING, db_constraint=False, null=True, related_name='+')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, db_constraint=False, null=True,
+                             related_name='+')
+    ip_address = models.GenericIPAddressField(blank=True, null=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Rows arrive in time order, so a BRIN index stays tiny and cheap to maintain
+            BrinIndex(fields=['created_at'], name='contact_reveal_created_brin'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} -> {self.property_id} @ {self.created_at:%Y-%m-%d %H:%M}"
+
+class ContactRevealRollup(models.Model):
+    """
+    Daily per-user and per-property reveal totals for abuse review,
+    built from ContactReveal by the rollup_contact_reveals command.
+    """
+    USER = 'USER'
+    PROPERTY = 'PROPERTY'
+
+    day = models.DateField()
+    kind = models.CharField(max_length=10, choices=[(USER, 'User'), (PROPERTY, 'Property')])
+    subject_id = models.UUIDField(help_text="User id or Property id, depending on kind")
+    reveals = models.PositiveIntegerField(default=0)
+    distinct_counterparts = models.PositiveIntegerField(default=0, help_text="Distinct listings (per user) or users (per property)")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'kind', 'subject_id'], name='unique_contact_reveal_rollup'),
+        ]
+        indexes = [
+            models.Index(fields=['kind', 'day', '-reveals'], name='contact_reveal_rollup_top'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.kind} {self.subject_id}: {self.reveals}"
+
 @receiver(post_delete, sender=PropertyImage)
+@receiver(post_delete, sender=PropertyFloorPlan)
 def delete_image_file(sender, instance, **kwargs):
-    """Deletes physical image files from storage when the database record is deleted."""
+    """
+    Queues the image for deletion (apps/uploads/tombstones.py) when the
+    database record is deleted; content-addressed files are shared, so the
+    reaper's delete is a refcount decrement.
+    """
     if instance.image:
-        instance.image.delete(save=False)
+        record_deletions([instance.image.name])
 
 @receiver(post_delete, sender=Property)
 def delete_property_files(sender, instance, **kwargs):
-    """Deletes all document files and floor plans when a Property record is deleted."""
-    file_fields = [
-        'floor_plan',
-        'building_commencement_certificate',
-        'building_completion_certificate',
-        'layout_sanction',
-        'layout_order',
-        'na_order_or_gunthewari',
-        'mojani_nakasha',
-        'doc_7_12_or_pr_card',
-        'title_search_report',
-        'rera_project_certificate',
-        'gst_registration',
-        'sale_deed_registration_copy',
-        'electricity_bill',
-        'sale_deed'
-    ]
-    for field_name in file_fields:
-        file_field = getattr(instance, field_name)
-        if file_field:
-            file_field.delete(save=False)
\ No newline at end of file
+    """Queues all document files and floor plans for deletion when a Property record is deleted."""
+    record_deletions([getattr(instance, field_name).name for field_name in ('floor_plan', *Property.DOCUMENT_FIELDS)])
+
+@receiver(post_delete, sender=Property)
+def remove_location_suggestions(sender, instance, **kwargs):
+    """Drops a deleted listing's contribution to the autocomplete index."""
+    terms = instance.location_terms()
+    if terms:
+        LocationSuggestion.apply(removed=terms)
+
+@receiver(pre_delete, sender=Property)
+def refresh_comparables_on_delete(sender, instance, **kwargs):
+    """Lists that contain a deleted listing are queued for recomputation."""
+    from .comparables import comparables_cache_key
+    referencing = list(
+        PropertyComparable.objects.filter(comparable=instance).values_list('property_id', flat=True)
+    )
+    cache.delete(comparables_cache_key(instance.pk))
+    ComparableRefresh.enqueue(referencing, ComparableRefresh.RECOMPUTE)
@@ -0,0 +1,56 @@
+import math
+
+from django.core.cache import cache
+from django.db.models import Case, F, FloatField, Value, When
+from django.db.models.functions import Cast, Exp, Extract, Ln
+from django.utils import timezone
+
+from .models import Property
+
+# rank_score = promotion boosts + freshness + engagement
+FEATURED_BOOST = 10.0
+PRIORITY_BOOST = 5.0
+FRESHNESS_WEIGHT = 4.0
+FRESHNESS_HALF_LIFE_DAYS = 14.0
+VIEWS_WEIGHT = 0.5
+SAVES_WEIGHT = 1.0
+
+FEATURED_CACHE_KEY = 'properties:featured'
+
+
+def _boost(flag, weight):
+    return Case(When(**{flag: True}, then=Value(weight)), default=Value(0.0), output_field=FloatField())
+
+
+def rank_score_expression(now=None):
+    """
+    Database expression for rank_score:
+      FEATURED_BOOST * is_featured + PRIORITY_BOOST * priority_listing
+      + FRESHNESS_WEIGHT * 0.5 ** (age_days / FRESHNESS_HALF_LIFE_DAYS)
+      + VIEWS_WEIGHT * ln(1 + views_count) + SAVES_WEIGHT * ln(1 + saves_count)
+    """
+    now = now or timezone.now()
+    age_days = (Value(now.timestamp()) - Extract('created_at', 'epoch')) / Value(86400.0)
+    return (
+        _boost('is_featured', FEATURED_BOOST)
+        + _boost('priority_listing', PRIORITY_BOOST)
+        + Value(FRESHNESS_WEIGHT) * Exp(age_days * Value(-math.log(2) / FRESHNESS_HALF_LIFE_DAYS))
+        + Value(VIEWS_WEIGHT) * Ln(Value(1.0) + Cast(F('views_count'), FloatField()))
+        + Value(SAVES_WEIGHT) * Ln(Value(1.0) + Cast(F('saves_count'), FloatField()))
+    )
+
+
+def recompute_rank_scores(property_ids=None, batch_size=5000):
+    """
+    Rewrites rank_score for the given listings (default: all) in batched
+    UPDATEs and drops the cached featured feed. Returns the rows updated.
+    """
+    now = timezone.now()
+    if property_ids is None:
+        property_ids = list(Property.objects.order_by().values_list('pk', flat=True))
+    updated = 0
+    for start in range(0, len(property_ids), batch_size):
+        batch = property_ids[start:start + batch_size]
+        updated += Property.objects.filter(pk__in=batch).update(rank_score=rank_score_expression(now))
+    cache.delete(FEATURED_CACHE_KEY)
+    return updated
@@ -0,0 +1,163 @@
+import atexit
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.db.models import Count
+from django.utils import timezone
+from rest_framework import exceptions
+
+from .counters import bump_counters
+from .models import ContactReveal, ContactRevealRollup
+
+logger = logging.getLogger(__name__)
+
+# Repeat reveals by the same user within this window count as one inquiry
+INQUIRY_WINDOW = 30 * 24 * 3600
+
+
+class ContactRevealBuffer:
+    """
+    Per-process batch writer for ContactReveal: rows are queued in memory
+    and written with one bulk INSERT once CONTACT_REVEAL_BUFFER_SIZE rows are
+    queued or the oldest is CONTACT_REVEAL_BUFFER_SECONDS old, and on
+    interpreter exit. Age is checked on append and by a timer started with
+    each batch, so an idle worker still writes its rows; a killed worker
+    loses at most CONTACT_REVEAL_BUFFER_SECONDS of reveals.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows = []
+        self._oldest = None
+
+    def append(self, reveal):
+        with self._lock:
+            if not self._rows:
+                self._oldest = time.monotonic()
+                self._start_timer()
+            self._rows.append(reveal)
+            full = len(self._rows) >= settings.CONTACT_REVEAL_BUFFER_SIZE
+            stale = time.monotonic() - self._oldest >= settings.CONTACT_REVEAL_BUFFER_SECONDS
+            rows = self._take() if full or stale else None
+        if rows:
+            self._write(rows)
+
+    def flush(self):
+        with self._lock:
+            rows = self._take()
+        if rows:
+            self._write(rows)
+        return len(rows)
+
+    def _start_timer(self):
+        timer = threading.Timer(settings.CONTACT_REVEAL_BUFFER_SECONDS, self._flush_from_timer)
+        timer.daemon = True
+        timer.start()
+
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        finally:
+            # The timer thread's own connection
+            connection.close()
+
+    def _take(self):
+        rows, self._rows, self._oldest = self._rows, [], None
+        return rows
+
+    def _write(self, rows):
+        try:
+            ContactReveal.objects.bulk_create(rows, batch_size=1000)
+        except DatabaseError:
+            # Audit rows are best effort; never fail the request over them
+            logger.exception("Dropped %d contact reveal log rows", len(rows))
+
+
+reveal_buffer = ContactRevealBuffer()
+atexit.register(reveal_buffer.flush)
+
+
+def _client_ip(request):
+    # nginx sets X-Real-IP to the connecting address
+    return request.META.get('HTTP_X_REAL_IP') or request.META.get('REMOTE_ADDR') or None
+
+
+def check_reveal_quota(property_obj, user, today):
+    """
+    Enforces CONTACT_REVEAL_DAILY_QUOTA distinct listings per user and day
+    using cache counters only; re-revealing a listing is free. Raises
+    Throttled (429) once the quota is used up.
+    """
+    if user.is_staff:
+        return
+    revealed_key = f'properties:reveal:{user.pk}:{property_obj.pk}:{today}'
+    if not cache.add(revealed_key, 1, 86400):
+        return
+    key = f'properties:reveal-quota:{user.pk}:{today}'
+    cache.add(key, 0, 86400)
+    try:
+        used = cache.incr(key)
+    except ValueError:
+        # Evicted between add() and incr()
+        cache.set(key, 1, 86400)
+        used = 1
+    if used > settings.CONTACT_REVEAL_DAILY_QUOTA:
+        # Not revealed after all: a retry must be refused again
+        cache.delete(revealed_key)
+        tomorrow = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+        raise exceptions.Throttled(
+            wait=(tomorrow - timezone.localtime()).total_seconds(),
+            detail="Daily contact reveal limit reached.",
+        )
+
+
+def record_contact_reveal(property_obj, request):
+    """
+    Quota check, engagement counters and audit log for one reveal of the
+    owner's contact details. Owners looking at their own listing are ignored.
+    """
+    user = request.user
+    if property_obj.owner_id == user.pk:
+        return
+    now = timezone.now()
+    check_reveal_quota(property_obj, user, timezone.localdate(now))
+
+    deltas = {'contact_reveals_count': 1}
+    # First reveal by this user in the window; an evicted key counts one inquiry too many
+    if cache.add(f'properties:inquiry:{property_obj.pk}:{user.pk}', 1, INQUIRY_WINDOW):
+        deltas['inquiries_count'] = 1
+    bump_counters(property_obj.pk, **deltas)
+    reveal_buffer.append(ContactReveal(
+        property_id=property_obj.pk, user_id=user.pk, ip_address=_client_ip(request), created_at=now,
+    ))
+
+
+def rollup_contact_reveals(day):
+    """
+    (Re)builds the ContactRevealRollup rows of one day: reveals and distinct
+    listings per user, reveals and distinct users per listing. The day is
+    read through the BRIN index on created_at. Returns the rows written.
+    """
+    start = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+    log = ContactReveal.objects.filter(created_at__gte=start, created_at__lt=start + timedelta(days=1)).order_by()
+    rollups = [
+        ContactRevealRollup(day=day, kind=ContactRevealRollup.USER, subject_id=row['user'],
+                            reveals=row['reveals'], distinct_counterparts=row['distinct'])
+        for row in log.filter(user__isnull=False).values('user')
+        .annotate(reveals=Count('pk'), distinct=Count('property', distinct=True))
+    ] + [
+        ContactRevealRollup(day=day, kind=ContactRevealRollup.PROPERTY, subject_id=row['property'],
+                            reveals=row['reveals'], distinct_counterparts=row['distinct'])
+        for row in log.filter(property__isnull=False).values('property')
+        .annotate(reveals=Count('pk'), distinct=Count('user', distinct=True))
+    ]
+    ContactRevealRollup.objects.bulk_create(
+        rollups, batch_size=1000, update_conflicts=True,
+        unique_fields=['day', 'kind', 'subject_id'], update_fields=['reveals', 'distinct_counterparts'],
+    )
+    return len(rollups)
@@ -0,0 +1,140 @@
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+from apps.notifications.models import Notification
+
+from .models import Property, SavedSearch, normalize_location
+
+SEARCH_PARAM = 'search'
+
+
+def _search_fields():
+    from .views import PropertyViewSet
+    return PropertyViewSet.search_fields
+
+
+def _filters():
+    from .views import PropertyFilter
+    return PropertyFilter.base_filters
+
+
+def clean_query(data):
+    """
+    Validates raw list query parameters with PropertyFilter and returns the
+    JSON-safe subset worth storing. Raises ValueError with the form errors.
+    """
+    from .views import PropertyFilter
+    params = {
+        key: str(value).strip() for key, value in data.items()
+        if (key in PropertyFilter.base_filters or key == SEARCH_PARAM) and str(value).strip()
+    }
+    filterset = PropertyFilter(data=params, queryset=Property.objects.none())
+    if not filterset.is_valid():
+        raise ValueError(filterset.errors)
+    return params
+
+
+def compile_query(query):
+    """Turns a stored query into a list of predicates over a Property instance."""
+    filters = _filters()
+    predicates = []
+    for key, raw in query.items():
+        if key == SEARCH_PARAM:
+            terms = [term.lower() for term in raw.replace(',', ' ').split()]
+            fields = _search_fields()
+            predicates.append(lambda obj, terms=terms, fields=fields: all(
+                any(term in (getattr(obj, field) or '').lower() for field in fields) for term in terms
+            ))
+            continue
+        if key == 'amenities':
+            mask = Property.amenities_to_mask(name.strip() for name in raw.split(',') if name.strip())
+            predicates.append(lambda obj, mask=mask: obj.amenities_mask & mask == mask)
+            continue
+
+        flt = filters.get(key)
+        if flt is None:
+            continue
+        try:
+            value = flt.field.clean(raw)
+        except ValidationError:
+            # Stored before a filter changed; never matches until re-saved
+            return [lambda obj: False]
+        if value in (None, ''):
+            continue
+        predicates.append(_lookup_predicate(flt.field_name, flt.lookup_expr, value))
+    return predicates
+
+
+def _lookup_predicate(field, lookup, value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        value = Decimal(str(value))
+    if lookup == 'icontains':
+        needle = str(value).lower()
+        return lambda obj: needle in (getattr(obj, field) or '').lower()
+    if lookup == 'gte':
+        return lambda obj: getattr(obj, field) is not None and getattr(obj, field) >= value
+    if lookup == 'lte':
+        return lambda obj: getattr(obj, field) is not None and getattr(obj, field) <= value
+    return lambda obj: getattr(obj, field) == value
+
+
+def notify_saved_search_matches(property_ids):
+    """
+    Matches newly live listings against saved searches and notifies the
+    owners of matching searches (one notification per user and listing).
+
+    Only candidate searches are evaluated: those whose property_type equals
+    the listing's and whose city_key is contained in its city (matching the
+    icontains city filter), or that leave the key open. Candidates for the
+    whole batch are read once through the index on those columns and
+    bucketed by key; each search's query is compiled at most once.
+    """
+    listings = list(Property.objects.filter(pk__in=property_ids, verification_status='VERIFIED'))
+    if not listings:
+        return 0
+
+    listing_cities = {normalize_location(listing.city) for listing in listings}
+    # A handful of distinct cities, read from the index
+    stored_keys = SavedSearch.objects.exclude(city_key='').order_by().values_list('city_key', flat=True).distinct()
+    city_keys = {key for key in stored_keys if any(key in city for city in listing_cities)} | {''}
+    property_types = {listing.property_type for listing in listings} | {''}
+    buckets = {}
+    candidates = SavedSearch.objects.filter(
+        notify=True, city_key__in=city_keys, property_type__in=property_types,
+    ).values_list('city_key', 'property_type', 'id', 'user_id', 'name', 'query')
+    for city_key, property_type, *search in candidates.iterator(chunk_size=2000):
+        buckets.setdefault((city_key, property_type), []).append(search)
+
+    compiled = {}
+    notifications = []
+    matched_search_ids = set()
+    for listing in listings:
+        city = normalize_location(listing.city)
+        notified_users = {listing.owner_id}
+        keys = [
+            (city_key, property_type) for city_key in city_keys if city_key in city
+            for property_type in (listing.property_type, '')
+        ]
+        for key in keys:
+            for search_id, user_id, name, query in buckets.get(key, ()):
+                if user_id in notified_users:
+                    continue
+                predicates = compiled.get(search_id)
+                if predicates is None:
+                    predicates = compiled[search_id] = compile_query(query)
+                if all(predicate(listing) for predicate in predicates):
+                    notified_users.add(user_id)
+                    matched_search_ids.add(search_id)
+                    notifications.append(Notification(
+                        recipient_id=user_id,
+                        title=f"New match for '{name}'",
+                        message=f"{listing.title} in {listing.locality}, {listing.city} matches your saved search.",
+                        action_url=f"/properties/{listing.id}",
+                    ))
+
+    Notification.objects.bulk_create(notifications, batch_size=1000)
+    if matched_search_ids:
+        SavedSearch.objects.filter(id__in=matched_search_ids).update(last_notified_at=timezone.now())
+    return len(notifications)
@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import Property, PropertyImage, PropertyFloorPlan
+from rest_framework.permissions import SAFE_METHODS
+from .models import Property, PropertyImage, PropertyFloorPlan, SavedSearch
 from apps.users.serializers import UserSerializer, PublicUserSerializer
 
 class PropertyImageSerializer(serializers.ModelSerializer):
@@ -12,7 +13,69 @@ class PropertyFloorPlanSerializer(serializers.ModelSerializer):
         model = PropertyFloorPlan
         fields = ['id', 'image', 'floor_number', 'floor_name', 'order', 'created_at']
 
-class PropertySerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """
+    Prunes fields from the request query string before anything is evaluated,
+    so dropped SerializerMethodFields / nested serializers never run.
+
+    ?profile=<name>   predefined field set from FIELD_PROFILES
+    ?fields=a,b,c     explicit field list (used when no profile is given)
+    ?expand=x,y       adds nested fields listed in EXPANDABLE_FIELDS
+    Without any of these, and for writes (so no writable field is silently
+    dropped and the response shows the saved state), the full
+    representation is returned.
+    """
+    FIELD_PROFILES = {}
+    EXPANDABLE_FIELDS = ()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = self.get_requested_fields(self.context.get('request'), self.context.get('profile'))
+        if requested is not None:
+            for name in set(self.fields) - requested:
+                self.fields.pop(name)
+
+    @classmethod
+    def get_requested_fields(cls, request, profile=None):
+        """
+        Returns the set of field names to emit, or None for all of them.
+        An explicit `profile` (e.g. context['profile']) overrides the query string.
+        """
+        if profile is not None:
+            return set(cls.FIELD_PROFILES[profile]) & set(cls.Meta.fields)
+        params = getattr(request, 'query_params', None)
+        if not params or request.method not in SAFE_METHODS:
+            return None
+        profile = params.get('profile')
+        fields = params.get('fields')
+        expand = params.get('expand')
+        if not (profile or fields or expand):
+            return None
+
+        all_fields = set(cls.Meta.fields)
+        if profile in cls.FIELD_PROFILES:
+            selected = set(cls.FIELD_PROFILES[profile])
+        elif fields:
+            selected = {name.strip() for name in fields.split(',')}
+        else:
+            selected = all_fields - set(cls.EXPANDABLE_FIELDS)
+
+        if expand:
+            selected |= {name.strip() for name in expand.split(',')} & set(cls.EXPANDABLE_FIELDS)
+        return selected & all_fields
+
+class AmenitiesField(serializers.Field):
+    """Expands Property.amenities_mask into a list of amenity names."""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('source', 'amenities_mask')
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return list(Property.mask_to_amenities(value))
+
+class PropertySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     images = PropertyImageSerializer(many=True, read_only=True)
     floor_plans = PropertyFloorPlanSerializer(many=True, read_only=True)
     owner_details = PublicUserSerializer(source='owner', read_only=True)
@@ -27,18 +90,22 @@ class PropertySerializer(serializers.ModelSerializer):
     has_active_mandate = serializers.SerializerMethodField()
     active_mandate_id = serializers.SerializerMethodField()
     is_saved = serializers.SerializerMethodField()
+    amenities = AmenitiesField()
+    effective_price_per_sqft = serializers.DecimalField(max_digits=15, decimal_places=2, read_only=True)
+    monthly_maintenance = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
 
     class Meta:
         model = Property
         fields = ['id', 'owner', 'owner_details', 'title', 'description', 'listing_type', 'project_name', 'property_type',
             'property_type_display', 'sub_type', 'sub_type_display', 'verification_status', 'created_at',
             'bhk_config', 'bathrooms', 'balconies', 'furnishing_status', 'furnishing_status_display',
-            'total_price', 'price_per_sqft', 'maintenance_charges', 'maintenance_interval', 'super_builtup_area', 
+            'total_price', 'price_per_sqft', 'effective_price_per_sqft', 'maintenance_charges', 'maintenance_interval',
+            'monthly_maintenance', 'super_builtup_area', 
             'carpet_area', 'plot_area', 'address_line', 'locality', 'city', 'pincode', 'latitude', 'longitude', 
             'landmarks', 'specific_floor', 'total_floors', 'facing', 'facing_display', 'availability_status', 
             'availability_status_display', 'possession_date', 'age_of_construction', 'has_power_backup', 'has_lift', 
             'has_swimming_pool', 'has_club_house', 'has_gym', 'has_park', 'has_reserved_parking', 'has_security',
-            'is_vastu_compliant', 'has_intercom', 'has_piped_gas', 'has_wifi', 'images', 'video_url', 'floor_plan', 
+            'is_vastu_compliant', 'has_intercom', 'has_piped_gas', 'has_wifi', 'amenities', 'images', 'video_url', 'floor_plan', 
             'floor_plans', 'whatsapp_number', 'listed_by', 'listed_by_display', 'building_commencement_certificate',
             'building_completion_certificate', 'layout_sanction', 'layout_order', 'na_order_or_gunthewari',
             'mojani_nakasha', 'doc_7_12_or_pr_card', 'title_search_report', 'has_7_12', 'has_mojani', 
@@ -46,6 +113,61 @@ class PropertySerializer(serializers.ModelSerializer):
             'gst_registration', 'sale_deed_registration_copy', 'electricity_bill', 'sale_deed']
         read_only_fields = ['id', 'owner', 'verification_status', 'created_at']
 
+    EXPANDABLE_FIELDS = ('owner_details', 'images', 'floor_plans')
+    FIELD_PROFILES = {
+        # Listing cards / grids
+        'card': ['id', 'title', 'listing_type', 'property_type', 'property_type_display', 'bhk_config',
+            'total_price', 'effective_price_per_sqft', 'carpet_area', 'locality', 'city', 'verification_status',
+            'images', 'is_saved'],
+        # Public detail page: everything except the raw verification documents
+        'detail': [f for f in Meta.fields if f not in Property.DOCUMENT_FIELDS],
+        'admin': Meta.fields,
+    }
+    # Homepage feed: cards that are the same for every visitor (cacheable)
+    FIELD_PROFILES['feed'] = [f for f in FIELD_PROFILES['card'] if f != 'is_saved']
+
+    # Model columns behind computed fields; other fields map to themselves
+    FIELD_SOURCES = {
+        'owner_details': ['owner'],
+        'property_type_display': ['property_type'],
+        'furnishing_status_display': ['furnishing_status'],
+        'availability_status_display': ['availability_status'],
+        'listed_by_display': ['listed_by'],
+        'facing_display': ['facing'],
+        'sub_type_display': ['sub_type'],
+        'has_7_12': ['doc_7_12_or_pr_card'],
+        'has_mojani': ['mojani_nakasha'],
+        'amenities': ['amenities_mask'],
+        'images': [],
+        'floor_plans': [],
+        'has_active_mandate': [],
+        'active_mandate_id': [],
+        'is_saved': [],
+    }
+
+    @classmethod
+    def optimize_queryset(cls, queryset, request, profile=None):
+        """
+        Tailors the queryset to the requested fields: only() the columns that
+        are rendered and prefetch just the relations that are emitted.
+        """
+        requested = cls.get_requested_fields(request, profile)
+        if requested is None:
+            return queryset.select_related('owner').prefetch_related('images', 'floor_plans')
+
+        # 'owner' stays loaded for the object permission checks
+        columns = {'id', 'owner'}
+        for name in requested:
+            columns.update(cls.FIELD_SOURCES.get(name, [name]))
+        queryset = queryset.only(*columns)
+
+        if 'owner_details' in requested:
+            queryset = queryset.select_related('owner')
+        prefetch = [name for name in ('images', 'floor_plans') if name in requested]
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
+
     def get_has_7_12(self, obj):
         return bool(obj.doc_7_12_or_pr_card)
 
@@ -68,9 +190,47 @@ class PropertySerializer(serializers.ModelSerializer):
             return SavedProperty.objects.filter(user=request.user, property=obj).exists()
         return False
 
+class PropertySummarySerializer(serializers.ModelSerializer):
+    """
+    Compact property card for embedding in other lists (e.g. mandates).
+    Expects 'images' to be prefetched; only the thumbnail URL is emitted.
+    """
+    property_type_display = serializers.CharField(source='get_property_type_display', read_only=True)
+    thumbnail = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Property
+        fields = ['id', 'title', 'property_type', 'property_type_display', 'listing_type', 'city', 'locality',
+            'total_price', 'verification_status', 'thumbnail']
+        read_only_fields = fields
+
+    def get_thumbnail(self, obj):
+        images = list(obj.images.all())
+        if not images:
+            return None
+        image = next((img for img in images if img.is_thumbnail), images[0])
+        request = self.context.get('request')
+        if request:
+            return request.build_absolute_uri(image.image.url)
+        return image.image.url
+
+class ComparablePropertySerializer(PropertySummarySerializer):
+    """Summary card plus the attributes comparables are judged on."""
+    effective_price_per_sqft = serializers.DecimalField(max_digits=15, decimal_places=2, read_only=True)
+
+    class Meta(PropertySummarySerializer.Meta):
+        fields = PropertySummarySerializer.Meta.fields + [
+            'sub_type', 'bhk_config', 'carpet_area', 'super_builtup_area', 'plot_area', 'effective_price_per_sqft',
+        ]
+        read_only_fields = fields
+
 class AdminPropertySerializer(PropertySerializer):
     owner_details = UserSerializer(source='owner', read_only=True)
 
+    class Meta(PropertySerializer.Meta):
+        fields = PropertySerializer.Meta.fields + ['saves_count', 'contact_reveals_count', 'inquiries_count']
+        read_only_fields = PropertySerializer.Meta.read_only_fields + ['saves_count', 'contact_reveals_count', 'inquiries_count']
+
 class ExternalPropertySerializer(serializers.ModelSerializer):
     uploaded_images = serializers.ListField(
         child=serializers.ImageField(max_length=1000000, allow_empty_file=False, use_url=False),
@@ -94,3 +254,29 @@ class ExternalPropertySerializer(serializers.ModelSerializer):
             PropertyImage.objects.create(property=property_instance, image=image)
 
         return property_instance
+
+class SavedSearchSerializer(serializers.ModelSerializer):
+    """`query` takes the same parameters as GET /api/properties/ (e.g. {"city": "Pune", "bhk": "2"})."""
+
+    class Meta:
+        model = SavedSearch
+        fields = ['id', 'name', 'query', 'notify', 'last_notified_at', 'created_at']
+        read_only_fields = ['id', 'last_notified_at', 'created_at']
+
+    def validate_query(self, value):
+        from .saved_searches import clean_query
+        if not isinstance(value, dict):
+            raise serializers.ValidationError("Expected an object of property list filters.")
+        try:
+            query = clean_query(value)
+        except ValueError as exc:
+            raise serializers.ValidationError(exc.args[0])
+        if not query:
+            raise serializers.ValidationError("At least one filter is required.")
+        return query
+
+    def validate(self, attrs):
+        user = self.context['request'].user
+        if self.instance is None and SavedSearch.objects.filter(user=user).count() >= SavedSearch.MAX_PER_USER:
+            raise serializers.ValidationError(f"You can save up to {SavedSearch.MAX_PER_USER} searches.")
+        return attrs
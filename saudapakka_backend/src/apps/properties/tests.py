@@ -1,3 +1,679 @@
-from django.test import TestCase
+import json
+import math
+import threading
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from functools import partial, reduce
+from importlib import import_module
+from operator import or_
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps as django_apps
+from django.db.models import Q
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import Throttled
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from apps.core.renderers import FastJSONRenderer
+from apps.core.tests import make_property, make_user
+from apps.mandates.models import Mandate
+from apps.notifications.models import Notification
+from .fast_serializers import FastPropertyListSerializer
+from .comparables import process_pending_refreshes
+from .counters import reconcile_counters
+from .facets import compute_facets
+from .models import ComparableRefresh, ContactReveal, LocationSuggestion, Property, PropertyComparable, PropertyFloorPlan, PropertyImage, SavedProperty, SavedSearch
+from .ranking import (
+    FEATURED_BOOST, FEATURED_CACHE_KEY, FRESHNESS_HALF_LIFE_DAYS, FRESHNESS_WEIGHT, PRIORITY_BOOST, SAVES_WEIGHT,
+    VIEWS_WEIGHT, rank_score_expression, recompute_rank_scores,
+)
+from .reveals import INQUIRY_WINDOW, ContactRevealBuffer, check_reveal_quota, reveal_buffer
+from .saved_searches import clean_query, compile_query, notify_saved_search_matches
+from .serializers import PropertySerializer
+from .views import PropertyFilter, PropertyViewSet
+
+
+class SparseFieldsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user(1)
+        cls.property = make_property(cls.owner, verification_status='VERIFIED')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        self.url = f'/api/properties/{self.property.pk}/'
+
+    def test_get_is_pruned_to_the_requested_fields(self):
+        response = self.client.get(self.url, {'fields': 'id,title'})
+        self.assertEqual(set(response.data), {'id', 'title'})
+
+    def test_writes_ignore_fields_and_return_the_saved_state(self):
+        response = self.client.patch(
+            f'{self.url}?fields=id,title', {'title': 'Corner flat', 'description': 'Sunny'}, format='multipart',
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(
+            Property.objects.values('title', 'description').get(pk=self.property.pk),
+            {'title': 'Corner flat', 'description': 'Sunny'},
+        )
+        self.assertEqual(response.data['description'], 'Sunny')
+        self.assertIn('images', response.data)
+
+
+class FastPropertyListSerializerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user(1, is_active_seller=True, profile_picture='profile_pictures/owner.jpg')
+        cls.viewer = make_user(2)
+        detailed = make_property(
+            cls.owner, listing_type='RENT', sub_type=None, bhk_config=Decimal('2.5'), bathrooms=2,
+            carpet_area=Decimal('850.50'), furnishing_status='SEMI_FURNISHED', maintenance_charges=Decimal('24000'),
+            maintenance_interval='YEARLY', latitude=18.5074, longitude=73.8077, facing='NORTH_EAST',
+            availability_status='UNDER_CONSTRUCTION', possession_date=date(2027, 3, 1), has_lift=True, has_gym=True,
+            doc_7_12_or_pr_card='properties/docs/7-12.pdf', floor_plan='properties/floor_plans/plan.png',
+        )
+        PropertyImage.objects.create(property=detailed, image='properties/images/a.jpg')
+        PropertyImage.objects.create(property=detailed, image='properties/images/b.jpg', is_thumbnail=True)
+        PropertyFloorPlan.objects.create(property=detailed, image='properties/floor_plans/f1.png', floor_name='Ground')
+        Mandate.objects.create(property_item=detailed, seller=cls.owner, deal_type='WITH_PLATFORM', initiated_by='SELLER')
+        SavedProperty.objects.create(user=cls.viewer, property=detailed)
+        make_property(cls.owner, property_type='PLOT', plot_area=Decimal('1200'), total_price=Decimal('3600000'))
+
+    def assert_parity(self, params, user=None):
+        request = Request(APIRequestFactory().get('/api/properties/', params))
+        if user is not None:
+            request.user = user
+        queryset = Property.objects.order_by('created_at')
+        expected = PropertySerializer(
+            PropertySerializer.optimize_queryset(queryset, request), many=True, context={'request': request},
+        ).data
+        fast = FastPropertyListSerializer(request).serialize(queryset)
+        # Compared as rendered (e.g. PrimaryKeyRelatedField keeps UUID objects until then)
+        render = FastJSONRenderer().render
+        self.assertEqual(json.loads(render(fast)), json.loads(render(expected)))
+        self.assertEqual([list(row) for row in fast], [list(row) for row in expected])
+
+    def test_full_representation_matches(self):
+        self.assert_parity({})
+
+    def test_authenticated_saved_state_matches(self):
+        self.assert_parity({}, user=self.viewer)
+
+    def test_profiles_and_field_selection_match(self):
+        for params in ({'profile': 'card'}, {'profile': 'detail'}, {'fields': 'id,total_price,has_7_12'},
+                       {'fields': 'id,title', 'expand': 'owner_details,floor_plans'}):
+            with self.subTest(params=params):
+                self.assert_parity(params, user=self.viewer)
+
+
+class FacetsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user(1)
+        for values in (
+            dict(property_type='FLAT', bhk_config=2, city='Pune', facing='EAST', total_price=2499999),
+            dict(property_type='FLAT', bhk_config=2, city='Pune', furnishing_status='SEMI_FURNISHED', total_price=2500000),
+            dict(property_type='FLAT', bhk_config=3, city='Mumbai', total_price=9999999),
+            dict(property_type='PLOT', sub_type='RES_PLOT', bhk_config=None, city='Pune', total_price=50000000),
+            dict(property_type='VILLA_BUNGALOW', sub_type='VILLA', availability_status='UNDER_CONSTRUCTION',
+                 bhk_config=4, city='Nashik', total_price=49999999),
+        ):
+            make_property(cls.owner, verification_status='VERIFIED', **values)
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def facet(self, data, name):
+        return [(bucket['value'], bucket['count']) for bucket in data['facets'][name]]
+
+    def test_every_grouping_set_lands_in_its_facet(self):
+        data = compute_facets(Property.objects.all())
+        self.assertEqual(data['total'], 5)
+        self.assertEqual(self.facet(data, 'property_type'), [('FLAT', 3), ('PLOT', 1), ('VILLA_BUNGALOW', 1)])
+        self.assertEqual(self.facet(data, 'sub_type'), [('RES_PLOT', 1), ('VILLA', 1)])
+        self.assertEqual(self.facet(data, 'bhk_config'), [('2.0', 2), ('3.0', 1), ('4.0', 1)])
+        self.assertEqual(self.facet(data, 'furnishing_status'), [('SEMI_FURNISHED', 1)])
+        self.assertEqual(self.facet(data, 'availability_status'), [('READY', 4), ('UNDER_CONSTRUCTION', 1)])
+        self.assertEqual(self.facet(data, 'facing'), [('EAST', 1)])
+        self.assertEqual(self.facet(data, 'city'), [('Pune', 3), ('Mumbai', 1), ('Nashik', 1)])
+        self.assertEqual(data['facets']['property_type'][0]['label'], 'Flat / Apartment')
+
+    def test_price_bands_split_at_their_bounds(self):
+        data = compute_facets(Property.objects.all())
+        self.assertEqual(
+            [(band['value'], band['count']) for band in data['facets']['price_band']],
+            [('under_25l', 1), ('25l_50l', 1), ('50l_1cr', 1), ('2cr_5cr', 1), ('above_5cr', 1)],
+        )
+        self.assertEqual(data['facets']['price_band'][1]['min_price'], 2500000)
+
+    def test_query_that_cannot_match(self):
+        data = compute_facets(Property.objects.filter(pk__in=[]))
+        self.assertEqual(data['total'], 0)
+        self.assertEqual(data['facets']['city'], [])
+        self.assertEqual(data['facets']['price_band'], [])
+
+    def test_equivalent_querystrings_share_a_cache_entry(self):
+        client = APIClient()
+        first = client.get('/api/properties/facets/?city=Pune&property_type=FLAT')
+        self.assertEqual(first.data['total'], 2)
+        make_property(self.owner, verification_status='VERIFIED')
+        # Same filters reordered, padded and with list-only params: cached
+        for query in ('property_type=FLAT&city=Pune', 'city=Pune%20&page=2&ordering=-created_at&property_type=FLAT&q='):
+            self.assertEqual(client.get(f'/api/properties/facets/?{query}').data, first.data)
+        self.assertEqual(client.get('/api/properties/facets/?city=Pune').data['total'], 4)
+
+    def test_cache_entries_are_per_visibility_scope(self):
+        make_property(self.owner, verification_status='PENDING')
+        self.assertEqual(APIClient().get('/api/properties/facets/').data['total'], 5)
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        self.assertEqual(client.get('/api/properties/facets/').data['total'], 6)
+
+
+class AmenitiesMaskTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user(1)
+        cls.lift_gym = make_property(cls.owner, verification_status='VERIFIED', has_lift=True, has_gym=True)
+        cls.lift = make_property(cls.owner, verification_status='VERIFIED', has_lift=True)
+        cls.plot = make_property(cls.owner, verification_status='VERIFIED', property_type='PLOT', has_internal_roads=True)
+
+    def mask(self, prop):
+        return Property.objects.values_list('amenities_mask', flat=True).get(pk=prop.pk)
+
+    def list_ids(self, query):
+        response = APIClient().get(f'/api/properties/?{query}')
+        self.assertEqual(response.status_code, 200, response.data)
+        return {row['id'] for row in response.data}
+
+    def test_mask_follows_the_flags_on_save(self):
+        self.assertEqual(self.mask(self.lift_gym), Property.amenities_to_mask(['lift', 'gym']))
+        self.assertEqual(Property.mask_to_amenities(self.mask(self.plot)), ('internal_roads',))
+
+        prop = Property.objects.get(pk=self.lift.pk)
+        prop.has_lift = False
+        prop.is_vastu_compliant = True
+        prop.save()
+        self.assertEqual(self.mask(prop), Property.AMENITY_BITS['vastu_compliant'])
+
+        prop = Property.objects.get(pk=self.lift.pk)
+        prop.has_wifi = True
+        prop.save(update_fields=['has_wifi'])
+        self.assertEqual(Property.mask_to_amenities(self.mask(prop)), ('vastu_compliant', 'wifi'))
+
+    def test_backfill_migration(self):
+        backfill = import_module('apps.properties.migrations.0019_property_amenities_mask').backfill_amenities_mask
+        expected = dict(Property.objects.values_list('pk', 'amenities_mask'))
+        Property.objects.update(amenities_mask=0)
+        backfill(django_apps, None)
+        self.assertEqual(dict(Property.objects.values_list('pk', 'amenities_mask')), expected)
+        self.assertEqual(expected[self.plot.pk], 1 << Property.AMENITY_FIELDS.index('has_internal_roads'))
+
+    def test_amenities_filter_needs_every_amenity(self):
+        self.assertEqual(self.list_ids('amenities=lift'), {str(self.lift_gym.pk), str(self.lift.pk)})
+        self.assertEqual(self.list_ids('amenities=gym,%20lift'), {str(self.lift_gym.pk)})
+        self.assertEqual(self.list_ids('amenities=lift,internal_roads'), set())
+        self.assertEqual(len(self.list_ids('amenities=,')), 3)
+
+    def test_unknown_amenity_is_a_bad_request(self):
+        response = APIClient().get('/api/properties/?amenities=lift,helipad')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('helipad', str(response.data['amenities']))
+
+
+class DerivedMetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user(1)
+        listing = partial(make_property, cls.owner, verification_status='VERIFIED')
+        cls.carpet = listing(total_price=5000000, carpet_area=1000, super_builtup_area=1400, maintenance_charges=2500)
+        cls.builtup = listing(total_price=5000000, super_builtup_area=1250, maintenance_charges=12000, maintenance_interval='YEARLY')
+        cls.plot = listing(property_type='PLOT', total_price=3000000, plot_area=2000, carpet_area=500)
+        cls.no_area = listing(total_price=4000000, carpet_area=0)
+
+    def metrics(self, prop):
+        return Property.objects.values_list('effective_price_per_sqft', 'monthly_maintenance').get(pk=prop.pk)
+
+    def list_ids(self, query):
+        response = APIClient().get(f'/api/properties/?{query}')
+        self.assertEqual(response.status_code, 200, response.data)
+        return [row['id'] for row in response.data]
+
+    def test_generated_values(self):
+        self.assertEqual(self.metrics(self.carpet), (Decimal('5000.00'), Decimal('2500.00')))
+        self.assertEqual(self.metrics(self.builtup), (Decimal('4000.00'), Decimal('1000.00')))
+        # Plots are priced on plot area even when a carpet area is given
+        self.assertEqual(self.metrics(self.plot)[0], Decimal('1500.00'))
+        # A zero area gives no rate rather than a division error
+        self.assertIsNone(self.metrics(self.no_area)[0])
+
+    def test_values_follow_their_inputs(self):
+        prop = Property.objects.get(pk=self.carpet.pk)
+        prop.carpet_area = 500
+        prop.maintenance_interval = 'YEARLY'
+        prop.save()
+        self.assertEqual(self.metrics(prop), (Decimal('10000.00'), Decimal('208.33')))
+
+    def test_filters_and_ordering(self):
+        carpet, builtup, plot = str(self.carpet.pk), str(self.builtup.pk), str(self.plot.pk)
+        self.assertCountEqual(self.list_ids('min_price_per_sqft=4000'), [carpet, builtup])
+        self.assertCountEqual(self.list_ids('max_price_per_sqft=4000'), [builtup, plot])
+        self.assertCountEqual(self.list_ids('min_price_per_sqft=1600&max_price_per_sqft=4999'), [builtup])
+        self.assertCountEqual(self.list_ids('max_maintenance=1000'), [builtup, plot, str(self.no_area.pk)])
+        self.assertEqual(self.list_ids('min_price_per_sqft=1&ordering=effective_price_per_sqft'), [plot, builtup, carpet])
+
+
+class RankingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user(1)
+        cls.old, cls.new, cls.popular = [make_property(cls.owner, verification_status='VERIFIED') for _ in range(3)]
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def score(self, prop, now):
+        return Property.objects.annotate(score=rank_score_expression(now)).values_list('score', flat=True).get(pk=prop.pk)
+
+    def test_score_expression(self):
+        now = timezone.now()
+        Property.objects.filter(pk=self.old.pk).update(
+            created_at=now - timedelta(days=FRESHNESS_HALF_LIFE_DAYS), is_featured=True, views_count=99, saves_count=4,
+        )
+        expected = FEATURED_BOOST + FRESHNESS_WEIGHT / 2 + VIEWS_WEIGHT * math.log(100) + SAVES_WEIGHT * math.log(5)
+        self.assertAlmostEqual(self.score(self.old, now), expected, places=6)
+        Property.objects.filter(pk=self.new.pk).update(created_at=now, priority_listing=True)
+        self.assertAlmostEqual(self.score(self.new, now), PRIORITY_BOOST + FRESHNESS_WEIGHT, places=6)
+
+    def test_relevance_ordering(self):
+        Property.objects.filter(pk=self.popular.pk).update(rank_score=5)
+        Property.objects.filter(pk__in=[self.old.pk, self.new.pk]).update(rank_score=1)
+        Property.objects.filter(pk=self.old.pk).update(created_at=timezone.now() - timedelta(days=1))
+        response = APIClient().get('/api/properties/?ordering=relevance')
+        self.assertEqual([row['id'] for row in response.data], [str(p.pk) for p in (self.popular, self.new, self.old)])
+
+    def test_promotion_refreshes_the_featured_feed(self):
+        recompute_rank_scores()
+        feed = APIClient().get('/api/properties/featured/').data
+        self.assertNotEqual(feed[0]['id'], str(self.old.pk))
+
+        prop = Property.objects.get(pk=self.old.pk)
+        prop.is_featured = True
+        with self.captureOnCommitCallbacks(execute=True):
+            prop.save()
+        self.assertIsNone(cache.get(FEATURED_CACHE_KEY))
+        self.assertEqual(APIClient().get('/api/properties/featured/').data[0]['id'], str(self.old.pk))
+
+    def test_unrelated_saves_keep_the_feed(self):
+        APIClient().get('/api/properties/featured/')
+        prop = Property.objects.get(pk=self.old.pk)
+        prop.title = 'Renamed'
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            prop.save()
+        self.assertEqual(callbacks, [])
+        self.assertIsNotNone(cache.get(FEATURED_CACHE_KEY))
+
+
+class LocationSuggestionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user(1)
+
+    def index(self):
+        return {
+            (row.kind, row.term, row.city): row.listing_count
+            for row in LocationSuggestion.objects.all()
+        }
+
+    def assert_matches_rebuild(self):
+        # Display terms are "as first listed", so compare the normalized keys
+        def counts():
+            return {
+                (kind, normalized, city_key): count for kind, normalized, city_key, count in
+                LocationSuggestion.objects.values_list('kind', 'normalized', 'city_key', 'listing_count')
+            }
+        incremental = counts()
+        LocationSuggestion.rebuild()
+        self.assertEqual(counts(), incremental)
+
+    def test_only_live_listings_are_indexed(self):
+        make_property(self.owner, locality='Baner')
+        self.assertEqual(self.index(), {})
+        make_property(self.owner, locality='Baner', project_name='Green Park', verification_status='VERIFIED')
+        make_property(self.owner, locality=' baner ', verification_status='VERIFIED')
+        self.assertEqual(self.index(), {
+            ('CITY', 'Pune', ''): 2, ('LOCALITY', 'Baner', 'Pune'): 2, ('PROJECT', 'Green Park', 'Pune'): 1,
+        })
+        self.assert_matches_rebuild()
+
+    def test_edits_and_deletes_move_the_counts(self):
+        prop = make_property(self.owner, locality='Baner', verification_status='VERIFIED')
+        make_property(self.owner, locality='Aundh', verification_status='VERIFIED')
+        prop = Property.objects.get(pk=prop.pk)
+        prop.locality = 'Aundh'
+        prop.save()
+        self.assertEqual(self.index(), {('CITY', 'Pune', ''): 2, ('LOCALITY', 'Aundh', 'Pune'): 2})
+
+        prop.verification_status = 'REJECTED'
+        prop.save()
+        self.assertEqual(self.index(), {('CITY', 'Pune', ''): 1, ('LOCALITY', 'Aundh', 'Pune'): 1})
+        self.assert_matches_rebuild()
+
+        Property.objects.filter(verification_status='VERIFIED').get().delete()
+        self.assertEqual(self.index(), {})
+
+    def test_suggest_ranks_by_listings_within_a_city(self):
+        for locality, listings in (('Baner', 1), ('Balewadi', 3)):
+            for _ in range(listings):
+                make_property(self.owner, locality=locality, verification_status='VERIFIED')
+        make_property(self.owner, city='Mumbai', locality='Bandra', verification_status='VERIFIED')
+        client = APIClient()
+
+        with self.assertNumQueries(1):
+            response = client.get('/api/properties/suggest/', {'q': ' BA', 'city': 'pune'})
+        self.assertEqual([(row['term'], row['count']) for row in response.data], [('Balewadi', 3), ('Baner', 1)])
+        response = client.get('/api/properties/suggest/', {'q': 'mum', 'kind': 'city'})
+        self.assertEqual(response.data, [{'kind': 'CITY', 'term': 'Mumbai', 'city': None, 'count': 1}])
+        self.assertEqual(client.get('/api/properties/suggest/', {'q': ''}).data, [])
+
+
+class SavedSearchAlertTests(TestCase):
+    QUERIES = [
+        {'city': 'Pune'},
+        {'city': 'pune', 'property_type': 'FLAT', 'max_price': '6000000'},
+        {'min_price': '6000000'},
+        {'bhk': '2', 'furnishing_status': 'SEMI_FURNISHED'},
+        {'amenities': 'lift,gym'},
+        {'min_price_per_sqft': '5000', 'max_maintenance': '2500'},
+        {'search': 'kothrud corner'},
+        {'listing_type': 'RENT', 'locality': 'kothrud'},
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user(1)
+        cls.buyer = make_user(2)
+        cls.listings = [
+            make_property(cls.owner, title='Corner flat', bhk_config=Decimal('2'), carpet_area=Decimal('900'),
+                          furnishing_status='SEMI_FURNISHED', has_lift=True, has_gym=True,
+                          maintenance_charges=Decimal('24000'), maintenance_interval='YEARLY'),
+            make_property(cls.owner, city='Mumbai', locality='Bandra', total_price=Decimal('25000000'),
+                          carpet_area=Decimal('1000'), has_lift=True),
+            make_property(cls.owner, listing_type='RENT', property_type='PLOT', total_price=Decimal('30000'),
+                          plot_area=Decimal('2000')),
+        ]
+
+    def test_compiled_queries_agree_with_property_filter(self):
+        for query in self.QUERIES:
+            params = clean_query(query)
+            predicates = compile_query(params)
+            filtered = PropertyFilter(data=params, queryset=Property.objects.all()).qs
+            for term in params.get('search', '').split():
+                # SearchFilter: every term in at least one search field
+                filtered = filtered.filter(reduce(or_, (
+                    Q(**{f'{field}__icontains': term}) for field in PropertyViewSet.search_fields
+                )))
+            expected = set(filtered.values_list('pk', flat=True))
+            for listing in Property.objects.filter(pk__in=[p.pk for p in self.listings]):
+                with self.subTest(query=query, listing=listing.title):
+                    self.assertEqual(all(p(listing) for p in predicates), listing.pk in expected)
+
+    def test_listing_going_live_notifies_matching_searches_once_per_user(self):
+        SavedSearch.objects.create(user=self.buyer, name='Pune flats', query=clean_query({'city': 'Pune', 'property_type': 'FLAT'}))
+        SavedSearch.objects.create(user=self.buyer, name='With lift', query=clean_query({'amenities': 'lift'}))
+        SavedSearch.objects.create(user=self.buyer, name='Mumbai', query=clean_query({'city': 'Mumbai'}))
+        SavedSearch.objects.create(user=self.buyer, name='Muted', query={}, notify=False)
+        # Owners are not told about their own listing
+        SavedSearch.objects.create(user=self.owner, name='Mine', query={})
+
+        listing = Property.objects.get(pk=self.listings[0].pk)
+        listing.verification_status = 'VERIFIED'
+        with self.captureOnCommitCallbacks(execute=True):
+            listing.save()
+
+        notifications = Notification.objects.filter(action_url=f'/properties/{listing.pk}')
+        self.assertEqual([n.recipient_id for n in notifications], [self.buyer.pk])
+        self.assertEqual(SavedSearch.objects.filter(last_notified_at__isnull=False).count(), 1)
+        # Not live: nothing to announce
+        self.assertEqual(notify_saved_search_matches([self.listings[1].pk]), 0)
+
+    def test_partial_city_searches_are_alerted(self):
+        LocationSuggestion.objects.create(kind='CITY', term='Pune', normalized='pune', listing_count=1)
+        LocationSuggestion.objects.create(kind='CITY', term='Navi Mumbai', normalized='navi mumbai', listing_count=1)
+        exact = SavedSearch.objects.create(user=self.buyer, name='Pune', query=clean_query({'city': ' PUNE '}))
+        partial = SavedSearch.objects.create(user=make_user(4), name='Pun', query=clean_query({'city': 'pun'}))
+        navi = SavedSearch.objects.create(user=make_user(3), name='Navi', query=clean_query({'city': 'Navi'}))
+        self.assertEqual((exact.city_key, partial.city_key, navi.city_key), ('pune', '', ''))
+        # Stored before partial names got the open key: still found by containment
+        SavedSearch.objects.filter(pk=partial.pk).update(city_key='pun')
+
+        Property.objects.filter(pk__in=[p.pk for p in self.listings]).update(verification_status='VERIFIED')
+        Property.objects.filter(pk=self.listings[1].pk).update(city='Navi Mumbai')
+        notify_saved_search_matches([self.listings[0].pk, self.listings[1].pk])
+
+        notified = set(Notification.objects.values_list('title', 'action_url'))
+        self.assertIn(("New match for 'Pun'", f'/properties/{self.listings[0].pk}'), notified)
+        self.assertIn(("New match for 'Navi'", f'/properties/{self.listings[1].pk}'), notified)
+        self.assertNotIn(("New match for 'Pune'", f'/properties/{self.listings[1].pk}'), notified)
+
+
+class ComparablesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user(1)
+        cls.listings = [
+            make_property(cls.owner, verification_status='VERIFIED', carpet_area=Decimal(800 + 50 * n),
+                          total_price=Decimal(5000000 + 250000 * n))
+            for n in range(4)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def queue(self):
+        return set(ComparableRefresh.objects.values_list('property_id', 'kind'))
+
+    def test_saves_queue_work_instead_of_computing(self):
+        self.assertEqual(PropertyComparable.objects.count(), 0)
+        self.assertEqual(self.queue(), {(p.pk, 'UPDATE') for p in self.listings})
+
+        self.assertEqual(process_pending_refreshes(), 4)
+        self.assertEqual(self.queue(), set())
+        subject = self.listings[0]
+        self.assertEqual(PropertyComparable.objects.filter(property=subject).count(), 3)
+
+        subject = Property.objects.get(pk=subject.pk)
+        subject.total_price = Decimal('9000000')
+        with self.captureOnCommitCallbacks(execute=True):
+            subject.save()
+        self.assertEqual(self.queue(), {(subject.pk, 'UPDATE')})
+
+    def test_reading_a_missing_list_queues_it_and_returns_empty(self):
+        ComparableRefresh.objects.all().delete()
+        subject = self.listings[0]
+        url = f'/api/properties/{subject.pk}/comparables/'
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.get(url)
+        self.assertEqual(response.data, {'comparables': [], 'median_price_per_sqft': None})
+        self.assertEqual(PropertyComparable.objects.count(), 0)
+        self.assertEqual(self.queue(), {(subject.pk, 'RECOMPUTE')})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            process_pending_refreshes()
+        response = self.client.get(url)
+        self.assertEqual(len(response.data['comparables']), 3)
+
+    def test_deletes_queue_the_lists_that_contained_the_listing(self):
+        process_pending_refreshes()
+        gone = self.listings[3]
+        gone.delete()
+        referencing = {p.pk for p in self.listings[:3]}
+        self.assertEqual(self.queue(), {(pk, 'RECOMPUTE') for pk in referencing})
+        process_pending_refreshes()
+        self.assertFalse(PropertyComparable.objects.filter(comparable_id=gone.pk).exists())
+        self.assertEqual(PropertyComparable.objects.filter(property_id__in=referencing).count(), 6)
+
+    def test_deleting_an_owner_cascades_through_queued_work(self):
+        process_pending_refreshes()
+        self.owner.delete()
+        self.assertEqual(self.queue(), set())
+        # Deferred foreign keys are only checked at commit
+        connection.check_constraints()
+
+
+class PropertyCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user(1)
+        cls.buyers = [make_user(n) for n in (2, 3)]
+        cls.property = make_property(cls.owner, verification_status='VERIFIED')
+        cls.other = make_property(cls.owner, verification_status='VERIFIED')
+
+    def saves_count(self, prop=None):
+        return Property.objects.values_list('saves_count', flat=True).get(pk=(prop or self.property).pk)
+
+    def toggle(self, buyer):
+        client = APIClient()
+        client.force_authenticate(buyer)
+        return client.post(f'/api/properties/{self.property.pk}/save_property/').status_code
+
+    def test_save_toggle_keeps_the_count_exact(self):
+        first, second = self.buyers
+        self.assertEqual([self.toggle(first), self.toggle(second)], [201, 201])
+        self.assertEqual(self.saves_count(), 2)
+        self.assertEqual(self.toggle(first), 200)
+        self.assertEqual(self.saves_count(), 1)
+        self.assertEqual(self.toggle(first), 201)
+        self.assertEqual(self.saves_count(), SavedProperty.objects.filter(property=self.property).count())
+
+    def test_reconcile_fixes_only_drifted_rows(self):
+        for buyer in self.buyers:
+            self.toggle(buyer)
+        self.assertEqual(reconcile_counters(), 0)
+
+        Property.objects.filter(pk=self.property.pk).update(saves_count=7)
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(reconcile_counters(batch_size=1), 1)
+        updates = [q['sql'] for q in context.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 2)  # one per batch, each touching only drifted rows
+        self.assertEqual((self.saves_count(), self.saves_count(self.other)), (2, 0))
+        self.assertEqual(reconcile_counters(), 0)
+
+
+class SaveToggleConcurrencyTests(TransactionTestCase):
+    def test_concurrent_toggles_keep_the_count_exact(self):
+        buyer = make_user(2)
+        prop = make_property(make_user(1), verification_status='VERIFIED')
+        SavedProperty.objects.create(user=buyer, property=prop)
+        Property.objects.filter(pk=prop.pk).update(saves_count=1)
+        threads = 6
+        statuses, errors = [], []
+        barrier = threading.Barrier(threads)
+
+        def toggle():
+            try:
+                client = APIClient()
+                client.force_authenticate(buyer)
+                barrier.wait()
+                statuses.append(client.post(f'/api/properties/{prop.pk}/save_property/').status_code)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=toggle) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(errors, [])
+        saves = Property.objects.values_list('saves_count', flat=True).get(pk=prop.pk)
+        self.assertEqual(saves, SavedProperty.objects.filter(property=prop).count())
+
+
+@override_settings(CONTACT_REVEAL_DAILY_QUOTA=2)
+class RevealQuotaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user(1)
+        cls.buyer = make_user(2)
+        cls.listings = [make_property(cls.owner) for _ in range(3)]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_throttled_listing_stays_throttled_on_retry(self):
+        today = date(2026, 10, 19)
+        first, second, third = self.listings
+        check_reveal_quota(first, self.buyer, today)
+        check_reveal_quota(second, self.buyer, today)
+        for _ in range(2):
+            with self.assertRaises(Throttled):
+                check_reveal_quota(third, self.buyer, today)
+        # Listings revealed within the quota stay free
+        check_reveal_quota(first, self.buyer, today)
+        check_reveal_quota(third, self.buyer, date(2026, 10, 20))
+
+
+class RevealCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = make_user(1)
+        cls.buyer = make_user(2)
+        cls.property = make_property(cls.owner, verification_status='VERIFIED')
+
+    def setUp(self):
+        cache.clear()
+        # Buffered rows are written inside the test transaction
+        self.addCleanup(reveal_buffer.flush)
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+
+    def reveal(self):
+        response = self.client.get(f'/api/properties/{self.property.pk}/get_contact_details/')
+        self.assertEqual(response.status_code, 200)
+
+    def counts(self):
+        return tuple(Property.objects.values_list('contact_reveals_count', 'inquiries_count').get(pk=self.property.pk))
+
+    def test_repeat_reveals_in_the_window_are_one_inquiry(self):
+        self.reveal()
+        self.reveal()
+        self.assertEqual(self.counts(), (2, 1))
+        later = time.time() + INQUIRY_WINDOW + 1
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=later):
+            self.reveal()
+        self.assertEqual(self.counts(), (3, 2))
+
+    def test_reconcile_leaves_reveal_counters_alone(self):
+        self.reveal()
+        # The log rows are still buffered, or were dropped
+        self.assertFalse(ContactReveal.objects.exists())
+        self.assertEqual(reconcile_counters(), 0)
+        self.assertEqual(self.counts(), (1, 1))
+
+
+class ContactRevealBufferTests(TransactionTestCase):
+    @override_settings(CONTACT_REVEAL_BUFFER_SIZE=100, CONTACT_REVEAL_BUFFER_SECONDS=0.2)
+    def test_idle_buffer_is_written_by_its_timer(self):
+        buffer = ContactRevealBuffer()
+        buffer.append(ContactReveal(ip_address='10.0.0.1'))
+        self.assertEqual(ContactReveal.objects.count(), 0)
+        for _ in range(50):
+            if ContactReveal.objects.exists():
+                break
+            time.sleep(0.05)
+        self.assertEqual(list(ContactReveal.objects.values_list('ip_address', flat=True)), ['10.0.0.1'])
+        self.assertEqual(buffer.flush(), 0)
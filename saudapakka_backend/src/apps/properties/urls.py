@@ -1,9 +1,10 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import PropertyViewSet, ExternalPropertyCreateView
+from .views import PropertyViewSet, SavedSearchViewSet, ExternalPropertyCreateView
 
 router = DefaultRouter()
 router.register(r'properties', PropertyViewSet, basename='property')
+router.register(r'saved-searches', SavedSearchViewSet, basename='saved-search')
 
 urlpatterns = [
     path('properties/external/create/', ExternalPropertyCreateView.as_view(), name='external-property-create'),
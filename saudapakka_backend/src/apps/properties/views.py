@@ -3,13 +3,27 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.db.models import F, Q
+from django.shortcuts import get_object_or_404
 import django_filters
-
-from .models import Property, PropertyImage, SavedProperty, RecentlyViewed
-
-from .serializers import PropertySerializer, PropertyImageSerializer, ExternalPropertySerializer
+import hashlib
+from urllib.parse import urlencode
+
+from .models import Property, PropertyImage, SavedProperty, SavedSearch, RecentlyViewed, LocationSuggestion, normalize_location
+
+from .serializers import PropertySerializer, PropertyImageSerializer, ExternalPropertySerializer, SavedSearchSerializer
+from .fast_serializers import FastPropertyListSerializer
+from .facets import compute_facets
+from .comparables import get_comparables
+from .counters import bump_counters
+from .reveals import record_contact_reveal
+from .ranking import FEATURED_CACHE_KEY
 from apps.users.authentication import APIKeyAuthentication
+from apps.users.throttling import APIKeyRateThrottle
 
 from rest_framework.renderers import JSONRenderer
 
@@ -17,7 +31,7 @@ class ExternalPropertyCreateView(generics.CreateAPIView):
     """
     Dedicated endpoint for WhatsApp Bots / Automation.
     Authentication: X-API-KEY header (APIKeyAuthentication).
-    Rate Limit: None.
+    Rate Limit: per key (APIKeyRateThrottle, quotas on ExternalAPIKey).
     Parser: Multipart (Images involved).
     """
     authentication_classes = [APIKeyAuthentication]
@@ -25,7 +39,7 @@ class ExternalPropertyCreateView(generics.CreateAPIView):
     serializer_class = ExternalPropertySerializer
     parser_classes = [MultiPartParser, FormParser]
     renderer_classes = [JSONRenderer]
-    throttle_classes = [] # No rate limit
+    throttle_classes = [APIKeyRateThrottle]
 
     def perform_create(self, serializer):
         # Additional logic if needed, but serializer handles mostly
@@ -34,6 +48,19 @@ from .permissions import IsOwnerOrReadOnly
 
 # --- ADVANCED FILTERING LOGIC ---
 
+def _split_amenities(value):
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def validate_amenities(value):
+    unknown = [name for name in _split_amenities(value) if name not in Property.AMENITY_BITS]
+    if unknown:
+        raise DjangoValidationError(
+            f"Unknown amenities: {', '.join(unknown)}. "
+            f"Valid choices: {', '.join(Property.AMENITY_BITS)}."
+        )
+
+
 class PropertyFilter(django_filters.FilterSet):
     # Professional Price Range Filters
     min_price = django_filters.NumberFilter(field_name="total_price", lookup_expr='gte')
@@ -41,10 +68,18 @@ class PropertyFilter(django_filters.FilterSet):
     
     # Area Filters
     min_area = django_filters.NumberFilter(field_name="carpet_area", lookup_expr='gte')
+
+    # Derived metrics (database-generated, indexed)
+    min_price_per_sqft = django_filters.NumberFilter(field_name="effective_price_per_sqft", lookup_expr='gte')
+    max_price_per_sqft = django_filters.NumberFilter(field_name="effective_price_per_sqft", lookup_expr='lte')
+    max_maintenance = django_filters.NumberFilter(field_name="monthly_maintenance", lookup_expr='lte')
     
     # Exact Match Filters
     city = django_filters.CharFilter(field_name="city", lookup_expr='icontains')
     bhk = django_filters.NumberFilter(field_name="bhk_config")
+
+    # Amenities: ?amenities=lift,gym,swimming_pool (all must be present)
+    amenities = django_filters.CharFilter(method='filter_amenities', validators=[validate_amenities])
     
     class Meta:
         model = Property
@@ -53,6 +88,28 @@ class PropertyFilter(django_filters.FilterSet):
             'furnishing_status', 'availability_status', 'facing'
         ]
 
+    def filter_amenities(self, queryset, name, value):
+        mask = Property.amenities_to_mask(_split_amenities(value))
+        if not mask:
+            return queryset
+        # One bitwise test against amenities_mask instead of a predicate per flag
+        return queryset.alias(
+            _amenities_hit=F('amenities_mask').bitand(mask)
+        ).filter(_amenities_hit=mask)
+
+class PropertyOrderingFilter(filters.OrderingFilter):
+    """OrderingFilter plus named orderings, e.g. ?ordering=relevance."""
+    ALIASES = {
+        # Precomputed rank_score (see ranking.py), newest first on ties
+        'relevance': ['-rank_score', '-created_at'],
+    }
+
+    def remove_invalid_fields(self, queryset, fields, view, request):
+        expanded = []
+        for term in fields:
+            expanded += self.ALIASES.get(term.strip(), [term])
+        return super().remove_invalid_fields(queryset, expanded, view, request)
+
 # --- MAIN VIEWSET ---
 
 class PropertyViewSet(viewsets.ModelViewSet):
@@ -63,10 +120,11 @@ class PropertyViewSet(viewsets.ModelViewSet):
     parser_classes = [MultiPartParser, FormParser] 
     
     # Filtering & Search Configuration
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, PropertyOrderingFilter]
     filterset_class = PropertyFilter
     search_fields = ['title', 'project_name', 'address_line', 'locality', 'city', 'landmarks']
-    ordering_fields = ['total_price', 'created_at', 'super_builtup_area']
+    ordering_fields = ['total_price', 'created_at', 'super_builtup_area', 'effective_price_per_sqft', 'monthly_maintenance',
+        'rank_score']
 
     def get_queryset(self):
         """
@@ -74,9 +132,17 @@ class PropertyViewSet(viewsets.ModelViewSet):
         1. Admin: Everything.
         2. Owners: Verified + Their Own (Pending/Rejected).
         3. Public: Verified Only.
+
+        Read requests accept ?profile=card|detail|admin, ?fields= and ?expand=
+        (see SparseFieldsMixin) to trim both the payload and the query.
         """
         user = self.request.user
-        base_query = Property.objects.all().prefetch_related('images').select_related('owner')
+        base_query = Property.objects.all()
+        if self.request.method in permissions.SAFE_METHODS:
+            # Honour ?profile= / ?fields= / ?expand= in the SQL projection too
+            base_query = PropertySerializer.optimize_queryset(base_query, self.request)
+        else:
+            base_query = base_query.prefetch_related('images').select_related('owner')
 
         if user.is_staff:
             return base_query.order_by('-created_at')
@@ -89,6 +155,110 @@ class PropertyViewSet(viewsets.ModelViewSet):
             
         return base_query.filter(verification_status='VERIFIED').order_by('-created_at')
 
+    def list(self, request, *args, **kwargs):
+        """
+        Read-only list responses go through FastPropertyListSerializer, which
+        renders the same payload as PropertySerializer straight from values().
+        """
+        if self.paginator is not None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(FastPropertyListSerializer(request).serialize(queryset))
+
+    FACETS_IGNORED_PARAMS = ('page', 'page_size', 'ordering', 'profile', 'fields', 'expand', 'format')
+
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """
+        Facet counts (type, sub-type, BHK, furnishing, availability, facing,
+        city, price band) for the current list filters. Accepts the same query
+        parameters as the list endpoint. Cached per normalized filter set.
+        """
+        cache_key = self._facets_cache_key(request)
+        data = cache.get(cache_key)
+        if data is None:
+            data = compute_facets(self.filter_queryset(self.get_queryset()))
+            cache.set(cache_key, data, settings.PROPERTY_FACETS_CACHE_TIMEOUT)
+        return Response(data)
+
+    def _facets_cache_key(self, request):
+        # Same filters in any order/spelling share an entry; visibility differs
+        # per user (owners also see their own unverified listings).
+        params = sorted(
+            (key, value.strip())
+            for key, values in request.query_params.lists() if key not in self.FACETS_IGNORED_PARAMS
+            for value in values if value.strip()
+        )
+        user = request.user
+        if user.is_staff:
+            scope = 'staff'
+        elif user.is_authenticated:
+            scope = f'user:{user.pk}'
+        else:
+            scope = 'public'
+        digest = hashlib.md5(urlencode(params).encode()).hexdigest()
+        return f'properties:facets:{scope}:{digest}'
+
+    FEATURED_LIMIT = 12
+
+    @action(detail=False, methods=['get'])
+    def featured(self, request):
+        """
+        Homepage feed: top live listings by rank_score (featured/priority
+        boosts, freshness, views, saves). Identical for every visitor, so
+        it is cached and dropped whenever scores are recomputed.
+        """
+        data = cache.get(FEATURED_CACHE_KEY)
+        if data is None:
+            listings = PropertySerializer.optimize_queryset(
+                Property.objects.filter(verification_status='VERIFIED'), request, profile='feed'
+            ).order_by('-rank_score', '-created_at')[:self.FEATURED_LIMIT]
+            data = PropertySerializer(listings, many=True, context={'request': request, 'profile': 'feed'}).data
+            cache.set(FEATURED_CACHE_KEY, data, settings.PROPERTY_FEATURED_CACHE_TIMEOUT)
+        return Response(data)
+
+    @action(detail=True, methods=['get'])
+    def comparables(self, request, pk=None):
+        """
+        Similar verified listings (precomputed neighbour lists, see
+        comparables.py) with their median price per sqft. Cached per property.
+        """
+        # Light lookup instead of get_object(): no prefetching needed here
+        property_obj = get_object_or_404(
+            self.filter_queryset(self.get_queryset()).only('id', 'owner', 'verification_status').prefetch_related(None),
+            pk=pk,
+        )
+        return Response(get_comparables(property_obj, request))
+
+    SUGGEST_LIMIT = 10
+
+    @action(detail=False, methods=['get'])
+    def suggest(self, request):
+        """
+        Location autocomplete: ?q=<prefix>, optional ?city= (localities and
+        projects within a city) and ?kind=CITY|LOCALITY|PROJECT.
+        Served from the LocationSuggestion prefix index, ranked by listings.
+        """
+        prefix = normalize_location(request.query_params.get('q'))
+        if not prefix:
+            return Response([])
+
+        suggestions = LocationSuggestion.objects.filter(normalized__startswith=prefix)
+        city = normalize_location(request.query_params.get('city'))
+        if city:
+            suggestions = suggestions.filter(city_key=city).exclude(kind=LocationSuggestion.CITY)
+        kind = request.query_params.get('kind', '').upper()
+        if kind:
+            suggestions = suggestions.filter(kind=kind)
+
+        rows = suggestions.order_by('-listing_count', 'normalized').values(
+            'kind', 'term', 'city', 'listing_count')[:self.SUGGEST_LIMIT]
+        return Response([
+            {'kind': row['kind'], 'term': row['term'], 'city': row['city'] or None, 'count': row['listing_count']}
+            for row in rows
+        ])
+
     def _check_kyc_required(self, user):
         """
         Optimized KYC check using cached field - NO database queries!
@@ -205,8 +375,9 @@ class PropertyViewSet(viewsets.ModelViewSet):
         """
         property_obj = self.get_object()
         
-        # In a real scenario, we might want to log who accessed whose contact info
-        # or implement a credit system/subscription check here.
+        # Daily quota (429 when exceeded), engagement counters and the
+        # ContactReveal audit log; see reveals.py
+        record_contact_reveal(property_obj, request)
         
         owner = property_obj.owner
         contact_info = {
@@ -223,9 +394,16 @@ class PropertyViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def save_property(self, request, pk=None):
         property_obj = self.get_object()
-        saved_item, created = SavedProperty.objects.get_or_create(user=request.user, property=property_obj)
+        with transaction.atomic():
+            saved_item, created = SavedProperty.objects.get_or_create(user=request.user, property=property_obj)
+            if created:
+                bump_counters(property_obj.pk, saves_count=1)
+            else:
+                # A concurrent toggle may have removed it already: count what this one deleted
+                deleted, _ = SavedProperty.objects.filter(pk=saved_item.pk).delete()
+                if deleted:
+                    bump_counters(property_obj.pk, saves_count=-deleted)
         if not created:
-            saved_item.delete()
             return Response({'message': 'Removed from saved'}, status=200)
         return Response({'message': 'Saved successfully'}, status=201)
 
@@ -302,4 +480,19 @@ class PropertyViewSet(viewsets.ModelViewSet):
              self.perform_destroy(property_obj)
              return Response({"message": "Property deleted by authorized Broker."}, status=status.HTTP_204_NO_CONTENT)
 
-        return Response({"error": "Unauthorized: You do not have permission to delete this property."}, status=403)
\ No newline at end of file
+        return Response({"error": "Unauthorized: You do not have permission to delete this property."}, status=403)
+
+
+class SavedSearchViewSet(viewsets.ModelViewSet):
+    """
+    Buyer's saved searches. New listings matching one trigger a notification
+    when they go live (see saved_searches.py).
+    """
+    serializer_class = SavedSearchSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return SavedSearch.objects.filter(user=self.request.user)
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
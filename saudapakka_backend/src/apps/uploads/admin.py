@@ -0,0 +1,24 @@
+from django.contrib import admin
+from .models import MediaTombstone, StoredBlob, UploadSession
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'user', 'target', 'filename', 'size', 'offset', 'status', 'expires_at')
+    list_filter = ('status', 'target')
+    list_select_related = ('user',)
+    search_fields = ('user__email', 'filename')
+    readonly_fields = [field.name for field in UploadSession._meta.fields]
+
+@admin.register(StoredBlob)
+class StoredBlobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'size', 'refcount', 'created_at')
+    search_fields = ('sha256', 'name')
+    ordering = ('-refcount',)
+    readonly_fields = [field.name for field in StoredBlob._meta.fields]
+
+@admin.register(MediaTombstone)
+class MediaTombstoneAdmin(admin.ModelAdmin):
+    list_display = ('name', 'orphan', 'attempts', 'next_attempt_at', 'last_error', 'created_at')
+    list_filter = ('orphan',)
+    search_fields = ('name',)
+    ordering = ('next_attempt_at',)
@@ -0,0 +1,62 @@
+import hashlib
+import os
+from collections import defaultdict
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, Sum
+from apps.uploads.models import StoredBlob
+from apps.uploads.storage import BLOB_PREFIX, reconcile_blobs
+from apps.uploads.tombstones import iter_media_files
+
+def _size(n):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if n < 1024 or unit == 'GB':
+            return f'{n:.1f} {unit}'
+        n /= 1024
+
+class Command(BaseCommand):
+    help = 'Reports disk saved by content-addressed media storage.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=10, help='Most shared blobs to list')
+        parser.add_argument('--reconcile', action='store_true',
+                            help='First reset refcounts from the stored references and delete unreferenced blobs')
+        parser.add_argument('--legacy', action='store_true',
+                            help='Also hash files stored before deduplication and report their duplicates')
+
+    def handle(self, *args, **options):
+        if options['reconcile']:
+            fixed, deleted = reconcile_blobs()
+            self.stdout.write(f'Reconciled: {fixed} refcounts fixed, {deleted} unreferenced blobs deleted.')
+
+        totals = StoredBlob.objects.aggregate(
+            blobs=Count('pk'), stored=Sum('size'), logical=Sum(F('size') * F('refcount')), references=Sum('refcount'),
+        )
+        stored, logical = totals['stored'] or 0, totals['logical'] or 0
+        self.stdout.write(self.style.MIGRATE_HEADING('Content-addressed media'))
+        self.stdout.write(f"  {totals['blobs']} blobs, {totals['references'] or 0} references")
+        self.stdout.write(f'  {_size(logical)} referenced, {_size(stored)} on disk')
+        self.stdout.write(self.style.SUCCESS(
+            f'  saved {_size(logical - stored)}' + (f' ({100 * (logical - stored) / logical:.1f}%)' if logical else '')
+        ))
+        shared = StoredBlob.objects.filter(refcount__gt=1).order_by((F('size') * F('refcount')).desc())[:options['top']]
+        for blob in shared:
+            self.stdout.write(f'  {blob.refcount:5d} x {_size(blob.size):>10}  {blob.name}')
+
+        if options['legacy']:
+            self._legacy_report()
+
+    def _legacy_report(self):
+        by_digest = defaultdict(list)
+        for name, size, _ in iter_media_files():
+            if name.startswith(BLOB_PREFIX):
+                continue
+            digest = hashlib.sha256()
+            with open(os.path.join(settings.MEDIA_ROOT, name), 'rb') as f:
+                while chunk := f.read(1024 * 1024):
+                    digest.update(chunk)
+            by_digest[digest.hexdigest()].append(size)
+        files = sum(len(sizes) for sizes in by_digest.values())
+        duplicate = sum(sum(sizes[1:]) for sizes in by_digest.values())
+        self.stdout.write(self.style.MIGRATE_HEADING('Files stored before deduplication'))
+        self.stdout.write(f'  {files} files, {len(by_digest)} distinct; duplicates take {_size(duplicate)}')
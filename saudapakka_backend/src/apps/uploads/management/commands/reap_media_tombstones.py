@@ -0,0 +1,21 @@
+import time
+from django.core.management.base import BaseCommand
+from apps.uploads.tombstones import reap_media_tombstones
+
+class Command(BaseCommand):
+    help = 'Deletes media files queued by model deletes. Run with --loop as a worker, or from cron.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--loop', action='store_true', help='Keep reaping until interrupted')
+        parser.add_argument('--interval', type=float, default=30, help='Seconds to sleep when nothing is due (--loop)')
+
+    def handle(self, *args, **options):
+        while True:
+            reaped, failed = reap_media_tombstones(options['batch_size'])
+            if reaped or failed:
+                self.stdout.write(f'Reaped {reaped} media files, {failed} failed (will retry).')
+            if not options['loop']:
+                break
+            if reaped + failed < options['batch_size']:
+                time.sleep(options['interval'])
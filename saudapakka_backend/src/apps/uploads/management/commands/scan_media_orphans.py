@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from apps.uploads.tombstones import find_media_orphans, record_deletions
+
+class Command(BaseCommand):
+    help = 'Lists files under MEDIA_ROOT that no row references; --delete queues them for reap_media_tombstones.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-age', type=float, default=24,
+                            help='Ignore files modified in the last N hours (uploads in flight)')
+        parser.add_argument('--delete', action='store_true', help='Queue the orphans for deletion')
+        parser.add_argument('--quiet', action='store_true', help='Only print the totals')
+
+    def handle(self, *args, **options):
+        count = total = 0
+        batch = []
+        for name, size in find_media_orphans(options['min_age'] * 3600):
+            count += 1
+            total += size
+            if not options['quiet']:
+                self.stdout.write(f'{size:>12}  {name}')
+            if options['delete']:
+                batch.append(name)
+                if len(batch) >= 1000:
+                    record_deletions(batch, orphan=True)
+                    batch = []
+        if batch:
+            record_deletions(batch, orphan=True)
+        action = 'queued for deletion' if options['delete'] else 'found'
+        self.stdout.write(self.style.SUCCESS(f'{count} orphaned files ({total / 1024 / 1024:.1f} MB) {action}.'))
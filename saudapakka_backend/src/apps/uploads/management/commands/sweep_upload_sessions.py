@@ -0,0 +1,18 @@
+import time
+from django.core.management.base import BaseCommand
+from apps.uploads.services import sweep_expired_uploads
+
+class Command(BaseCommand):
+    help = 'Deletes expired upload sessions and their partial files. Run with --loop as a worker, or periodically, e.g. hourly.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep sweeping until interrupted')
+        parser.add_argument('--interval', type=float, default=3600, help='Seconds between sweeps (--loop)')
+
+    def handle(self, *args, **options):
+        while True:
+            deleted, strays = sweep_expired_uploads()
+            self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired upload sessions and {strays} stray partial files.'))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,70 @@
+import uuid
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
+class UploadSession(models.Model):
+    """
+    A resumable upload: the client PUTs byte ranges into a partial file on
+    disk, then completes the session, which moves the file into place and
+    attaches it to `target` (see apps/uploads/services.py for the targets).
+    """
+    STATUS_CHOICES = [
+        ('ACTIVE', 'Active'),
+        ('COMPLETE', 'Complete'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='upload_sessions')
+    target = models.CharField(max_length=50)
+    object_id = models.UUIDField(null=True, blank=True, help_text='Property for property targets')
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100)
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0, help_text='Bytes received so far')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='ACTIVE')
+    attached_name = models.CharField(max_length=255, blank=True, help_text='Storage name once complete')
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.target} {self.filename} ({self.offset}/{self.size})"
+
+
+class StoredBlob(models.Model):
+    """
+    One file in content-addressed media storage (apps/uploads/storage.py),
+    shared by every field that stores the same bytes. `refcount` is the
+    number of field values pointing at it; the file goes with the last one.
+    """
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField()
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} x{self.refcount}"
+
+
+class MediaTombstone(models.Model):
+    """
+    A media file waiting to be deleted. Rows are written by the post_delete
+    receivers in the deleting transaction (so a rollback keeps the files)
+    and reaped in batches by reap_media_tombstones, with retries.
+    """
+    name = models.CharField(max_length=255)
+    orphan = models.BooleanField(default=False, help_text='Found by scan_media_orphans rather than a delete')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['next_attempt_at'], name='media_tombstone_due'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.attempts} attempts)"
@@ -0,0 +1,35 @@
+from django.conf import settings
+from rest_framework import serializers
+from .models import UploadSession
+from .services import TARGETS, max_size, owned_property
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    target = serializers.ChoiceField(choices=sorted(TARGETS))
+    max_chunk_size = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UploadSession
+        fields = [
+            'id', 'target', 'object_id', 'filename', 'content_type', 'size', 'offset',
+            'status', 'attached_name', 'expires_at', 'max_chunk_size',
+        ]
+        read_only_fields = ['id', 'offset', 'status', 'attached_name', 'expires_at']
+
+    def get_max_chunk_size(self, obj):
+        return settings.UPLOAD_CHUNK_MAX_SIZE
+
+    def validate(self, attrs):
+        user = self.context['request'].user
+        target = TARGETS[attrs['target']]
+        if attrs['size'] <= 0 or attrs['size'] > max_size(attrs['target']):
+            raise serializers.ValidationError({'size': f"Must be between 1 and {max_size(attrs['target'])} bytes."})
+        if attrs['content_type'] not in target.content_types:
+            raise serializers.ValidationError({'content_type': f"Must be one of: {', '.join(target.content_types)}."})
+        if target.kind == 'kyc':
+            attrs['object_id'] = None
+        elif not attrs.get('object_id') or owned_property(user, attrs['object_id']) is None:
+            raise serializers.ValidationError({'object_id': 'A property you own is required for this target.'})
+        if UploadSession.objects.filter(user=user, status='ACTIVE').count() >= settings.UPLOAD_MAX_ACTIVE_SESSIONS:
+            raise serializers.ValidationError('Too many unfinished uploads; complete or cancel some first.')
+        return attrs
@@ -0,0 +1,314 @@
+"""
+Resumable, chunked uploads.
+
+A session is created with the target field, file name, type and total size.
+The client then PUTs byte ranges (Content-Range) in order; each range is
+streamed from the socket into <partial dir>/<session id>.part in 64 KB reads
+and checked against an optional X-Chunk-SHA256 header. A range that fails
+its checksum or arrives short is cut off again, so the client just resends
+it. Completing the session checks the size and the file's magic bytes, then
+hard-links / renames the partial file into MEDIA_ROOT under the target
+field's upload_to (or hands it to content-addressed storage, which hashes it
+in place). The bytes are never copied through Python.
+"""
+import hashlib
+import os
+import time
+import uuid
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import OperationalError, transaction
+from django.utils import timezone
+
+from apps.properties.models import Property, PropertyFloorPlan, PropertyImage
+from apps.users.models import KYCVerification
+from .models import UploadSession
+from .storage import ContentAddressedStorage
+from .tombstones import record_deletions
+
+MB = 1024 * 1024
+READ_SIZE = 64 * 1024
+
+IMAGE_TYPES = ('image/jpeg', 'image/png')
+DOCUMENT_TYPES = IMAGE_TYPES + ('application/pdf',)
+MAGIC_NUMBERS = (
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'%PDF-', 'application/pdf'),
+)
+
+# kind: 'kyc' (the user's KYCVerification), 'property' (a field on the
+# Property in object_id), 'property_image' / 'floor_plan_image' (a new row)
+UploadTarget = namedtuple('UploadTarget', 'kind field max_size content_types')
+
+TARGETS = {
+    # Limits match UploadAadhaarView
+    'aadhaar_front': UploadTarget('kyc', 'aadhaar_front_image', 15 * MB, IMAGE_TYPES),
+    'aadhaar_back': UploadTarget('kyc', 'aadhaar_back_image', 25 * MB, IMAGE_TYPES),
+    'selfie': UploadTarget('kyc', 'selfie_image', 10 * MB, IMAGE_TYPES),
+    'property_image': UploadTarget('property_image', 'image', None, IMAGE_TYPES),
+    'floor_plan_image': UploadTarget('floor_plan_image', 'image', None, IMAGE_TYPES),
+    'floor_plan': UploadTarget('property', 'floor_plan', None, IMAGE_TYPES),
+    **{field: UploadTarget('property', field, None, DOCUMENT_TYPES) for field in Property.DOCUMENT_FIELDS},
+}
+
+
+class UploadError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def max_size(target):
+    return TARGETS[target].max_size or settings.UPLOAD_MAX_SIZE
+
+
+def partial_dir():
+    # Must be on the same filesystem as MEDIA_ROOT for the final rename
+    return settings.UPLOAD_PARTIAL_DIR or os.path.join(settings.MEDIA_ROOT, '.uploads')
+
+
+def partial_path(session):
+    return os.path.join(partial_dir(), f'{session.pk}.part')
+
+
+def remove_partial(session):
+    try:
+        os.remove(partial_path(session))
+    except FileNotFoundError:
+        pass
+
+
+def owned_property(user, property_id):
+    """The property if `user` may attach files to it, else None."""
+    queryset = Property.objects.filter(pk=property_id)
+    if not user.is_staff:
+        queryset = queryset.filter(owner=user)
+    return queryset.first()
+
+
+def create_upload(user, target, filename, content_type, size, object_id=None):
+    return UploadSession.objects.create(
+        user=user, target=target, object_id=object_id, filename=os.path.basename(filename),
+        content_type=content_type, size=size,
+        expires_at=timezone.now() + timedelta(seconds=settings.UPLOAD_SESSION_TTL),
+    )
+
+
+@contextmanager
+def session_lock(session):
+    """
+    Serializes chunk writes, completion and abort of one session across
+    workers: the body runs in a transaction holding the row lock (NOWAIT, so
+    a competing request gets a 409 instead of queueing behind a slow
+    client), and `session` is refreshed from the locked row.
+    """
+    with transaction.atomic():
+        try:
+            locked = UploadSession.objects.select_for_update(nowait=True).get(pk=session.pk)
+        except UploadSession.DoesNotExist:
+            raise UploadError('Upload not found', status=404)
+        except OperationalError:
+            raise UploadError('Another request is writing to this upload', status=409)
+        for field in UploadSession._meta.concrete_fields:
+            setattr(session, field.attname, getattr(locked, field.attname))
+        yield
+
+
+def parse_content_range(header, total):
+    """'bytes <start>-<end>/<total>' -> (start, length)."""
+    try:
+        unit, _, spec = header.partition(' ')
+        span, _, declared_total = spec.partition('/')
+        start, _, end = span.partition('-')
+        start, end = int(start), int(end)
+    except (AttributeError, ValueError):
+        raise UploadError('Content-Range must be "bytes <start>-<end>/<total>"')
+    if unit != 'bytes' or declared_total not in ('*', str(total)) or start < 0 or end < start or end >= total:
+        raise UploadError('Content-Range does not fit this upload')
+    return start, end - start + 1
+
+
+def write_chunk(session, stream, start, length, sha256=None):
+    """
+    Streams `length` bytes from `stream` into the partial file at `start`,
+    which must be the session's current offset. Returns the new offset.
+    """
+    if length > settings.UPLOAD_CHUNK_MAX_SIZE:
+        raise UploadError(f'Chunks are limited to {settings.UPLOAD_CHUNK_MAX_SIZE} bytes', status=413)
+
+    with session_lock(session):
+        # Checked under the lock: completion moves the partial file away
+        if session.status != 'ACTIVE':
+            raise UploadError('Upload is already complete', status=409)
+        if start != session.offset:
+            raise UploadError(f'Expected a chunk starting at {session.offset}', status=409)
+
+        os.makedirs(partial_dir(), exist_ok=True)
+        path = partial_path(session)
+        digest = hashlib.sha256()
+        remaining = length
+        with open(path, 'r+b' if start else 'wb') as f:
+            f.seek(start)
+            # Drop whatever an interrupted earlier attempt left past the offset
+            f.truncate()
+            while remaining:
+                data = stream.read(min(READ_SIZE, remaining))
+                if not data:
+                    break
+                f.write(data)
+                digest.update(data)
+                remaining -= len(data)
+            if remaining or (sha256 and digest.hexdigest() != sha256.lower()):
+                f.truncate(start)
+                raise UploadError('Chunk was incomplete or failed its checksum; resend it')
+
+        session.offset = start + length
+        UploadSession.objects.filter(pk=session.pk).update(offset=session.offset)
+        return session.offset
+
+
+def sniff_content_type(path):
+    with open(path, 'rb') as f:
+        head = f.read(8)
+    return next((content_type for magic, content_type in MAGIC_NUMBERS if head.startswith(magic)), None)
+
+
+def _move_into_storage(path, field, instance, filename):
+    """
+    Links the finished file into the field's storage under its upload_to
+    path and returns the storage name. os.link refuses to overwrite, so a
+    name taken by a concurrent upload just moves on to the next free one.
+    Content-addressed storage hashes the file and adopts it instead.
+    """
+    storage = field.storage
+    name = field.generate_filename(instance, filename)
+    if isinstance(storage, ContentAddressedStorage):
+        return storage.adopt(path, name)
+    while True:
+        name = storage.get_available_name(name, max_length=field.max_length)
+        destination = storage.path(name)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        try:
+            os.link(path, destination)
+        except FileExistsError:
+            continue
+        except OSError:
+            # Filesystem without hard links
+            os.replace(path, destination)
+            break
+        os.unlink(path)
+        break
+    if settings.FILE_UPLOAD_PERMISSIONS is not None:
+        os.chmod(destination, settings.FILE_UPLOAD_PERMISSIONS)
+    return name
+
+
+def _target_instance(session):
+    target = TARGETS[session.target]
+    if target.kind == 'kyc':
+        return KYCVerification.objects.get_or_create(user=session.user)[0]
+    property_obj = owned_property(session.user, session.object_id)
+    if property_obj is None:
+        raise UploadError('Property not found', status=404)
+    if target.kind == 'property':
+        return property_obj
+    if target.kind == 'property_image':
+        return PropertyImage(property=property_obj)
+    return PropertyFloorPlan(property=property_obj, order=property_obj.floor_plans.count())
+
+
+def complete_upload(session):
+    """Moves the finished file into place and attaches it; returns the instance it was attached to."""
+    target = TARGETS[session.target]
+    with session_lock(session):
+        if session.status != 'ACTIVE':
+            raise UploadError('Upload is already complete', status=409)
+        if session.offset != session.size:
+            raise UploadError(f'Upload is incomplete ({session.offset} of {session.size} bytes)', status=409)
+        path = partial_path(session)
+        content_type = sniff_content_type(path)
+        if content_type not in target.content_types:
+            raise UploadError(f'File content is not one of: {", ".join(target.content_types)}')
+
+        instance = _target_instance(session)
+        field = instance._meta.get_field(target.field)
+        name = _move_into_storage(path, field, instance, session.filename)
+        if ContentAddressedStorage.is_blob(name) and getattr(instance, target.field).name == name:
+            # Same content again: adopt() counted a reference the field already holds
+            record_deletions([name])
+        setattr(instance, target.field, name)
+        if instance.pk:
+            instance.save(update_fields=[target.field])
+        else:
+            instance.save()
+        session.status = 'COMPLETE'
+        session.content_type = content_type
+        session.attached_name = name
+        session.save(update_fields=['status', 'content_type', 'attached_name'])
+    return instance
+
+
+KYC_TARGETS = [name for name, target in TARGETS.items() if target.kind == 'kyc']
+
+
+def completed_kyc_uploads(user, kyc):
+    """
+    {field: file} for the KYC images of the submission in progress: those
+    still holding the file a completed, not yet consumed upload session of
+    `user` attached. Images from an earlier submission are not included.
+    """
+    if kyc is None:
+        return {}
+    sessions = UploadSession.objects.filter(
+        user=user, status='COMPLETE', target__in=KYC_TARGETS, expires_at__gt=timezone.now(),
+    )
+    files = {}
+    for target, name in sessions.values_list('target', 'attached_name'):
+        file = getattr(kyc, TARGETS[target].field)
+        if file and file.name == name:
+            files[TARGETS[target].field] = file
+    return files
+
+
+def consume_kyc_uploads(user):
+    """Ends the submission: its completed KYC uploads can't be submitted again."""
+    UploadSession.objects.filter(user=user, status='COMPLETE', target__in=KYC_TARGETS).delete()
+
+
+def abort_upload(session):
+    with session_lock(session):
+        remove_partial(session)
+        session.delete()
+
+
+def sweep_expired_uploads():
+    """
+    Deletes expired sessions and their partial files, plus partial files
+    that outlived the TTL without a session (e.g. after a crash). Returns
+    (sessions deleted, stray files removed).
+    """
+    expired = UploadSession.objects.filter(expires_at__lte=timezone.now())
+    for session in expired.filter(status='ACTIVE').only('pk').iterator():
+        remove_partial(session)
+    deleted, _ = expired.delete()
+
+    strays = 0
+    cutoff = time.time() - settings.UPLOAD_SESSION_TTL
+    try:
+        entries = list(os.scandir(partial_dir()))
+    except FileNotFoundError:
+        entries = []
+    for entry in entries:
+        if entry.name.endswith('.part') and entry.stat().st_mtime < cutoff:
+            try:
+                session_id = uuid.UUID(entry.name[:-len('.part')])
+            except ValueError:
+                session_id = None
+            if session_id is None or not UploadSession.objects.filter(pk=session_id, status='ACTIVE').exists():
+                os.remove(entry.path)
+                strays += 1
+    return deleted, strays
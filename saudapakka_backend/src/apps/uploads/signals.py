@@ -0,0 +1,51 @@
+"""
+Releases blob references when a tracked file field (storage.tracked_fields())
+is given a new value. pre_save notes the blob names the save takes off the
+row and post_save queues them as MediaTombstones, so the reaper drops one
+reference each. Names from before content addressing are not refcounted and
+may be shared (a profile picture copying the KYC selfie), so they are left to
+scan_media_orphans.
+"""
+from collections import defaultdict
+from functools import cache
+
+from django.db.models.signals import post_save, pre_save
+
+from .storage import ContentAddressedStorage, tracked_fields
+from .tombstones import record_deletions
+
+
+@cache
+def _fields_by_model():
+    fields = defaultdict(list)
+    for model, field in tracked_fields():
+        fields[model].append(field)
+    return dict(fields)
+
+
+def remember_replaced_blobs(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._replaced_blobs = []
+    if raw or instance._state.adding:
+        return
+    fields = [f for f in _fields_by_model()[sender] if update_fields is None or f in update_fields]
+    if not fields:
+        # DirtyFieldsMixin narrows update_fields, so most saves stop here
+        return
+    stored = sender._base_manager.filter(pk=instance.pk).values(*fields).first() or {}
+    for field in fields:
+        name = stored.get(field)
+        if not ContentAddressedStorage.is_blob(name):
+            continue
+        current = getattr(instance, field)
+        if not current or not current._committed or current.name != name:
+            instance._replaced_blobs.append(name)
+
+
+def release_replaced_blobs(sender, instance, **kwargs):
+    record_deletions(instance.__dict__.pop('_replaced_blobs', []))
+
+
+def connect_blob_release():
+    for model in _fields_by_model():
+        pre_save.connect(remember_replaced_blobs, sender=model, dispatch_uid=f'remember_replaced_blobs:{model._meta.label}')
+        post_save.connect(release_replaced_blobs, sender=model, dispatch_uid=f'release_replaced_blobs:{model._meta.label}')
@@ -0,0 +1,185 @@
+"""
+Content-addressed media storage.
+
+Files saved to the fields in tracked_fields() are stored once per distinct
+content, as blobs/<aa>/<bb>/<sha256><ext>, whatever upload_to says. A
+StoredBlob row counts the field values that point at each blob: saving a
+file adds a reference, deleting or replacing it (storage.delete, called by
+the media tombstone reaper; see signals.py for replacements) drops one, and
+the file is removed with the last reference, after the transaction commits. Names stored before this was enabled keep working
+and are deleted as before.
+"""
+import hashlib
+import os
+from collections import Counter
+from datetime import timedelta
+from functools import partial
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, storages
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+BLOB_PREFIX = 'blobs/'
+
+
+def tracked_fields():
+    """
+    (model, field name) pairs whose values may point at blobs. All but the
+    last use media_storage(); User.profile_picture can hold a copy of the
+    KYC selfie's name.
+    """
+    Property = apps.get_model('properties', 'Property')
+    KYCVerification = apps.get_model('users', 'KYCVerification')
+    return [
+        *[(Property, field) for field in ('floor_plan', *Property.DOCUMENT_FIELDS)],
+        (apps.get_model('properties', 'PropertyImage'), 'image'),
+        (apps.get_model('properties', 'PropertyFloorPlan'), 'image'),
+        *[(KYCVerification, field) for field in ('aadhaar_front_image', 'aadhaar_back_image', 'selfie_image')],
+        (apps.get_model('users', 'User'), 'profile_picture'),
+    ]
+
+
+# Unreferenced blobs younger than this may belong to a save that hasn't committed yet
+RECONCILE_GRACE = timedelta(hours=1)
+
+
+def file_digest(chunks):
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in chunks:
+        digest.update(chunk)
+        size += len(chunk)
+    return digest.hexdigest(), size
+
+
+class ContentAddressedStorage(FileSystemStorage):
+
+    @staticmethod
+    def is_blob(name):
+        return bool(name) and name.startswith(BLOB_PREFIX)
+
+    @staticmethod
+    def blob_name(digest, name):
+        ext = os.path.splitext(name)[1].lower()[:10]
+        return f'{BLOB_PREFIX}{digest[:2]}/{digest[2:4]}/{digest}{ext}'
+
+    def _acquire(self, digest, name, size):
+        """Locks the blob row (creating it if needed) and adds one reference."""
+        StoredBlob = apps.get_model('uploads', 'StoredBlob')
+        blob, _ = StoredBlob.objects.select_for_update().get_or_create(
+            sha256=digest, defaults={'name': name, 'size': size},
+        )
+        StoredBlob.objects.filter(pk=digest).update(refcount=F('refcount') + 1)
+        return blob
+
+    def _save(self, name, content):
+        digest, size = file_digest(content.chunks())
+        with transaction.atomic():
+            blob = self._acquire(digest, self.blob_name(digest, name), size)
+            if not self.exists(blob.name):
+                super()._save(blob.name, content)
+        return blob.name
+
+    def adopt(self, path, name):
+        """
+        Takes over a finished file already on this filesystem (a completed
+        chunked upload): moves it into place, or drops it if the blob exists.
+        Returns the storage name.
+        """
+        with open(path, 'rb') as f:
+            digest, size = file_digest(iter(partial(f.read, 1024 * 1024), b''))
+        with transaction.atomic():
+            blob = self._acquire(digest, self.blob_name(digest, name), size)
+            if self.exists(blob.name):
+                os.remove(path)
+            else:
+                destination = self.path(blob.name)
+                os.makedirs(os.path.dirname(destination), exist_ok=True)
+                os.replace(path, destination)
+                if self.file_permissions_mode is not None:
+                    os.chmod(destination, self.file_permissions_mode)
+        return blob.name
+
+    def retain(self, name):
+        """Adds a reference for a field that was given an existing blob name."""
+        if self.is_blob(name):
+            apps.get_model('uploads', 'StoredBlob').objects.filter(name=name).update(refcount=F('refcount') + 1)
+
+    def delete(self, name):
+        if not self.is_blob(name):
+            return super().delete(name)
+        StoredBlob = apps.get_model('uploads', 'StoredBlob')
+        with transaction.atomic():
+            blob = StoredBlob.objects.select_for_update().filter(name=name).first()
+            if blob is None:
+                # Unknown to the index: leave it to media_dedupe_report --reconcile
+                return
+            if blob.refcount > 1:
+                StoredBlob.objects.filter(pk=blob.pk).update(refcount=F('refcount') - 1)
+                return
+            blob.delete()
+            # Only once the row is really gone (a rollback keeps the file)
+            transaction.on_commit(partial(self.delete_if_unreferenced, name))
+
+    def delete_if_unreferenced(self, name):
+        """Removes the file unless it is a blob that is (again) in the index."""
+        if not self.is_blob(name):
+            return super().delete(name)
+        StoredBlob = apps.get_model('uploads', 'StoredBlob')
+        with transaction.atomic():
+            # A save may have brought the blob back in the meantime
+            if not StoredBlob.objects.select_for_update().filter(name=name).exists():
+                super().delete(name)
+
+
+def media_storage():
+    """Storage for the deduplicated media fields (MEDIA_CONTENT_ADDRESSED)."""
+    if settings.MEDIA_CONTENT_ADDRESSED:
+        return ContentAddressedStorage()
+    return storages['default']
+
+
+def retain_file(field_file):
+    """Counts an extra reference when a blob-backed file is copied to another field."""
+    if field_file and isinstance(field_file.storage, ContentAddressedStorage):
+        field_file.storage.retain(field_file.name)
+
+
+def count_blob_references():
+    """Counter of blob name -> field values pointing at it, across tracked_fields()."""
+    references = Counter()
+    for model, field in tracked_fields():
+        rows = (
+            model.objects.filter(**{f'{field}__startswith': BLOB_PREFIX})
+            .order_by().values(field).annotate(total=Count('pk')).values_list(field, 'total')
+        )
+        for name, total in rows:
+            references[name] += total
+    return references
+
+
+def reconcile_blobs():
+    """
+    Resets every refcount to the references actually stored and deletes
+    blobs nothing points at (past RECONCILE_GRACE). Returns (fixed, deleted).
+    """
+    StoredBlob = apps.get_model('uploads', 'StoredBlob')
+    storage = ContentAddressedStorage()
+    references = count_blob_references()
+    fixed = deleted = 0
+    cutoff = timezone.now() - RECONCILE_GRACE
+    for blob in StoredBlob.objects.only('sha256', 'name', 'refcount', 'created_at').iterator():
+        actual = references.get(blob.name, 0)
+        if actual == blob.refcount:
+            continue
+        if actual == 0 and blob.created_at < cutoff:
+            with transaction.atomic():
+                if StoredBlob.objects.filter(pk=blob.pk, refcount=blob.refcount).delete()[0]:
+                    transaction.on_commit(partial(storage.delete_if_unreferenced, blob.name))
+                    deleted += 1
+        elif actual:
+            fixed += StoredBlob.objects.filter(pk=blob.pk, refcount=blob.refcount).update(refcount=actual)
+    return fixed, deleted
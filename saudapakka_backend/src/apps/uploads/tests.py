@@ -0,0 +1,246 @@
+import os
+import shutil
+import tempfile
+import threading
+
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from apps.core.tests import make_property, make_user
+from apps.properties.models import PropertyImage
+from apps.users.models import KYCVerification, User
+from .models import MediaTombstone, StoredBlob, UploadSession
+from .services import UploadError, complete_upload, create_upload, session_lock, write_chunk
+from .storage import ContentAddressedStorage, count_blob_references
+from .tombstones import reap_media_tombstones
+
+JPEG = b'\xff\xd8\xff\xe0' + b'\x00' * 1020
+
+
+class MediaRootMixin:
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root, UPLOAD_PARTIAL_DIR='')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+
+class BytesStream:
+    def __init__(self, data):
+        self.data = data
+
+    def read(self, size):
+        chunk, self.data = self.data[:size], self.data[size:]
+        return chunk
+
+
+def upload(client, target, data=JPEG, object_id=None):
+    """Runs a whole upload through the API; returns the completion response."""
+    payload = {'target': target, 'filename': 'scan.jpg', 'content_type': 'image/jpeg', 'size': len(data)}
+    if object_id:
+        payload['object_id'] = str(object_id)
+    session_id = client.post('/api/uploads/', payload, format='json').data['id']
+    response = client.put(
+        f'/api/uploads/{session_id}/', data, content_type='application/octet-stream',
+        HTTP_CONTENT_RANGE=f'bytes 0-{len(data) - 1}/{len(data)}',
+    )
+    assert response.status_code == 200, response.data
+    return client.post(f'/api/uploads/{session_id}/complete/')
+
+
+class UploadChunkTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user(1)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.session = create_upload(self.user, 'selfie', 'me.jpg', 'image/jpeg', len(JPEG))
+
+    def put(self, **extra):
+        return self.client.put(
+            f'/api/uploads/{self.session.pk}/', JPEG, content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes 0-{len(JPEG) - 1}/{len(JPEG)}', **extra,
+        )
+
+    def test_malformed_content_length_is_a_bad_request(self):
+        response = self.put(CONTENT_LENGTH='lots')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response['Upload-Offset'], '0')
+
+    def test_chunk_after_completion_is_a_conflict(self):
+        self.assertEqual(self.put().status_code, 200)
+        self.assertEqual(self.client.post(f'/api/uploads/{self.session.pk}/complete/').status_code, 200)
+        with self.assertRaises(UploadError) as raised:
+            write_chunk(self.session, BytesStream(JPEG), 0, len(JPEG))
+        self.assertEqual(raised.exception.status, 409)
+
+
+class UploadLockTests(MediaRootMixin, TransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user(1)
+        self.property = make_property(self.user)
+
+    def test_locked_session_rejects_a_second_writer(self):
+        session = create_upload(self.user, 'selfie', 'me.jpg', 'image/jpeg', len(JPEG))
+        locked, release = threading.Event(), threading.Event()
+
+        def hold():
+            try:
+                with session_lock(UploadSession.objects.get(pk=session.pk)):
+                    locked.set()
+                    release.wait(5)
+            finally:
+                connection.close()
+
+        holder = threading.Thread(target=hold)
+        holder.start()
+        locked.wait(5)
+        try:
+            with self.assertRaises(UploadError) as raised:
+                write_chunk(session, BytesStream(JPEG), 0, len(JPEG))
+            self.assertEqual(raised.exception.status, 409)
+        finally:
+            release.set()
+            holder.join()
+        self.assertEqual(write_chunk(session, BytesStream(JPEG), 0, len(JPEG)), len(JPEG))
+
+    def test_concurrent_completions_attach_once(self):
+        session = create_upload(
+            self.user, 'property_image', 'room.jpg', 'image/jpeg', len(JPEG), object_id=self.property.pk,
+        )
+        write_chunk(session, BytesStream(JPEG), 0, len(JPEG))
+        threads = 6
+        completed, rejected, errors = [], [], []
+        barrier = threading.Barrier(threads)
+
+        def complete():
+            try:
+                barrier.wait()
+                completed.append(complete_upload(UploadSession.objects.get(pk=session.pk)))
+            except UploadError as e:
+                rejected.append(e.status)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=complete) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual((len(completed), rejected), (1, [409] * (threads - 1)))
+        self.assertEqual(PropertyImage.objects.filter(property=self.property).count(), 1)
+
+
+class AadhaarUploadFallbackTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user(1)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def submit(self):
+        return self.client.post('/api/kyc/upload-aadhaar/', {}, format='multipart')
+
+    def test_images_from_completed_uploads_are_submitted_once(self):
+        for target in ('aadhaar_front', 'aadhaar_back', 'selfie'):
+            self.assertEqual(upload(self.client, target).status_code, 200)
+        response = self.submit()
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(KYCVerification.objects.get(user=self.user).status, 'VERIFIED')
+        self.assertFalse(UploadSession.objects.filter(user=self.user).exists())
+
+        # The same images can't be submitted again without new uploads
+        self.assertEqual(self.submit().status_code, 400)
+
+    def test_images_not_from_this_submission_are_ignored(self):
+        for target in ('aadhaar_front', 'aadhaar_back', 'selfie'):
+            upload(self.client, target)
+        # Replaced outside the upload API: not what the sessions attached
+        KYCVerification.objects.filter(user=self.user).update(selfie_image='kyc/selfies/old.jpg')
+        self.assertEqual(self.submit().status_code, 400)
+
+
+class BlobReleaseTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user(1)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertRefcountsMatchReferences(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(reap_media_tombstones()[1], 0)
+        self.assertEqual(MediaTombstone.objects.count(), 0)
+        self.assertEqual(dict(StoredBlob.objects.values_list('name', 'refcount')), dict(count_blob_references()))
+
+    def test_replacing_a_document_releases_the_old_blob(self):
+        prop = make_property(self.user)
+        prop.sale_deed.save('deed.pdf', ContentFile(b'%PDF-1 first'))
+        old = prop.sale_deed.name
+        prop.sale_deed.save('deed.pdf', ContentFile(b'%PDF-1 second'))
+        self.assertEqual(list(MediaTombstone.objects.values_list('name', flat=True)), [old])
+        self.assertRefcountsMatchReferences()
+        self.assertFalse(StoredBlob.objects.filter(name=old).exists())
+
+    def test_unrelated_saves_leave_references_alone(self):
+        prop = make_property(self.user)
+        prop.sale_deed.save('deed.pdf', ContentFile(b'%PDF-1 first'))
+        prop.title = 'Renamed'
+        with self.assertNumQueries(1):
+            prop.save()
+        self.assertFalse(MediaTombstone.objects.exists())
+
+    def test_kyc_reuploads_keep_refcounts_exact(self):
+        upload(self.client, 'selfie', JPEG)
+        upload(self.client, 'selfie', JPEG)
+        self.assertRefcountsMatchReferences()
+        upload(self.client, 'selfie', JPEG + b'\x01')
+        self.assertRefcountsMatchReferences()
+        self.assertEqual(StoredBlob.objects.count(), 1)
+
+    def test_repeated_aadhaar_submissions_keep_refcounts_exact(self):
+        for content in (JPEG, JPEG, JPEG + b'\x02'):
+            for target in ('aadhaar_front', 'aadhaar_back', 'selfie'):
+                upload(self.client, target, content)
+            self.assertEqual(self.client.post('/api/kyc/upload-aadhaar/', {}, format='multipart').status_code, 200)
+            self.assertRefcountsMatchReferences()
+        self.user.refresh_from_db()
+        selfie = KYCVerification.objects.get(user=self.user).selfie_image
+        self.assertEqual(self.user.profile_picture.name, selfie.name)
+        self.assertEqual(StoredBlob.objects.get(name=selfie.name).refcount, 4)
+
+    def test_deleting_a_user_releases_kyc_images_and_profile_picture(self):
+        for target in ('aadhaar_front', 'aadhaar_back', 'selfie'):
+            upload(self.client, target, JPEG + target.encode())
+        self.client.post('/api/kyc/upload-aadhaar/', {}, format='multipart')
+        paths = [ContentAddressedStorage().path(name) for name in StoredBlob.objects.values_list('name', flat=True)]
+        self.assertEqual(len(paths), 3)
+
+        User.objects.filter(pk=self.user.pk).delete()
+        self.assertRefcountsMatchReferences()
+        self.assertFalse(StoredBlob.objects.exists())
+        self.assertFalse(any(os.path.exists(path) for path in paths))
+
+    def test_legacy_selfie_kept_while_it_is_a_profile_picture(self):
+        name = 'kyc/selfies/old.jpg'
+        storage = ContentAddressedStorage()
+        os.makedirs(os.path.dirname(storage.path(name)))
+        with open(storage.path(name), 'wb') as f:
+            f.write(JPEG)
+        KYCVerification.objects.create(user=self.user, selfie_image=name)
+        User.objects.filter(pk=self.user.pk).update(profile_picture=name)
+
+        KYCVerification.objects.filter(user=self.user).delete()
+        self.assertFalse(MediaTombstone.objects.filter(name=name).exists())
+        User.objects.filter(pk=self.user.pk).delete()
+        reap_media_tombstones()
+        self.assertFalse(os.path.exists(storage.path(name)))
@@ -0,0 +1,124 @@
+"""
+Deferred media deletion.
+
+post_delete receivers only record the names of files to drop, as
+MediaTombstone rows in the deleting transaction: a cascade through a user's
+listings costs one INSERT per row instead of a storage call per file, and
+a rollback leaves no half-deleted media behind. reap_media_tombstones
+claims due rows in batches (SKIP LOCKED, so several reapers can run),
+deletes each file through the media storage (a refcount decrement for
+content-addressed blobs) and reschedules failures with backoff.
+"""
+import logging
+import os
+import time
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import models, transaction
+from django.utils import timezone
+
+from .models import MediaTombstone, StoredBlob
+from .storage import ContentAddressedStorage
+
+logger = logging.getLogger(__name__)
+
+# A claimed batch is not due again until the reaper had time to finish it
+CLAIM_LEASE_SECONDS = 300
+RETRY_BASE_SECONDS = 60
+RETRY_MAX_SECONDS = 6 * 3600
+
+
+def record_deletions(names, orphan=False):
+    """Queues files for deletion; call inside the transaction that drops their references."""
+    names = [name for name in names if name]
+    if names:
+        MediaTombstone.objects.bulk_create([MediaTombstone(name=name, orphan=orphan) for name in names])
+
+
+def claim_due_tombstones(limit):
+    with transaction.atomic():
+        batch = list(
+            MediaTombstone.objects.filter(next_attempt_at__lte=timezone.now())
+            .select_for_update(skip_locked=True).order_by('next_attempt_at')[:limit]
+        )
+        MediaTombstone.objects.filter(pk__in=[tombstone.pk for tombstone in batch]).update(
+            next_attempt_at=timezone.now() + timedelta(seconds=CLAIM_LEASE_SECONDS),
+        )
+    return batch
+
+
+def reap_media_tombstones(batch_size=500):
+    """Deletes one batch of due files; returns (reaped, failed)."""
+    # Handles blob and pre-deduplication names alike, whatever MEDIA_CONTENT_ADDRESSED says
+    storage = ContentAddressedStorage()
+    reaped, failed = [], 0
+    for tombstone in claim_due_tombstones(batch_size):
+        try:
+            with transaction.atomic():
+                if tombstone.orphan:
+                    storage.delete_if_unreferenced(tombstone.name)
+                else:
+                    storage.delete(tombstone.name)
+        except Exception as e:
+            failed += 1
+            attempts = tombstone.attempts + 1
+            delay = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** attempts)
+            logger.warning(f"Could not delete media {tombstone.name} (attempt {attempts}): {e}")
+            MediaTombstone.objects.filter(pk=tombstone.pk).update(
+                attempts=attempts, last_error=str(e)[:255],
+                next_attempt_at=timezone.now() + timedelta(seconds=delay),
+            )
+        else:
+            reaped.append(tombstone.pk)
+    MediaTombstone.objects.filter(pk__in=reaped).delete()
+    return len(reaped), failed
+
+
+def referenced_media_names():
+    """Every name stored in a FileField, plus blobs and files already queued for deletion."""
+    names = set()
+    for model in apps.get_models():
+        for field in model._meta.concrete_fields:
+            if isinstance(field, models.FileField):
+                names.update(
+                    model._base_manager.exclude(**{f'{field.attname}__isnull': True})
+                    .exclude(**{field.attname: ''}).values_list(field.attname, flat=True).iterator()
+                )
+    names.update(StoredBlob.objects.values_list('name', flat=True).iterator())
+    names.update(MediaTombstone.objects.values_list('name', flat=True).iterator())
+    return names
+
+
+def iter_media_files(root=None):
+    """
+    Yields (name relative to MEDIA_ROOT, size, mtime) for every file, one
+    directory at a time with os.scandir. Dot-directories (partial uploads)
+    are skipped.
+    """
+    root = root or settings.MEDIA_ROOT
+    stack = [root]
+    while stack:
+        try:
+            scanner = os.scandir(stack.pop())
+        except FileNotFoundError:
+            continue
+        with scanner as entries:
+            for entry in entries:
+                if entry.name.startswith('.'):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    stat = entry.stat(follow_symlinks=False)
+                    yield os.path.relpath(entry.path, root).replace(os.sep, '/'), stat.st_size, stat.st_mtime
+
+
+def find_media_orphans(min_age_seconds):
+    """Yields (name, size) of files no row references, skipping recently written ones."""
+    referenced = referenced_media_names()
+    cutoff = time.time() - min_age_seconds
+    for name, size, mtime in iter_media_files():
+        if mtime < cutoff and name not in referenced:
+            yield name, size
@@ -0,0 +1,8 @@
+from django.urls import path
+from .views import UploadSessionCompleteView, UploadSessionCreateView, UploadSessionDetailView
+
+urlpatterns = [
+    path('uploads/', UploadSessionCreateView.as_view(), name='upload-create'),
+    path('uploads/<uuid:pk>/', UploadSessionDetailView.as_view(), name='upload-detail'),
+    path('uploads/<uuid:pk>/complete/', UploadSessionCompleteView.as_view(), name='upload-complete'),
+]
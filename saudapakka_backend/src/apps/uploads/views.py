@@ -0,0 +1,82 @@
+from django.shortcuts import get_object_or_404
+from rest_framework import generics
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .models import UploadSession
+from .serializers import UploadSessionSerializer
+from .services import (
+    TARGETS, UploadError, abort_upload, complete_upload, create_upload, parse_content_range, write_chunk,
+)
+
+
+class UploadSessionCreateView(generics.CreateAPIView):
+    """
+    POST /api/uploads/ {target, object_id?, filename, content_type, size}
+    starts a resumable upload; see apps/uploads/services.py for the protocol.
+    """
+    serializer_class = UploadSessionSerializer
+    permission_classes = [IsAuthenticated]
+
+    def perform_create(self, serializer):
+        serializer.instance = create_upload(self.request.user, **serializer.validated_data)
+
+
+class UploadSessionDetailView(APIView):
+    """
+    GET reports the offset to resume from, PUT appends one chunk
+    (Content-Range: bytes <start>-<end>/<size>, optional X-Chunk-SHA256),
+    DELETE cancels the upload.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get_object(self, pk):
+        return get_object_or_404(UploadSession, pk=pk, user=self.request.user)
+
+    def get(self, request, pk):
+        session = self.get_object(pk)
+        return Response(UploadSessionSerializer(session).data, headers={'Upload-Offset': str(session.offset)})
+
+    def put(self, request, pk):
+        session = self.get_object(pk)
+        try:
+            start, length = parse_content_range(request.META.get('HTTP_CONTENT_RANGE'), session.size)
+            try:
+                content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+            except ValueError:
+                raise UploadError('Content-Length must be a number of bytes')
+            if content_length != length:
+                raise UploadError('Content-Length does not match Content-Range')
+            # Read straight off the socket; request.data would buffer the body
+            offset = write_chunk(session, request.stream, start, length, request.META.get('HTTP_X_CHUNK_SHA256'))
+        except UploadError as e:
+            # The session may have been cancelled meanwhile
+            offset = UploadSession.objects.filter(pk=session.pk).values_list('offset', flat=True).first() or 0
+            return Response(
+                {"error": str(e), "offset": offset}, status=e.status, headers={'Upload-Offset': str(offset)},
+            )
+        return Response({"offset": offset, "size": session.size}, headers={'Upload-Offset': str(offset)})
+
+    def delete(self, request, pk):
+        try:
+            abort_upload(self.get_object(pk))
+        except UploadError as e:
+            return Response({"error": str(e)}, status=e.status)
+        return Response(status=204)
+
+
+class UploadSessionCompleteView(APIView):
+    """Attaches a fully uploaded file to its target."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        session = get_object_or_404(UploadSession, pk=pk, user=request.user)
+        try:
+            instance = complete_upload(session)
+        except UploadError as e:
+            return Response({"error": str(e)}, status=e.status)
+        data = UploadSessionSerializer(session).data
+        data['object'] = {'type': instance._meta.model_name, 'id': str(instance.pk)}
+        data['url'] = request.build_absolute_uri(getattr(instance, TARGETS[session.target].field).url)
+        return Response(data)
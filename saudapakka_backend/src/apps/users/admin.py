@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User, KYCVerification, BrokerProfile, ExternalAPIKey
+from .models import User, KYCVerification, BrokerProfile, ExternalAPIKey, APIKeyUsage
 
 @admin.register(User)
 class CustomUserAdmin(BaseUserAdmin):
@@ -21,7 +21,7 @@ admin.site.register(BrokerProfile)
 
 @admin.register(ExternalAPIKey)
 class ExternalAPIKeyAdmin(admin.ModelAdmin):
-    list_display = ('name', 'user', 'prefix', 'is_active', 'created_at')
+    list_display = ('name', 'user', 'prefix', 'is_active', 'rate_limit_per_minute', 'burst', 'daily_quota', 'created_at')
     readonly_fields = ('prefix', 'hashed_key')
     search_fields = ('user__email', 'name', 'prefix')
     
@@ -31,3 +31,10 @@ class ExternalAPIKeyAdmin(admin.ModelAdmin):
             from django.contrib import messages
             msg = f"Your NEW API Key is: {obj._raw_key}  << COPY THIS NOW! IT WILL NOT BE SHOWN AGAIN."
             messages.warning(request, msg)
+
+@admin.register(APIKeyUsage)
+class APIKeyUsageAdmin(admin.ModelAdmin):
+    list_display = ('day', 'api_key', 'requests', 'throttled')
+    list_filter = ('day',)
+    list_select_related = ('api_key',)
+    ordering = ('-day', '-requests')
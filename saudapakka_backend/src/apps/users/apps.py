@@ -6,4 +6,5 @@ class UsersConfig(AppConfig):
     name = 'apps.users'
 
     def ready(self):
+        import apps.users.checks
         import apps.users.signals
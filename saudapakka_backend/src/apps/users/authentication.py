@@ -1,13 +1,37 @@
+import hashlib
+import hmac
+
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from django.conf import settings
 from django.contrib.auth.hashers import check_password
+from django.core.cache import cache
 from .models import ExternalAPIKey
+from .tokens import user_from_claims
+
+
+def api_key_cache_key(prefix):
+    return f'users:api-key:{prefix}'
+
+
+def api_key_digest(api_key):
+    """Keyed digest of a presented key; cheap to compute, useless without SECRET_KEY."""
+    return hmac.new(settings.SECRET_KEY.encode(), api_key.encode(), hashlib.sha256).hexdigest()
+
 
 class APIKeyAuthentication(BaseAuthentication):
     """
     Authenticate requests using an API Key provided in the header.
     Header: 'X-API-KEY: <key>'
     Key Format: 'sPk_<prefix>.<secret>'
+
+    A successful PBKDF2 check is cached per prefix for API_KEY_AUTH_CACHE_TIMEOUT
+    seconds as (HMAC digest of the full key, key pk), so repeat calls cost a
+    cache read, an HMAC and the indexed prefix lookup instead of the hasher.
+    Only the verification is cached: the key and its user are read from the
+    DB on every call, so deactivating or deleting either applies at once in
+    every worker, whatever the cache backend.
     """
     def authenticate(self, request):
         api_key = request.headers.get('X-API-KEY')
@@ -32,13 +56,19 @@ class APIKeyAuthentication(BaseAuthentication):
 
         try:
             # Lookup by Prefix (Fast)
-            key_obj = ExternalAPIKey.objects.get(prefix=prefix_part)
+            key_obj = ExternalAPIKey.objects.select_related('user').get(prefix=prefix_part)
         except ExternalAPIKey.DoesNotExist:
             raise AuthenticationFailed('Invalid API Key')
-            
-        # Verify Secret Hash (Secure)
-        if not check_password(secret_part, key_obj.hashed_key):
-             raise AuthenticationFailed('Invalid API Key')
+
+        digest = api_key_digest(api_key)
+        cached = cache.get(api_key_cache_key(prefix_part))
+        verified = cached is not None and cached[1] == key_obj.pk and hmac.compare_digest(cached[0], digest)
+        if not verified:
+            # Verify Secret Hash (Secure)
+            if not check_password(secret_part, key_obj.hashed_key):
+                 raise AuthenticationFailed('Invalid API Key')
+
+            cache.set(api_key_cache_key(prefix_part), (digest, key_obj.pk), settings.API_KEY_AUTH_CACHE_TIMEOUT)
             
         if not key_obj.is_active:
             raise AuthenticationFailed('API Key is inactive')
@@ -48,3 +78,13 @@ class APIKeyAuthentication(BaseAuthentication):
             
         return (key_obj.user, key_obj)  # request.user, request.auth
 
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    Stateless variant of JWTAuthentication (opt-in via JWT_STATELESS_AUTH):
+    the user is built from the token's signed claims, so authenticating costs
+    one cache read for the token version and no query. Tokens without claims
+    or with a stale version fall back to loading the user row.
+    """
+    def get_user(self, validated_token):
+        return user_from_claims(validated_token) or super().get_user(validated_token)
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+from apps.core.checks import cache_is_shared
+
+
+@register()
+def check_stateless_jwt_cache(app_configs, **kwargs):
+    """
+    Stateless JWT auth trusts a token while its token_version matches the
+    cached one (tokens.py). bump_token_version can only evict the cached
+    version in every worker if the cache is shared; with a per-process cache
+    a blocked user would stay signed in on the other workers.
+    """
+    if not settings.JWT_STATELESS_AUTH or cache_is_shared():
+        return []
+    return [Error(
+        'JWT_STATELESS_AUTH requires a cache shared by all workers.',
+        hint='Set CACHE_URL (e.g. rediscache://redis:6379/1) or turn JWT_STATELESS_AUTH off.',
+        id='users.E001',
+    )]
@@ -0,0 +1,183 @@
+"""
+Background polling of DigiLocker KYC sessions.
+
+InitiateKYCView schedules a session by setting next_poll_at. Due sessions are
+claimed atomically (the claim pushes next_poll_at out by a lease, so no two
+workers poll the same row), polled with at most KYC_POLL_CONCURRENCY calls in
+flight per provider across all workers, and the outcome is stored on the row
+with an exponential backoff before the next poll. Every upstream call spends
+one of KYC_POLL_MAX_ATTEMPTS, which bounds the calls per verification; polls
+the provider refused unprocessed (429, or never sent because the circuit is
+open) don't, so an outage doesn't fail the sessions waiting it out. Clients
+read the row instead of calling Sandbox themselves.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import KYCVerification
+from .services import SandboxClient
+
+logger = logging.getLogger(__name__)
+
+PROVIDER = 'sandbox'
+# A claimed row is not due again until the poll had time to finish
+# (SandboxClient timeout x retries)
+CLAIM_LEASE_SECONDS = 120
+# Upstream says the session can never succeed
+TERMINAL_CODES = (400, 404, 410)
+
+sandbox = SandboxClient()
+
+
+def poll_delay(attempts):
+    """Seconds to wait after the given number of polls."""
+    return min(settings.KYC_POLL_MAX_INTERVAL, settings.KYC_POLL_BASE_INTERVAL * 2 ** attempts)
+
+
+def schedule_defaults():
+    """update_or_create() defaults that (re)start polling for a new session."""
+    return {
+        'next_poll_at': timezone.now() + timedelta(seconds=settings.KYC_POLL_INITIAL_DELAY),
+        'poll_attempts': 0,
+        'last_polled_at': None,
+        'last_poll_code': None,
+    }
+
+
+def due_sessions():
+    return KYCVerification.objects.filter(
+        status='INITIATED', request_id__isnull=False, next_poll_at__lte=timezone.now(),
+    )
+
+
+def _lease():
+    return timezone.now() + timedelta(seconds=CLAIM_LEASE_SECONDS)
+
+
+def claim_due_sessions(limit):
+    """Claims up to `limit` due sessions; rows locked by another poller are skipped."""
+    with transaction.atomic():
+        sessions = list(
+            due_sessions().select_for_update(skip_locked=True)
+            .select_related('user').order_by('next_poll_at')[:limit]
+        )
+        KYCVerification.objects.filter(pk__in=[kyc.pk for kyc in sessions]).update(next_poll_at=_lease())
+    return sessions
+
+
+def claim_session(kyc):
+    """Claims one session if it is due (conditional UPDATE); True if this caller won."""
+    return due_sessions().filter(pk=kyc.pk).update(next_poll_at=_lease()) == 1
+
+
+def _slot_keys():
+    return [f'users:kyc-poll-slot:{PROVIDER}:{i}' for i in range(settings.KYC_POLL_CONCURRENCY)]
+
+
+def acquire_slot():
+    """One of the provider's KYC_POLL_CONCURRENCY slots, or None if all are taken."""
+    for key in _slot_keys():
+        # Expires on its own if the holder dies mid-poll
+        if cache.add(key, 1, CLAIM_LEASE_SECONDS):
+            return key
+    return None
+
+
+def apply_kyc_result(kyc, aadhaar):
+    """Stores verified Aadhaar data on the session and the user's profile."""
+    kyc.full_name = aadhaar.get('name')
+    kyc.dob = aadhaar.get('dob')
+    kyc.address_json = aadhaar.get('address')
+    kyc.status = 'VERIFIED'
+    kyc.verified_by = 'DIGILOCKER'
+    kyc.next_poll_at = None
+    kyc.save()
+
+    user = kyc.user
+    user.first_name = kyc.full_name.split(' ')[0]
+    user.is_kyc_verified = True  # Cache KYC status for performance
+    user.save(update_fields=['first_name', 'is_kyc_verified'])
+    logger.info(f"KYC verification successful for {user.email}")
+
+
+def poll_session(kyc):
+    """
+    Makes one upstream call for a claimed session and records the outcome.
+    Returns the session status, or None if the provider was at capacity (the
+    claim is released so the row is picked up again shortly).
+    """
+    slot = acquire_slot()
+    if slot is None:
+        KYCVerification.objects.filter(pk=kyc.pk).update(next_poll_at=timezone.now() + timedelta(seconds=1))
+        return None
+    try:
+        result = sandbox.get_kyc_status(kyc.request_id)
+    finally:
+        cache.delete(slot)
+
+    now = timezone.now()
+    code = result.get('code')
+    counted = code != 429 and not result.get('circuit_open')
+    # Counted in the database, so a stale in-memory copy can't undo a poll
+    KYCVerification.objects.filter(pk=kyc.pk).update(
+        poll_attempts=F('poll_attempts') + int(counted), last_polled_at=now, last_poll_code=code,
+    )
+    kyc.refresh_from_db(fields=['poll_attempts'])
+    kyc.last_polled_at = now
+    kyc.last_poll_code = code
+    if code == 200:
+        aadhaar = result.get('data', {}).get('aadhaar_data') or {}
+        if aadhaar.get('name'):
+            apply_kyc_result(kyc, aadhaar)
+            return kyc.status
+        kyc.last_poll_code = code = 202
+
+    if code == 503:
+        # Circuit open or provider down: no point coming back before the cooldown
+        delay = max(poll_delay(kyc.poll_attempts), settings.SANDBOX_BREAKER_COOLDOWN)
+    else:
+        delay = poll_delay(kyc.poll_attempts)
+    kyc.next_poll_at = now + timedelta(seconds=delay)
+    if code in TERMINAL_CODES or kyc.poll_attempts >= settings.KYC_POLL_MAX_ATTEMPTS:
+        logger.warning(f"KYC session {kyc.request_id} failed after {kyc.poll_attempts} polls: {result}")
+        kyc.status = 'FAILED'
+        kyc.next_poll_at = None
+
+    # Plain UPDATE: the status sync signal only matters for VERIFIED
+    KYCVerification.objects.filter(pk=kyc.pk, status='INITIATED').update(
+        status=kyc.status, next_poll_at=kyc.next_poll_at, last_poll_code=kyc.last_poll_code,
+    )
+    return kyc.status
+
+
+def poll_if_due(kyc):
+    """Polls inline when the session is due and nobody else claimed it."""
+    if kyc.status == 'INITIATED' and kyc.request_id and claim_session(kyc):
+        return poll_session(kyc)
+    return None
+
+
+def _poll_in_thread(kyc):
+    try:
+        return poll_session(kyc)
+    except Exception:
+        logger.exception(f"KYC poll failed for session {kyc.request_id}")
+        # Retried once the claim lease runs out
+    finally:
+        connection.close()
+
+
+def poll_due_sessions(batch_size=50):
+    """Claims and polls one batch of due sessions; returns how many were claimed."""
+    sessions = claim_due_sessions(batch_size)
+    if sessions:
+        with ThreadPoolExecutor(max_workers=settings.KYC_POLL_CONCURRENCY) as pool:
+            list(pool.map(_poll_in_thread, sessions))
+    return len(sessions)
@@ -0,0 +1,25 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from apps.users.usage import flush_api_key_usage
+
+class Command(BaseCommand):
+    help = (
+        'Writes the cached per-day API key usage counters (yesterday and today) to APIKeyUsage. '
+        'Run with --loop as a worker, or every few minutes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep flushing until interrupted')
+        parser.add_argument('--interval', type=float, default=300, help='Seconds between flushes (--loop)')
+
+    def handle(self, *args, **options):
+        while True:
+            today = timezone.localdate()
+            written = flush_api_key_usage([today - timedelta(days=1), today])
+            self.stdout.write(self.style.SUCCESS(f'Flushed usage for {written} key-days.'))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
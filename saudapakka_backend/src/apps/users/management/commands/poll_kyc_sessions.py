@@ -0,0 +1,21 @@
+import time
+from django.core.management.base import BaseCommand
+from apps.users.kyc_polling import poll_due_sessions
+
+class Command(BaseCommand):
+    help = 'Polls due DigiLocker KYC sessions. Run with --loop as a long-lived worker, or from cron.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--loop', action='store_true', help='Keep polling until interrupted')
+        parser.add_argument('--interval', type=float, default=2, help='Seconds to sleep when nothing is due (--loop)')
+
+    def handle(self, *args, **options):
+        while True:
+            claimed = poll_due_sessions(options['batch_size'])
+            if claimed:
+                self.stdout.write(f'Polled {claimed} KYC sessions.')
+            if not options['loop']:
+                break
+            if claimed < options['batch_size']:
+                time.sleep(options['interval'])
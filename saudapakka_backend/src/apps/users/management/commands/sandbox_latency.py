@@ -0,0 +1,26 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from apps.users.services import LATENCY_BUCKETS_MS, LATENCY_CALLS, latency_cache_key, latency_histogram
+
+class Command(BaseCommand):
+    help = 'Prints the per-call latency histograms of the Sandbox KYC client.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Clear the histograms after printing')
+
+    def handle(self, *args, **options):
+        for call in LATENCY_CALLS:
+            histogram = latency_histogram(call)
+            total = sum(count for _, count in histogram)
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{call} ({total} calls)'))
+            cumulative = 0
+            for bucket, count in histogram:
+                cumulative += count
+                share = f'{100 * cumulative / total:5.1f}%' if total else '    -'
+                label = f'<= {bucket} ms' if bucket != 'inf' else f'>  {LATENCY_BUCKETS_MS[-1]} ms'
+                self.stdout.write(f'  {label:>12}  {count:8d}  {share}')
+        if options['reset']:
+            cache.delete_many([
+                latency_cache_key(call, bucket)
+                for call in LATENCY_CALLS for bucket in LATENCY_BUCKETS_MS + ('inf',)
+            ])
@@ -0,0 +1,18 @@
+import time
+from django.core.management.base import BaseCommand
+from apps.users.otp import sweep_expired_otps
+
+class Command(BaseCommand):
+    help = 'Deletes expired OTP challenges in bulk. Run with --loop as a worker, or periodically, e.g. every 10 minutes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep sweeping until interrupted')
+        parser.add_argument('--interval', type=float, default=600, help='Seconds between sweeps (--loop)')
+
+    def handle(self, *args, **options):
+        while True:
+            deleted = sweep_expired_otps()
+            self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired OTP challenges.'))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,43 @@
+# Generated by Django 5.0.2 on 2026-10-19 05:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0012_alter_externalapikey_hashed_key_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='externalapikey',
+            name='burst',
+            field=models.PositiveIntegerField(default=10, help_text='Requests allowed back-to-back above the sustained rate'),
+        ),
+        migrations.AddField(
+            model_name='externalapikey',
+            name='daily_quota',
+            field=models.PositiveIntegerField(blank=True, help_text='Requests per day (empty = unlimited)', null=True),
+        ),
+        migrations.AddField(
+            model_name='externalapikey',
+            name='rate_limit_per_minute',
+            field=models.PositiveIntegerField(default=60, help_text='Sustained requests per minute'),
+        ),
+        migrations.CreateModel(
+            name='APIKeyUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('requests', models.PositiveIntegerField(default=0)),
+                ('throttled', models.PositiveIntegerField(default=0)),
+                ('api_key', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usage', to='users.externalapikey')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='apikeyusage',
+            constraint=models.UniqueConstraint(fields=('api_key', 'day'), name='unique_api_key_usage_day'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.2 on 2026-10-19 05:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0015_otpchallenge_remove_user_otp_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='kycverification',
+            name='last_poll_code',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='kycverification',
+            name='last_polled_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='kycverification',
+            name='next_poll_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='kycverification',
+            name='poll_attempts',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='kycverification',
+            index=models.Index(condition=models.Q(('next_poll_at__isnull', False), ('status', 'INITIATED')), fields=['next_poll_at'], name='kyc_poll_due'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.2 on 2026-10-19 06:08
+
+import apps.uploads.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0016_kycverification_last_poll_code_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='kycverification',
+            name='aadhaar_back_image',
+            field=models.ImageField(blank=True, null=True, storage=apps.uploads.storage.media_storage, upload_to='kyc/aadhaar/'),
+        ),
+        migrations.AlterField(
+            model_name='kycverification',
+            name='aadhaar_front_image',
+            field=models.ImageField(blank=True, null=True, storage=apps.uploads.storage.media_storage, upload_to='kyc/aadhaar/'),
+        ),
+        migrations.AlterField(
+            model_name='kycverification',
+            name='selfie_image',
+            field=models.ImageField(blank=True, null=True, storage=apps.uploads.storage.media_storage, upload_to='kyc/selfies/'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.2 on 2026-10-19 06:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0017_alter_kycverification_aadhaar_back_image_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='externalapikey',
+            name='throttle_tat',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.2 on 2026-10-19 06:53
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0018_externalapikey_throttle_tat'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='externalapikey',
+            name='throttle_tat',
+        ),
+    ]
@@ -1,8 +1,10 @@
 import uuid
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from apps.core.mixins import DirtyFieldsMixin
+from apps.uploads.storage import media_storage
 
-class User(AbstractUser):
+class User(DirtyFieldsMixin, AbstractUser):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     
     # --- MANDATORY REGISTRATION FIELDS ---
@@ -29,14 +31,16 @@ class User(AbstractUser):
         ('PLOTTING_AGENCY', 'Plotting Company/Agency'),
     ]
     role_category = models.CharField(max_length=20, choices=ROLE_CHOICES, default='BUYER')
-     
-    # OTP Fields
-    otp = models.CharField(max_length=6, blank=True, null=True)
-    otp_created_at = models.DateTimeField(blank=True, null=True)
+
+    # Bumped whenever a field embedded in JWT claims changes (see tokens.py)
+    token_version = models.PositiveIntegerField(default=0, editable=False)
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name', 'phone_number']
 
+    # Fields carried as signed JWT claims by tokens.ClaimsRefreshToken
+    CLAIM_FIELDS = ('role_category', 'is_staff', 'is_superuser', 'is_kyc_verified', 'is_active_seller', 'is_active_broker')
+
     # Fix for clashing related names with standard Auth
     groups = models.ManyToManyField('auth.Group', related_name='custom_user_set', blank=True)
     user_permissions = models.ManyToManyField('auth.Permission', related_name='custom_user_set', blank=True)
@@ -49,6 +53,25 @@ class User(AbstractUser):
     def __str__(self):
         return f"{self.full_name} ({self.email})"
 
+    def save(self, *args, **kwargs):
+        # Outstanding tokens carry the old claims (or is_active state): revoke them
+        update_fields = kwargs.get('update_fields')
+        claim_fields = self.CLAIM_FIELDS + ('is_active',)
+        revoke = not self._state.adding and self.has_changed(*claim_fields) and (
+            update_fields is None or not set(claim_fields).isdisjoint(update_fields)
+        )
+        super().save(*args, **kwargs)
+        if revoke:
+            from .tokens import bump_token_version
+            bump_token_version(self.pk)
+
+    def refresh_from_db(self, using=None, fields=None):
+        # A claims-only user (tokens.user_from_claims) loads every remaining
+        # column on first access instead of one query per deferred field
+        if fields is not None and self.__dict__.pop('_from_claims', False):
+            fields = set(fields) | self.get_deferred_fields()
+        super().refresh_from_db(using=using, fields=fields)
+
 class KYCVerification(models.Model):
     """Stores verified identity data from Real Sandbox API or Aadhaar Upload."""
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='kyc_data')
@@ -60,9 +83,9 @@ class KYCVerification(models.Model):
     address_json = models.JSONField(null=True, blank=True)
     
     # Aadhaar Upload fields (NEW)
-    aadhaar_front_image = models.ImageField(upload_to='kyc/aadhaar/', blank=True, null=True)
-    aadhaar_back_image = models.ImageField(upload_to='kyc/aadhaar/', blank=True, null=True)
-    selfie_image = models.ImageField(upload_to='kyc/selfies/', blank=True, null=True)
+    aadhaar_front_image = models.ImageField(upload_to='kyc/aadhaar/', storage=media_storage, blank=True, null=True)
+    aadhaar_back_image = models.ImageField(upload_to='kyc/aadhaar/', storage=media_storage, blank=True, null=True)
+    selfie_image = models.ImageField(upload_to='kyc/selfies/', storage=media_storage, blank=True, null=True)
 
     # User's requested role for upgrade
     ROLE_CHOICES = [
@@ -86,9 +109,25 @@ class KYCVerification(models.Model):
         ('VERIFIED', 'Verified'),
         ('FAILED', 'Failed')
     ], default='INITIATED')
-    
+
     verified_at = models.DateTimeField(auto_now=True)
 
+    # DigiLocker status polling (apps/users/kyc_polling.py). next_poll_at is
+    # set while an INITIATED session is still being polled
+    next_poll_at = models.DateTimeField(null=True, blank=True, editable=False)
+    poll_attempts = models.PositiveSmallIntegerField(default=0, editable=False)
+    last_polled_at = models.DateTimeField(null=True, blank=True, editable=False)
+    last_poll_code = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # The poller's "due sessions" scan
+            models.Index(
+                fields=['next_poll_at'], name='kyc_poll_due',
+                condition=models.Q(status='INITIATED', next_poll_at__isnull=False),
+            ),
+        ]
+
     def __str__(self):
         return f"KYC: {self.user.email} - {self.status}"
 
@@ -115,6 +154,11 @@ class ExternalAPIKey(models.Model):
     
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+
+    # Quotas enforced by throttling.APIKeyRateThrottle
+    rate_limit_per_minute = models.PositiveIntegerField(default=60, help_text="Sustained requests per minute")
+    burst = models.PositiveIntegerField(default=10, help_text="Requests allowed back-to-back above the sustained rate")
+    daily_quota = models.PositiveIntegerField(blank=True, null=True, help_text="Requests per day (empty = unlimited)")
     
     def save(self, *args, **kwargs):
         if not self.pk:
@@ -147,3 +191,40 @@ class ExternalAPIKey(models.Model):
 
     def __str__(self):
         return f"{self.name} ({self.user.email})"
+
+
+class APIKeyUsage(models.Model):
+    """
+    Daily request totals per API key. APIKeyRateThrottle counts them in the
+    cache; flush_api_key_usage copies the counters here every few minutes.
+    """
+    api_key = models.ForeignKey(ExternalAPIKey, on_delete=models.CASCADE, related_name='usage')
+    day = models.DateField()
+    requests = models.PositiveIntegerField(default=0)
+    throttled = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['api_key', 'day'], name='unique_api_key_usage_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.api_key_id} {self.day}: {self.requests} ({self.throttled} throttled)"
+
+
+class OTPChallenge(models.Model):
+    """
+    Pending login code for an email, kept off the User table (see otp.py).
+    One row per email, replaced on every send and deleted on successful
+    verification; expired rows are removed in bulk by sweep_otps.
+    """
+    TTL_SECONDS = 300
+    MAX_ATTEMPTS = 5
+
+    email = models.EmailField(unique=True)
+    code_hash = models.CharField(max_length=64, help_text="HMAC-SHA256 of the email and code")
+    attempts = models.PositiveSmallIntegerField(default=0)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.email} (expires {self.expires_at:%H:%M:%S})"
@@ -0,0 +1,51 @@
+import hashlib
+import hmac
+import secrets
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OTPChallenge
+
+
+def _code_hash(email, code):
+    return hmac.new(settings.SECRET_KEY.encode(), f'{email}:{code}'.encode(), hashlib.sha256).hexdigest()
+
+
+def issue_otp(email):
+    """Creates or replaces the email's challenge (one upsert) and returns the new code."""
+    code = f'{secrets.randbelow(900000) + 100000}'
+    OTPChallenge.objects.bulk_create(
+        [OTPChallenge(
+            email=email, code_hash=_code_hash(email, code), attempts=0,
+            expires_at=timezone.now() + timedelta(seconds=OTPChallenge.TTL_SECONDS),
+        )],
+        update_conflicts=True, unique_fields=['email'], update_fields=['code_hash', 'attempts', 'expires_at'],
+    )
+    return code
+
+
+def verify_otp(email, code):
+    """
+    Consumes the challenge if `code` is right, unexpired and within the
+    attempt limit. Check and consume are one DELETE, so a code can't be used
+    twice; a wrong code costs an attempt.
+    """
+    if not email or not code:
+        return False
+    consumed, _ = OTPChallenge.objects.filter(
+        email=email, code_hash=_code_hash(email, str(code)),
+        expires_at__gt=timezone.now(), attempts__lt=OTPChallenge.MAX_ATTEMPTS,
+    ).delete()
+    if consumed:
+        return True
+    OTPChallenge.objects.filter(email=email).update(attempts=F('attempts') + 1)
+    return False
+
+
+def sweep_expired_otps():
+    """Deletes every expired challenge in one statement; returns the count."""
+    deleted, _ = OTPChallenge.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
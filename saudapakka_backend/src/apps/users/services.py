@@ -1,19 +1,276 @@
 # services.py
 
-import os
-import requests
-import xml.etree.ElementTree as ET
+import hashlib
 import logging
+import random
+import time
+from xml.parsers import expat
+
+import requests
+from requests.adapters import HTTPAdapter
 from django.conf import settings
+from django.core.cache import cache
 
 logger = logging.getLogger(__name__)
 
+# Access tokens are valid for 24 hours; they are shared by all workers
+# through the cache and refreshed an hour before they expire
+TOKEN_CACHE_KEY = 'users:sandbox-token'
+TOKEN_LIFETIME = 24 * 3600
+TOKEN_REFRESH_MARGIN = 3600
+
+# Worth retrying (with backoff); anything else is returned to the caller
+RETRYABLE_STATUS = (429, 500, 502, 503, 504)
+# Safe to resend after a failure; other calls (DigiLocker session init)
+# are resent only when the provider cannot have acted on them
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS')
+BACKOFF_BASE = 0.25
+BACKOFF_CAP = 4.0
+
+# Upper bounds (ms) of the latency histogram buckets; slower calls go to 'inf'
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+LATENCY_CALLS = ('authenticate', 'initiate_digilocker', 'get_kyc_status', 'aadhaar_xml')
+
+
+# Aadhaar offline XML is read in chunks; the trailing base64 photo can be
+# several MB and is usually never downloaded (parsing stops at Poa)
+AADHAAR_XML_CHUNK_SIZE = 64 * 1024
+AADHAAR_XML_MAX_BYTES = 20 * 1024 * 1024
+
+
+class SandboxUnavailable(Exception):
+    """The circuit is open or the call kept failing after its retries."""
+
+
+class CircuitOpen(SandboxUnavailable):
+    """Refused by the circuit breaker: no request was sent."""
+
+
+class UnsafeXML(ValueError):
+    """The document declares a DTD or is larger than AADHAAR_XML_MAX_BYTES."""
+
+
+def iter_aadhaar_identity(chunks):
+    """
+    Streams an Aadhaar offline XML (an iterable of bytes) and returns the
+    attributes of its (Poi, Poa) elements, either of which may be None.
+
+    Uses expat's callbacks directly, so no tree is built, and stops reading
+    once both are seen; the embedded photo is usually never downloaded.
+    A DOCTYPE or entity declaration is rejected by the parser itself, after
+    it has decoded the document (UTF-8, UTF-16, ...): no DTD means no
+    entities to expand.
+    """
+    found = {}
+
+    def reject_dtd(*args):
+        raise UnsafeXML('DOCTYPE is not allowed in Aadhaar XML')
+
+    def start_element(name, attrs):
+        tag = name.rsplit('}', 1)[-1]
+        if tag in ('Poi', 'Poa') and tag not in found:
+            found[tag] = attrs
+
+    parser = expat.ParserCreate(namespace_separator='}')
+    parser.SetParamEntityParsing(expat.XML_PARAM_ENTITY_PARSING_NEVER)
+    parser.StartDoctypeDeclHandler = reject_dtd
+    parser.EntityDeclHandler = reject_dtd
+    parser.StartElementHandler = start_element
+    size = 0
+    for chunk in chunks:
+        size += len(chunk)
+        if size > AADHAAR_XML_MAX_BYTES:
+            raise UnsafeXML('Aadhaar XML exceeds size limit')
+        parser.Parse(chunk, False)
+        if len(found) == 2:
+            break
+    else:
+        parser.Parse(b'', True)
+    return found.get('Poi'), found.get('Poa')
+
+
+def aadhaar_xml_cache_key(file_url):
+    return 'users:aadhaar-xml:' + hashlib.sha256(file_url.encode()).hexdigest()
+
+
+def latency_cache_key(call, bucket):
+    return f'users:sandbox-latency:{call}:{bucket}'
+
+
+def record_latency(call, seconds):
+    """Counts one call in its latency bucket (shared across workers)."""
+    ms = seconds * 1000
+    bucket = next((bound for bound in LATENCY_BUCKETS_MS if ms <= bound), 'inf')
+    key = latency_cache_key(call, bucket)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+
+def latency_histogram(call):
+    """[(bucket upper bound in ms or 'inf', count), ...] for one call name."""
+    buckets = LATENCY_BUCKETS_MS + ('inf',)
+    counts = cache.get_many([latency_cache_key(call, bucket) for bucket in buckets])
+    return [(bucket, counts.get(latency_cache_key(call, bucket), 0)) for bucket in buckets]
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure breaker with its state in the cache, so all workers
+    stop calling a failing provider together. After `threshold` failures it
+    opens for `cooldown` seconds; then a single trial call is let through and
+    its outcome closes or re-opens the circuit.
+    """
+    def __init__(self, name, threshold, cooldown):
+        self.failures_key = f'users:circuit:{name}:failures'
+        self.open_key = f'users:circuit:{name}:open-until'
+        self.trial_key = f'users:circuit:{name}:trial'
+        self.threshold = threshold
+        self.cooldown = cooldown
+
+    def allow(self):
+        open_until = cache.get(self.open_key)
+        if open_until is None:
+            return True
+        if time.time() < open_until:
+            return False
+        # Half-open: one caller per cooldown gets to probe
+        return cache.add(self.trial_key, 1, self.cooldown)
+
+    def record_success(self):
+        cache.delete_many([self.failures_key, self.open_key, self.trial_key])
+
+    def record_failure(self):
+        try:
+            failures = cache.incr(self.failures_key)
+        except ValueError:
+            cache.add(self.failures_key, 0, self.cooldown * 10)
+            failures = cache.incr(self.failures_key)
+        if failures >= self.threshold:
+            cache.set(self.open_key, time.time() + self.cooldown, self.cooldown * 10)
+            cache.delete(self.trial_key)
+            logger.warning(f"Sandbox circuit open for {self.cooldown}s after {failures} failures")
+
+
+_session = None
+
+
+def get_session():
+    """Process-wide Session: keeps TLS connections to the provider alive."""
+    global _session
+    if _session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=settings.SANDBOX_POOL_SIZE, max_retries=0)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        _session = session
+    return _session
+
+
 class SandboxClient:
     def __init__(self):
         self.api_key = settings.SANDBOX_API_KEY
         self.api_secret = settings.SANDBOX_API_SECRET
-        self.base_url = 'https://api.sandbox.co.in'
-        self.access_token = None
+        self.base_url = settings.SANDBOX_BASE_URL.rstrip('/')
+        self.timeout = settings.SANDBOX_TIMEOUT
+        self.max_retries = settings.SANDBOX_MAX_RETRIES
+        self.breaker = CircuitBreaker('sandbox', settings.SANDBOX_BREAKER_THRESHOLD, settings.SANDBOX_BREAKER_COOLDOWN)
+
+    def _backoff(self, attempt, response):
+        # Full jitter; a Retry-After from a 429 is honoured up to the cap
+        delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+        return min(delay, BACKOFF_CAP)
+
+    @staticmethod
+    def _may_retry(idempotent, response, error):
+        # A 429 was refused unprocessed and a connect timeout never sent the
+        # request; a 5xx or read timeout may have run it on the provider
+        if idempotent:
+            return True
+        if response is not None:
+            return response.status_code == 429
+        return isinstance(error, requests.ConnectTimeout)
+
+    def _request(self, call, method, url, authenticated=True, idempotent=None, use_breaker=True, **kwargs):
+        """
+        One logical call: pooled session, bounded retries with jitter on
+        connection errors / RETRYABLE_STATUS, one re-authentication on 401/403,
+        circuit breaker and latency histogram. Returns the last response;
+        raises SandboxUnavailable if the circuit is open or no response came.
+        Non-idempotent calls (by default anything but IDEMPOTENT_METHODS) are
+        only retried when they cannot have reached the provider.
+
+        use_breaker=False is for the token fetch made inside another call:
+        that call already holds the breaker's permit (in the half-open state,
+        the single trial) and records the outcome.
+        """
+        if use_breaker and not self.breaker.allow():
+            raise CircuitOpen('Sandbox circuit is open')
+
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+
+        headers = dict(kwargs.pop('headers', {}))
+        reauthenticated = False
+        response = error = None
+        attempt = 0
+        while True:
+            if authenticated:
+                token = self._token(force=reauthenticated)
+                if not token:
+                    if use_breaker:
+                        self.breaker.record_failure()
+                    raise SandboxUnavailable('Sandbox authentication failed')
+                headers['Authorization'] = token
+            started = time.monotonic()
+            try:
+                response = get_session().request(method, url, headers=headers, timeout=self.timeout, **kwargs)
+                error = None
+            except (requests.ConnectionError, requests.Timeout) as e:
+                response, error = None, e
+            finally:
+                record_latency(call, time.monotonic() - started)
+
+            if response is not None and authenticated and response.status_code in (401, 403) and not reauthenticated:
+                # Token revoked or expired early
+                reauthenticated = True
+                continue
+            if response is not None and response.status_code not in RETRYABLE_STATUS:
+                if use_breaker:
+                    self.breaker.record_success()
+                return response
+            if attempt >= self.max_retries or not self._may_retry(idempotent, response, error):
+                break
+            time.sleep(self._backoff(attempt, response))
+            attempt += 1
+
+        if use_breaker and (response is None or response.status_code != 429):
+            # Rate limiting is not an outage
+            self.breaker.record_failure()
+        if response is None:
+            raise SandboxUnavailable(str(error))
+        return response
+
+    def _token(self, force=False):
+        """Cached access token, refreshed proactively by a single worker."""
+        cached = cache.get(TOKEN_CACHE_KEY)
+        now = time.time()
+        if cached is not None and not force:
+            token, expires_at = cached
+            if now < expires_at - TOKEN_REFRESH_MARGIN:
+                return token
+            # Nearly expired: one worker refreshes, the rest keep using it
+            if now < expires_at and not cache.add(f'{TOKEN_CACHE_KEY}:refreshing', 1, 30):
+                return token
+        token = self._authenticate()
+        if token is None and cached is not None and now < cached[1]:
+            return cached[0]
+        return token
 
     def _authenticate(self):
         """Step 1: Get JWT Access Token (Valid for 24 hours)"""
@@ -25,21 +282,23 @@ class SandboxClient:
             'Content-Type': 'application/json'
         }
         try:
-            response = requests.post(url, headers=headers, timeout=15)
+            # Issuing a token has no side effect, so it is retried like a GET
+            response = self._request(
+                'authenticate', 'POST', url, authenticated=False, idempotent=True, use_breaker=False, headers=headers,
+            )
             if response.status_code == 200:
-                self.access_token = response.json().get('data', {}).get('access_token')
-                return True
+                token = response.json().get('data', {}).get('access_token')
+                if token:
+                    cache.set(TOKEN_CACHE_KEY, (token, time.time() + TOKEN_LIFETIME), TOKEN_LIFETIME)
+                    return token
             logger.error(f"Sandbox Auth Failed: {response.text}")
-            return False
+            return None
         except Exception as e:
             logger.error(f"Sandbox Auth Exception: {e}")
-            return False
+            return None
 
     def initiate_digilocker(self, redirect_url):
         """Step 2: Start DigiLocker Session"""
-        if not self.access_token and not self._authenticate():
-            return {'code': 500, 'message': 'Authentication failed'}
-
         url = f"{self.base_url}/kyc/digilocker/sessions/init"
         payload = {
             "@entity": "in.co.sandbox.kyc.digilocker.session.request",
@@ -48,12 +307,11 @@ class SandboxClient:
             "redirect_url": redirect_url
         }
         headers = {
-            'Authorization': self.access_token,
             'x-api-key': self.api_key,
             'Content-Type': 'application/json'
         }
         try:
-            response = requests.post(url, json=payload, headers=headers, timeout=20)
+            response = self._request('initiate_digilocker', 'POST', url, json=payload, headers=headers)
             data = response.json()
             if response.status_code == 200:
                 return {
@@ -64,23 +322,23 @@ class SandboxClient:
                     }
                 }
             return {'code': response.status_code, 'message': data.get('message')}
+        except SandboxUnavailable as e:
+            return {'code': 503, 'message': str(e)}
         except Exception as e:
             return {'code': 500, 'message': str(e)}
 
     def get_kyc_status(self, entity_id):
         """Step 3: Check status and pull Aadhaar XML if ready"""
-        if not self.access_token and not self._authenticate():
-            return {'code': 500, 'message': 'Auth failed'}
-
         url = f"{self.base_url}/kyc/digilocker/sessions/{entity_id}/documents/aadhaar"
         headers = {
-            'Authorization': self.access_token,
             'x-api-key': self.api_key,
             'x-api-version': '1.0'
         }
         
         try:
-            response = requests.get(url, headers=headers, timeout=20)
+            response = self._request('get_kyc_status', 'GET', url, headers=headers)
+            if response.status_code == 429:
+                return {'code': 429, 'message': 'Rate limited'}
             res_data = response.json()
             
             # Case A: JSON Data provided directly
@@ -91,28 +349,41 @@ class SandboxClient:
             files = res_data.get('data', {}).get('files', [])
             if response.status_code == 200 and len(files) > 0:
                 file_url = files[0].get('url')
-                xml_res = requests.get(file_url, timeout=20)
-                # Call the parser method defined below
-                return self._parse_aadhaar_xml(xml_res.text)
-            
+                # Parsed identity is kept briefly (by URL digest), so a repeated
+                # poll of the same session doesn't download the document again
+                cache_key = aadhaar_xml_cache_key(file_url)
+                parsed = cache.get(cache_key)
+                if parsed is None:
+                    # Pre-signed file URL: same pooled session, no auth header
+                    xml_res = self._request('aadhaar_xml', 'GET', file_url, authenticated=False, stream=True)
+                    with xml_res:
+                        if xml_res.status_code != 200:
+                            return {'code': xml_res.status_code, 'message': 'Aadhaar XML download failed'}
+                        parsed = self._parse_aadhaar_xml(xml_res.iter_content(AADHAAR_XML_CHUNK_SIZE))
+                    if parsed['code'] == 200:
+                        cache.set(cache_key, parsed, settings.AADHAAR_XML_CACHE_TIMEOUT)
+                return parsed
+
             return {'code': 202, 'message': 'Processing'}
             
+        except SandboxUnavailable as e:
+            logger.warning(f"Sandbox unavailable: {e}")
+            return {'code': 503, 'message': str(e), 'circuit_open': isinstance(e, CircuitOpen)}
         except Exception as e:
             logger.error(f"Sandbox Fetch Error: {e}")
             return {'code': 500, 'message': str(e)}
 
     def _parse_aadhaar_xml(self, xml_content):
-        """Step 4: Extract identity from Government XML"""
+        """Step 4: Extract identity from Government XML (bytes, str or an iterable of byte chunks)"""
         try:
             if isinstance(xml_content, str):
                 xml_content = xml_content.encode('utf-8')
-            
-            root = ET.fromstring(xml_content)
-            
+            if isinstance(xml_content, bytes):
+                xml_content = [xml_content]
+
             # Locate Identity (Poi) and Address (Poa) tags
-            poi = root.find('.//Poi')
-            poa = root.find('.//Poa')
-            
+            poi, poa = iter_aadhaar_identity(xml_content)
+
             if poi is None:
                 return {'code': 400, 'message': 'Poi data missing in Aadhaar XML'}
 
@@ -132,6 +403,9 @@ class SandboxClient:
                     }
                 }
             }
+        except (UnsafeXML, expat.ExpatError) as e:
+            logger.warning(f"Rejected Aadhaar XML: {e}")
+            return {'code': 400, 'message': 'Invalid identity document'}
         except Exception as e:
             logger.error(f"XML Parse Error: {e}")
-            return {'code': 500, 'message': 'Failed to parse identity document'}
\ No newline at end of file
+            return {'code': 500, 'message': 'Failed to parse identity document'}
@@ -1,6 +1,8 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from .models import KYCVerification
+from apps.uploads.storage import ContentAddressedStorage
+from apps.uploads.tombstones import record_deletions
+from .models import KYCVerification, User
 
 @receiver(post_save, sender=KYCVerification)
 def sync_kyc_status_to_user(sender, instance, created, **kwargs):
@@ -19,3 +21,23 @@ def sync_kyc_status_to_user(sender, instance, created, **kwargs):
         if user.is_kyc_verified:
             user.is_kyc_verified = False
             user.save(update_fields=['is_kyc_verified'])
+
+@receiver(post_delete, sender=KYCVerification)
+def delete_kyc_files(sender, instance, **kwargs):
+    """
+    Queues the Aadhaar and selfie images for deletion (apps/uploads/tombstones.py).
+    A selfie stored before content addressing may still be some user's
+    profile picture (it is shared, not refcounted), which then keeps it.
+    """
+    names = [getattr(instance, field).name for field in ('aadhaar_front_image', 'aadhaar_back_image', 'selfie_image')]
+    legacy = [name for name in names if name and not ContentAddressedStorage.is_blob(name)]
+    shared = set()
+    if legacy:
+        shared.update(User.objects.filter(profile_picture__in=legacy).values_list('profile_picture', flat=True))
+    record_deletions([name for name in names if name not in shared])
+
+@receiver(post_delete, sender=User)
+def delete_profile_picture(sender, instance, **kwargs):
+    """Queues the profile picture for deletion when the user is deleted."""
+    if instance.profile_picture:
+        record_deletions([instance.profile_picture.name])
@@ -1,3 +1,535 @@
-from django.test import TestCase
+import hashlib
+import json
+import re
+import threading
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.contrib.auth.hashers import check_password
+from django.core import mail
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.core.tests import LOCMEM, REDIS, make_user
+from .authentication import APIKeyAuthentication, ClaimsJWTAuthentication
+from .checks import check_stateless_jwt_cache
+from . import kyc_polling
+from .models import APIKeyUsage, ExternalAPIKey, KYCVerification, OTPChallenge, User
+from .otp import _code_hash, issue_otp, sweep_expired_otps, verify_otp
+from .services import AADHAAR_XML_MAX_BYTES, SandboxClient, SandboxUnavailable, UnsafeXML, iter_aadhaar_identity
+from .throttling import APIKeyRateThrottle
+from .tokens import TOKEN_VERSION_CLAIM, ClaimsRefreshToken, user_from_claims
+from .usage import flush_api_key_usage
+
+
+class APIKeyAuthenticationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user(1)
+        key = ExternalAPIKey.objects.create(user=cls.user, name='WhatsApp Bot')
+        cls.key_id, cls.raw_key = key.pk, key._raw_key
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        patcher = mock.patch('apps.users.authentication.check_password', wraps=check_password)
+        self.check_password = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def authenticate(self, raw_key=None):
+        request = RequestFactory().get('/', HTTP_X_API_KEY=raw_key or self.raw_key)
+        return APIKeyAuthentication().authenticate(request)
+
+    def test_repeat_requests_skip_the_hasher(self):
+        user, key = self.authenticate()
+        self.assertEqual((user.pk, key.pk), (self.user.pk, self.key_id))
+        with self.assertNumQueries(1):
+            user, key = self.authenticate()
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(self.check_password.call_count, 1)
+
+    def test_wrong_secret_for_a_verified_prefix_is_rejected(self):
+        self.authenticate()
+        prefix = self.raw_key.split('.')[0]
+        with self.assertRaisesMessage(AuthenticationFailed, 'Invalid API Key'):
+            self.authenticate(f'{prefix}.{"0" * 32}')
+
+    def test_deactivation_applies_while_the_verification_is_cached(self):
+        # queryset updates send no signals: nothing may depend on cache eviction
+        self.authenticate()
+        ExternalAPIKey.objects.filter(pk=self.key_id).update(is_active=False)
+        with self.assertRaisesMessage(AuthenticationFailed, 'API Key is inactive'):
+            self.authenticate()
+
+        ExternalAPIKey.objects.filter(pk=self.key_id).update(is_active=True)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        with self.assertRaisesMessage(AuthenticationFailed, 'User account is inactive'):
+            self.authenticate()
+
+    def test_deleted_key_is_rejected_while_the_verification_is_cached(self):
+        self.authenticate()
+        ExternalAPIKey.objects.filter(pk=self.key_id).delete()
+        with self.assertRaisesMessage(AuthenticationFailed, 'Invalid API Key'):
+            self.authenticate()
+
+
+def allow(key):
+    throttle = APIKeyRateThrottle()
+    return throttle.allow_request(SimpleNamespace(auth=key), None), throttle.wait()
+
+
+class APIKeyRateThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.key = ExternalAPIKey.objects.create(user=make_user(1), name='Bot', rate_limit_per_minute=60, burst=2)
+
+    def usage(self):
+        flush_api_key_usage([timezone.localdate()])
+        return APIKeyUsage.objects.values_list('requests', 'throttled').get(api_key=self.key, day=timezone.localdate())
+
+    def test_burst_then_throttle(self):
+        for _ in range(3):
+            self.assertTrue(allow(self.key)[0])
+        allowed, wait = allow(self.key)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(wait, 1.0, delta=0.5)
+        self.assertEqual(self.usage(), (3, 1))
+
+    def test_daily_quota(self):
+        self.key.daily_quota = 2
+        self.key.rate_limit_per_minute = 6000
+        self.key.save()
+        self.assertEqual([allow(self.key)[0] for _ in range(4)], [True, True, False, False])
+        self.assertEqual(self.usage(), (2, 2))
+
+    def test_requests_without_an_api_key_pass(self):
+        self.assertTrue(APIKeyRateThrottle().allow_request(SimpleNamespace(auth=None), None))
+        self.assertEqual(flush_api_key_usage([timezone.localdate()]), 0)
+
+    def test_flush_never_lowers_stored_totals(self):
+        allow(self.key)
+        self.assertEqual(self.usage(), (1, 0))
+        cache.clear()
+        allow(self.key)
+        self.assertEqual(self.usage(), (1, 0))
+        allow(self.key)
+        self.assertEqual(self.usage(), (2, 0))
+
+
+class APIKeyRateThrottleConcurrencyTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_concurrent_requests_share_one_bucket(self):
+        key = ExternalAPIKey.objects.create(user=make_user(1), name='Bot', rate_limit_per_minute=1, burst=4)
+        threads = 12
+        results, errors = [], []
+        barrier = threading.Barrier(threads)
+
+        def hit():
+            try:
+                barrier.wait()
+                results.append(allow(key)[0])
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=hit) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(results.count(True), key.burst + 1)
+        flush_api_key_usage([timezone.localdate()])
+        usage = APIKeyUsage.objects.get(api_key=key)
+        self.assertEqual((usage.requests, usage.throttled), (key.burst + 1, threads - key.burst - 1))
+
+
+class StatelessJWTCacheCheckTests(SimpleTestCase):
+    @override_settings(JWT_STATELESS_AUTH=True, CACHES=LOCMEM)
+    def test_stateless_auth_needs_a_shared_cache(self):
+        self.assertEqual([e.id for e in check_stateless_jwt_cache(None)], ['users.E001'])
+
+    @override_settings(JWT_STATELESS_AUTH=True, CACHES=REDIS)
+    def test_stateless_auth_with_a_shared_cache(self):
+        self.assertEqual(check_stateless_jwt_cache(None), [])
+
+    @override_settings(JWT_STATELESS_AUTH=False, CACHES=LOCMEM)
+    def test_database_auth_works_with_any_cache(self):
+        self.assertEqual(check_stateless_jwt_cache(None), [])
+
+
+class StatelessJWTTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = make_user(1)
+        self.refresh = ClaimsRefreshToken.for_user(self.user)
+        self.admin = APIClient()
+        self.admin.force_authenticate(make_user(2, is_staff=True))
+
+    def authenticate(self, token=None):
+        token = token or self.refresh.access_token
+        request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        return ClaimsJWTAuthentication().authenticate(request)[0]
+
+    def assertFallsBackToTheDatabase(self):
+        self.assertIsNone(user_from_claims(self.refresh.access_token))
+        with self.assertNumQueries(1):
+            user = self.authenticate()
+        self.assertFalse(getattr(user, '_from_claims', False))
+        return user
+
+    def test_current_token_needs_no_user_query(self):
+        self.authenticate()  # caches the token version
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual((user.role_category, user.is_staff, user.is_kyc_verified), ('BUYER', False, False))
+
+    def test_deferred_columns_load_in_one_query(self):
+        self.authenticate()
+        user = self.authenticate()
+        with self.assertNumQueries(1):
+            self.assertEqual((user.email, user.first_name, user.phone_number), ('user1@example.com', 'User1', '9000000001'))
+
+    def test_role_upgrade_falls_back_to_the_database(self):
+        KYCVerification.objects.create(user=self.user, status='VERIFIED')
+        self.refresh = ClaimsRefreshToken.for_user(User.objects.get(pk=self.user.pk))
+        client = APIClient()
+        client.force_authenticate(User.objects.get(pk=self.user.pk))
+        self.assertEqual(client.post('/api/user/upgrade/', {'role': 'SELLER'}).status_code, 200)
+        self.assertEqual(self.assertFallsBackToTheDatabase().role_category, 'SELLER')
+
+    def test_admin_role_update_falls_back_to_the_database(self):
+        response = self.admin.post(
+            f'/api/admin/users/{self.user.pk}/action/', {'action': 'UPDATE_ROLE', 'role_category': 'BROKER'},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(self.assertFallsBackToTheDatabase().is_active_broker)
+
+    def test_kyc_save_falls_back_to_the_database(self):
+        KYCVerification.objects.create(user=self.user, status='VERIFIED')
+        self.assertTrue(self.assertFallsBackToTheDatabase().is_kyc_verified)
+
+    def test_blocked_user_is_rejected(self):
+        self.authenticate()
+        response = self.admin.post(f'/api/admin/users/{self.user.pk}/action/', {'action': 'BLOCK'})
+        self.assertEqual(response.status_code, 200)
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_refresh_restamps_the_claims(self):
+        user = User.objects.get(pk=self.user.pk)
+        user.role_category = 'SELLER'
+        user.is_active_seller = True
+        user.save()
+        response = APIClient().post('/api/auth/token/refresh/', {'refresh': str(self.refresh)})
+        self.assertEqual(response.status_code, 200, response.data)
+        access = AccessToken(response.data['access'])
+        user.refresh_from_db()
+        self.assertEqual((access['role_category'], access[TOKEN_VERSION_CLAIM]), ('SELLER', user.token_version))
+        self.assertEqual(user_from_claims(access).role_category, 'SELLER')
+        self.assertIsNone(user_from_claims(self.refresh.access_token))
+
+    def test_refresh_of_a_blocked_user_is_rejected(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        response = APIClient().post('/api/auth/token/refresh/', {'refresh': str(self.refresh)})
+        self.assertEqual(response.status_code, 401)
+
+
+class OTPTests(TestCase):
+    email = 'buyer@example.com'
+
+    def test_only_a_keyed_hash_of_the_code_is_stored(self):
+        code = issue_otp(self.email)
+        challenge = OTPChallenge.objects.get(email=self.email)
+        self.assertRegex(code, r'^\d{6}$')
+        self.assertNotIn(code, challenge.code_hash)
+        self.assertEqual(challenge.code_hash, _code_hash(self.email, code))
+        # Keyed and bound to the email: neither a bare digest nor reusable across emails
+        self.assertNotEqual(challenge.code_hash, hashlib.sha256(code.encode()).hexdigest())
+        self.assertNotEqual(challenge.code_hash, _code_hash('other@example.com', code))
+
+    def test_code_is_consumed_on_success(self):
+        code = issue_otp(self.email)
+        self.assertTrue(verify_otp(self.email, code))
+        self.assertFalse(OTPChallenge.objects.filter(email=self.email).exists())
+        self.assertFalse(verify_otp(self.email, code))
+
+    def test_reissue_replaces_the_code_and_resets_attempts(self):
+        old = issue_otp(self.email)
+        verify_otp(self.email, 'wrong')
+        new = issue_otp(self.email)
+        challenge = OTPChallenge.objects.get(email=self.email)
+        self.assertEqual(challenge.attempts, 0)
+        if old != new:
+            self.assertFalse(verify_otp(self.email, old))
+        self.assertTrue(verify_otp(self.email, new))
+
+    def test_expired_code_is_rejected(self):
+        code = issue_otp(self.email)
+        OTPChallenge.objects.filter(email=self.email).update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertFalse(verify_otp(self.email, code))
+
+    def test_attempt_limit_locks_the_challenge(self):
+        code = issue_otp(self.email)
+        for _ in range(OTPChallenge.MAX_ATTEMPTS):
+            self.assertFalse(verify_otp(self.email, '000000' if code != '000000' else '111111'))
+        self.assertEqual(OTPChallenge.objects.get(email=self.email).attempts, OTPChallenge.MAX_ATTEMPTS)
+        self.assertFalse(verify_otp(self.email, code))
+
+    def test_missing_email_or_code_is_rejected(self):
+        issue_otp(self.email)
+        self.assertFalse(verify_otp(self.email, None))
+        self.assertFalse(verify_otp('', '123456'))
+        self.assertEqual(OTPChallenge.objects.get(email=self.email).attempts, 0)
+
+    def test_sweep_removes_only_expired_challenges(self):
+        issue_otp(self.email)
+        issue_otp('stale@example.com')
+        OTPChallenge.objects.filter(email='stale@example.com').update(expires_at=timezone.now())
+        self.assertEqual(sweep_expired_otps(), 1)
+        self.assertEqual(list(OTPChallenge.objects.values_list('email', flat=True)), [self.email])
+
+
+class OTPLoginTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client = APIClient()
+
+    def test_login_and_verify(self):
+        email = 'new@example.com'
+        self.assertEqual(self.client.post('/api/auth/login/', {'email': email}).status_code, 200)
+        [message] = mail.outbox
+        code = re.match(r'\d{6}', message.subject).group()
+        self.assertFalse(User.objects.filter(email=email).exists())
+
+        self.assertEqual(self.client.post('/api/auth/verify/', {'email': email, 'otp': '0'}).status_code, 400)
+        response = self.client.post('/api/auth/verify/', {'email': email, 'otp': code})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', response.data)
+        self.assertTrue(User.objects.filter(email=email).exists())
+        self.assertEqual(self.client.post('/api/auth/verify/', {'email': email, 'otp': code}).status_code, 400)
+
+
+def sandbox_response(status_code, body=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = json.dumps(body or {}).encode()
+    return response
+
+
+@override_settings(SANDBOX_MAX_RETRIES=2)
+class SandboxRetryTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.session = mock.Mock()
+        for target, value in (
+            ('apps.users.services.get_session', mock.Mock(return_value=self.session)),
+            ('apps.users.services.time.sleep', mock.Mock()),
+            ('apps.users.services.SandboxClient._token', mock.Mock(return_value='token')),
+        ):
+            patcher = mock.patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client = SandboxClient()
+
+    def test_status_lookups_are_retried(self):
+        self.session.request.side_effect = [sandbox_response(502), requests.ReadTimeout(), sandbox_response(200)]
+        response = self.client._request('get_kyc_status', 'GET', 'https://sandbox/status')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.session.request.call_count, 3)
+
+    def test_session_init_is_not_resent_after_it_may_have_run(self):
+        self.session.request.side_effect = [sandbox_response(502)]
+        result = self.client.initiate_digilocker('https://app/kyc/callback')
+        self.assertEqual(result['code'], 502)
+        self.assertEqual(self.session.request.call_count, 1)
+
+        self.session.request.reset_mock()
+        self.session.request.side_effect = [requests.ReadTimeout()]
+        self.assertEqual(self.client.initiate_digilocker('https://app/kyc/callback')['code'], 503)
+        self.assertEqual(self.session.request.call_count, 1)
+
+    def test_session_init_is_resent_when_it_never_ran(self):
+        ok = sandbox_response(200, {'data': {'session_id': 's1', 'authorization_url': 'https://digilocker'}})
+        self.session.request.side_effect = [requests.ConnectTimeout(), sandbox_response(429), ok]
+        result = self.client.initiate_digilocker('https://app/kyc/callback')
+        self.assertEqual(result['data']['entity_id'], 's1')
+        self.assertEqual(self.session.request.call_count, 3)
+
+    def test_failures_still_raise(self):
+        self.session.request.side_effect = requests.ConnectionError()
+        with self.assertRaises(SandboxUnavailable):
+            self.client._request('initiate_digilocker', 'POST', 'https://sandbox/init')
+        self.assertEqual(self.session.request.call_count, 1)
+
+
+class SandboxBreakerTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.session = mock.Mock()
+        patcher = mock.patch('apps.users.services.get_session', mock.Mock(return_value=self.session))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = SandboxClient()
+        self.breaker = self.client.breaker
+
+    def half_open(self):
+        cache.set(self.breaker.open_key, time.time() - 1, 600)
+
+    def test_trial_call_can_fetch_a_token(self):
+        self.half_open()
+        token = sandbox_response(200, {'data': {'access_token': 'token'}})
+        self.session.request.side_effect = [token, sandbox_response(200)]
+        response = self.client._request('get_kyc_status', 'GET', 'https://sandbox/status')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.session.request.call_count, 2)
+        # The trial succeeded: the circuit is closed again
+        self.assertIsNone(cache.get(self.breaker.open_key))
+        self.assertTrue(self.breaker.allow())
+
+    def test_failed_token_fetch_fails_the_trial(self):
+        self.half_open()
+        self.session.request.side_effect = [sandbox_response(400)]
+        with self.assertRaises(SandboxUnavailable):
+            self.client._request('get_kyc_status', 'GET', 'https://sandbox/status')
+        self.assertEqual(cache.get(self.breaker.failures_key), 1)
+        # Still open: the permit is spent until the cooldown runs out
+        self.assertFalse(self.breaker.allow())
+
+
+AADHAAR_XML = (
+    '<?xml version="1.0" encoding="{encoding}"?>{doctype}'
+    '<OfflinePaperlessKyc referenceId="1234"><UidData>'
+    '<Poi name="{name}" dob="01-01-1990" gender="F"/>'
+    '<Poa house="12" dist="Pune" state="Maharashtra" pc="411001"/>'
+    '<Pht>{photo}</Pht></UidData></OfflinePaperlessKyc>'
+)
+
+
+def aadhaar_xml(encoding='UTF-8', doctype='', name='Asha', photo='QUJD' * 1000):
+    return AADHAAR_XML.format(encoding=encoding, doctype=doctype, name=name, photo=photo).encode(encoding)
+
+
+def in_chunks(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class AadhaarXMLTests(SimpleTestCase):
+    BOMB = '<!DOCTYPE lolz [<!ENTITY lol "lol"><!ENTITY lol2 "&lol;&lol;&lol;">]>'
+
+    def test_identity_split_across_chunks(self):
+        for size in (1, 7, 64):
+            poi, poa = iter_aadhaar_identity(in_chunks(aadhaar_xml(), size))
+            self.assertEqual((poi['name'], poa['pc']), ('Asha', '411001'))
+
+    def test_reading_stops_before_the_photo(self):
+        data = aadhaar_xml()
+        chunks = iter(in_chunks(data, 64))
+        iter_aadhaar_identity(chunks)
+        remaining = sum(len(chunk) for chunk in chunks)
+        self.assertGreater(remaining, len(data) - data.index(b'<Pht>') - 64)
+
+    def test_utf16_document(self):
+        poi, poa = iter_aadhaar_identity(in_chunks(aadhaar_xml('UTF-16', name='आशा'), 33))
+        self.assertEqual((poi['name'], poa['dist']), ('आशा', 'Pune'))
+
+    def test_doctype_is_rejected(self):
+        for encoding in ('UTF-8', 'UTF-16'):
+            with self.subTest(encoding=encoding), self.assertRaises(UnsafeXML):
+                data = aadhaar_xml(encoding, doctype=self.BOMB, name='&lol2;')
+                iter_aadhaar_identity(in_chunks(data, 16))
+
+    def test_size_cap(self):
+        data = aadhaar_xml(photo='A' * AADHAAR_XML_MAX_BYTES).replace(b'<Poi', b'<Pox')
+        with self.assertRaises(UnsafeXML):
+            iter_aadhaar_identity(in_chunks(data, 1024 * 1024))
+
+    def test_parse_results(self):
+        client = SandboxClient()
+        self.assertEqual(client._parse_aadhaar_xml(aadhaar_xml())['data']['aadhaar_data']['name'], 'Asha')
+        self.assertEqual(client._parse_aadhaar_xml(aadhaar_xml(doctype=self.BOMB))['code'], 400)
+        self.assertEqual(client._parse_aadhaar_xml(b'<OfflinePaperlessKyc><UidData>')['code'], 400)
+        self.assertEqual(client._parse_aadhaar_xml(b'<a><b></a>')['code'], 400)
+        missing_poi = aadhaar_xml().replace(b'<Poi', b'<Pox')
+        self.assertEqual(client._parse_aadhaar_xml(missing_poi)['code'], 400)
+
+
+class KYCStatusTests(TestCase):
+    def setUp(self):
+        self.user = make_user(1)
+        self.kyc = KYCVerification.objects.create(
+            user=self.user, request_id='session-1', status='INITIATED', next_poll_at=timezone.now(),
+        )
+        cache.clear()
+        self.addCleanup(cache.clear)
+        patcher = mock.patch.object(kyc_polling.sandbox, 'get_kyc_status', return_value={'code': 202})
+        self.get_kyc_status = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_pending_session_answers_at_once_with_retry_after(self):
+        with mock.patch('time.sleep') as sleep:
+            response = self.client.post('/api/kyc/verify-status/', {'wait': 20})
+        sleep.assert_not_called()
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['status'], 'PROCESSING')
+        self.assertEqual(self.get_kyc_status.call_count, 1)
+        self.assertGreater(int(response['Retry-After']), 0)
+
+        # Not due again yet: answered from the row without an upstream call
+        self.assertEqual(self.client.post('/api/kyc/verify-status/').status_code, 202)
+        self.assertEqual(self.get_kyc_status.call_count, 1)
+
+    def test_poll_counts_attempts_in_the_database(self):
+        stale = KYCVerification.objects.get(pk=self.kyc.pk)
+        KYCVerification.objects.filter(pk=self.kyc.pk).update(poll_attempts=3)
+        kyc_polling.poll_session(stale)
+        self.assertEqual(KYCVerification.objects.get(pk=self.kyc.pk).poll_attempts, 4)
+
+    @override_settings(KYC_POLL_MAX_ATTEMPTS=2)
+    def test_polls_refused_unprocessed_do_not_spend_the_budget(self):
+        KYCVerification.objects.filter(pk=self.kyc.pk).update(poll_attempts=1)
+        # The real client, with the circuit open: no request is sent
+        self.get_kyc_status.side_effect = lambda entity_id: SandboxClient.get_kyc_status(kyc_polling.sandbox, entity_id)
+        cache.set(kyc_polling.sandbox.breaker.open_key, time.time() + 60)
+        with mock.patch('apps.users.services.get_session') as get_session:
+            for _ in range(3):
+                self.assertEqual(kyc_polling.poll_session(self.kyc), 'INITIATED')
+        get_session.assert_not_called()
+
+        self.get_kyc_status.side_effect = None
+        self.get_kyc_status.return_value = {'code': 429}
+        self.assertEqual(kyc_polling.poll_session(self.kyc), 'INITIATED')
+        kyc = KYCVerification.objects.get(pk=self.kyc.pk)
+        self.assertEqual((kyc.status, kyc.poll_attempts, kyc.last_poll_code), ('INITIATED', 1, 429))
+
+        # The provider itself failing still counts
+        self.get_kyc_status.return_value = {'code': 503}
+        self.assertEqual(kyc_polling.poll_session(self.kyc), 'FAILED')
+
+    @override_settings(KYC_POLL_MAX_ATTEMPTS=2)
+    def test_session_fails_after_the_last_attempt(self):
+        KYCVerification.objects.filter(pk=self.kyc.pk).update(poll_attempts=1)
+        self.assertEqual(kyc_polling.poll_session(self.kyc), 'FAILED')
+        kyc = KYCVerification.objects.get(pk=self.kyc.pk)
+        self.assertEqual((kyc.status, kyc.poll_attempts, kyc.next_poll_at), ('FAILED', 2, None))
@@ -0,0 +1,136 @@
+import threading
+import time
+from datetime import timedelta
+
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from django.utils import timezone
+from rest_framework.throttling import BaseThrottle
+
+from .models import ExternalAPIKey
+
+# Usage counters outlive their day long enough for the next flush
+USAGE_TIMEOUT = 3 * 86400
+
+# One round trip: the daily quota, the GCRA bucket and the usage counters
+# are checked and updated together, atomically, inside Redis.
+# KEYS: bucket, requests counter, throttled counter
+# ARGV: now, interval, burst allowance, daily quota (-1 = none), counter TTL
+# Returns nil when allowed, 'quota' when the day's quota is used up, or the
+# seconds to wait for the bucket (as a string: Lua numbers become integers)
+THROTTLE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local quota = tonumber(ARGV[4])
+local function refuse(reason)
+    redis.call('INCR', KEYS[3])
+    redis.call('EXPIRE', KEYS[3], ARGV[5])
+    return reason
+end
+if quota >= 0 and (tonumber(redis.call('GET', KEYS[2])) or 0) >= quota then
+    return refuse('quota')
+end
+local tat = math.max(tonumber(redis.call('GET', KEYS[1])) or now, now)
+local ahead = tat - now - tonumber(ARGV[3])
+if ahead > 0 then
+    return refuse(string.format('%.6f', ahead))
+end
+tat = tat + tonumber(ARGV[2])
+redis.call('SET', KEYS[1], string.format('%.6f', tat), 'PX', math.ceil((tat - now) * 1000))
+redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[5])
+return nil
+"""
+
+# Caches without scripting are private to the process (see
+# apps/core/checks.py), so a lock makes the same steps atomic there
+_local_lock = threading.Lock()
+
+
+def bucket_cache_key(key_id):
+    return f'users:api-key-tat:{key_id}'
+
+
+def usage_cache_key(key_id, day, metric='requests'):
+    return f'users:api-key-usage:{key_id}:{day}:{metric}'
+
+
+def _incr(cache, key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, USAGE_TIMEOUT)
+        return cache.incr(key)
+
+
+def _throttle_locally(cache, keys, now, interval, allowance, quota):
+    bucket_key, requests_key, throttled_key = keys
+    with _local_lock:
+        state = cache.get_many([bucket_key, requests_key])
+        if quota >= 0 and state.get(requests_key, 0) >= quota:
+            _incr(cache, throttled_key)
+            return 'quota'
+        tat = max(state.get(bucket_key, now), now)
+        if tat - now > allowance:
+            _incr(cache, throttled_key)
+            return tat - now - allowance
+        tat += interval
+        cache.set(bucket_key, tat, int(tat - now) + 1)
+        _incr(cache, requests_key)
+        return None
+
+
+def throttle_api_key(key_obj, now, day):
+    """
+    Counts one request against the key's bucket and daily quota. Returns
+    None if it is allowed, 'quota' if the day's quota is used up, or the
+    seconds until the bucket admits another request.
+    """
+    cache = caches['default']
+    keys = (
+        bucket_cache_key(key_obj.pk),
+        usage_cache_key(key_obj.pk, day),
+        usage_cache_key(key_obj.pk, day, 'throttled'),
+    )
+    interval = 60.0 / max(key_obj.rate_limit_per_minute, 1)
+    allowance = interval * key_obj.burst
+    quota = -1 if key_obj.daily_quota is None else key_obj.daily_quota
+    if not isinstance(cache, RedisCache):
+        return _throttle_locally(cache, keys, now, interval, allowance, quota)
+
+    # Writes go to the first server, so all three keys live together
+    client = cache._cache.get_client(write=True)
+    result = client.register_script(THROTTLE_SCRIPT)(
+        keys=[cache.make_and_validate_key(key) for key in keys],
+        args=[repr(now), repr(interval), repr(allowance), quota, USAGE_TIMEOUT],
+    )
+    if result is None:
+        return None
+    result = result.decode()
+    return result if result == 'quota' else float(result)
+
+
+class APIKeyRateThrottle(BaseThrottle):
+    """
+    Per-ExternalAPIKey token bucket (GCRA: one "theoretical arrival time" per
+    key) using the key's rate_limit_per_minute and burst, plus the optional
+    daily_quota. The bucket and the per-day request/throttled counters live
+    in the shared cache and are updated by one Redis script per request, so
+    the limits hold across workers; flush_api_key_usage copies the counters
+    to APIKeyUsage. Requests not authenticated by an API key pass through.
+    """
+    def allow_request(self, request, view):
+        key_obj = request.auth
+        if not isinstance(key_obj, ExternalAPIKey):
+            return True
+
+        refused = throttle_api_key(key_obj, time.time(), timezone.localdate())
+        if refused is None:
+            return True
+        if refused == 'quota':
+            midnight = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+            refused = (midnight - timezone.localtime()).total_seconds()
+        self._wait = refused
+        return False
+
+    def wait(self):
+        return getattr(self, '_wait', None)
@@ -0,0 +1,92 @@
+from functools import partial
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import User
+
+TOKEN_VERSION_CLAIM = 'tv'
+TOKEN_VERSION_TIMEOUT = 86400
+
+
+def token_version_cache_key(user_id):
+    return f'users:token-version:{user_id}'
+
+
+def get_token_version(user_id):
+    """Current token version of a user: cache first, the DB on a miss."""
+    key = token_version_cache_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = User.objects.filter(pk=user_id).values_list('token_version', flat=True).first()
+        if version is None:
+            return None
+        cache.set(key, version, TOKEN_VERSION_TIMEOUT)
+    return version
+
+
+def bump_token_version(user_id):
+    """Invalidates the claims of every token issued to the user so far."""
+    User.objects.filter(pk=user_id).update(token_version=F('token_version') + 1)
+    key = token_version_cache_key(user_id)
+    cache.delete(key)
+    # A request may re-cache the old version before the bump commits
+    transaction.on_commit(partial(cache.delete, key))
+
+
+class ClaimsRefreshToken(RefreshToken):
+    """RefreshToken that also carries User.CLAIM_FIELDS and the token version."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        stamp_claims(token, user)
+        return token
+
+
+def stamp_claims(token, user):
+    for field in User.CLAIM_FIELDS:
+        token[field] = getattr(user, field)
+    token[TOKEN_VERSION_CLAIM] = user.token_version
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """Re-stamps the claims from the user row so a refresh picks up changes."""
+    token_class = ClaimsRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user_id = refresh.get(api_settings.USER_ID_CLAIM)
+        user = User.objects.filter(pk=user_id, is_active=True).first()
+        if user is None:
+            raise InvalidToken('User not found or inactive')
+        stamp_claims(refresh, user)
+        attrs['refresh'] = str(refresh)
+        return super().validate(attrs)
+
+
+def user_from_claims(token):
+    """
+    Builds a User from a token's claims without touching the DB, or returns
+    None when the claims are missing or older than the user's token version.
+    Columns not in the claims are deferred and loaded together on first use.
+    """
+    try:
+        user_id = token[api_settings.USER_ID_CLAIM]
+        values = {field: token[field] for field in User.CLAIM_FIELDS}
+        version = token[TOKEN_VERSION_CLAIM]
+    except KeyError:
+        return None
+    if get_token_version(user_id) != version:
+        return None
+    # Blocking bumps the version, so a current token implies an active user
+    values.update(id=User._meta.pk.to_python(user_id), is_active=True, token_version=version)
+    fields = [f.attname for f in User._meta.concrete_fields if f.attname in values]
+    user = User.from_db('default', fields, [values[name] for name in fields])
+    user._from_claims = True
+    return user
@@ -0,0 +1,33 @@
+from django.core.cache import cache
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from .models import APIKeyUsage, ExternalAPIKey
+from .throttling import usage_cache_key
+
+
+def flush_api_key_usage(days):
+    """
+    Copies the cached per-day counters of every API key into APIKeyUsage.
+    Counts only ever grow, so a counter lost from the cache can't lower a
+    stored total. Returns the number of (key, day) rows written.
+    """
+    key_ids = list(ExternalAPIKey.objects.values_list('pk', flat=True))
+    written = 0
+    for day in days:
+        keys = {
+            (key_id, metric): usage_cache_key(key_id, day, metric)
+            for key_id in key_ids for metric in ('requests', 'throttled')
+        }
+        counters = cache.get_many(list(keys.values()))
+        for key_id in key_ids:
+            requests = counters.get(keys[key_id, 'requests'], 0)
+            throttled = counters.get(keys[key_id, 'throttled'], 0)
+            if not (requests or throttled):
+                continue
+            usage, _ = APIKeyUsage.objects.get_or_create(api_key_id=key_id, day=day)
+            APIKeyUsage.objects.filter(pk=usage.pk).update(
+                requests=Greatest(F('requests'), requests), throttled=Greatest(F('throttled'), throttled),
+            )
+            written += 1
+    return written
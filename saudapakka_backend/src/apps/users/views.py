@@ -1,9 +1,9 @@
-import random
 import logging
 from django.conf import settings
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 from django.db.models import Q
+from django.core.files.uploadedfile import UploadedFile
 from django.core.mail import EmailMultiAlternatives
 from django.utils.html import strip_tags
 
@@ -12,13 +12,17 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.throttling import AnonRateThrottle
-from rest_framework_simplejwt.tokens import RefreshToken
+from .tokens import ClaimsRefreshToken
+from .otp import issue_otp, verify_otp
+from .kyc_polling import poll_if_due, schedule_defaults
 
 # Internal App Imports
 from .models import KYCVerification, BrokerProfile
 from .serializers import UserSerializer
 from .services import SandboxClient
 from apps.properties.models import Property
+from apps.uploads.services import completed_kyc_uploads, consume_kyc_uploads
+from apps.uploads.storage import retain_file
 
 
 
@@ -47,24 +51,9 @@ class SendOtpView(APIView):
         if not email:
             return Response({'error': 'Email is required'}, status=400)
 
-        otp = str(random.randint(100000, 999999))
-        # OTP Generation Logic
-        # (Debug print removed)
-        
-        # FIX: Generate a temp unique phone number to satisfy unique constraint
-        # max_length=15. "temp_" (5) + 8 chars = 13 chars.
-        import uuid
-        user, created = User.objects.get_or_create(
-            email=email, 
-            defaults={
-                'username': email,
-                'phone_number': f"temp_{uuid.uuid4().hex[:8]}"
-            }
-        )
-        
-        user.otp = otp
-        user.otp_created_at = timezone.now()
-        user.save()
+        # Only the hashed code is stored (OTPChallenge); the User row is
+        # created on successful verification, not here
+        otp = issue_otp(email)
         
         # Professional Email Template
         subject = f"{otp} is your SaudaPakka verification code"
@@ -100,25 +89,29 @@ class VerifyOtpView(APIView):
         email = request.data.get('email')
         otp = request.data.get('otp')
         
-        try:
-            user = User.objects.get(email=email)
-            # Check OTP match and 5-minute expiry
-            if user.otp == otp and (timezone.now() - user.otp_created_at).total_seconds() < 300:
-                user.otp = None # Clear OTP after success
-                user.save()
-                
-                # Update last_login timestamp
-                update_last_login(None, user)
-                
-                refresh = RefreshToken.for_user(user)
-                return Response({
-                    'refresh': str(refresh),
-                    'access': str(refresh.access_token),
-                    'user': UserSerializer(user).data
-                })
+        if not verify_otp(email, otp):
             return Response({'error': 'Invalid or expired OTP'}, status=400)
-        except User.DoesNotExist:
-            return Response({'error': 'User not found'}, status=404)
+
+        # FIX: Generate a temp unique phone number to satisfy unique constraint
+        # max_length=15. "temp_" (5) + 8 chars = 13 chars.
+        import uuid
+        user, created = User.objects.get_or_create(
+            email=email, 
+            defaults={
+                'username': email,
+                'phone_number': f"temp_{uuid.uuid4().hex[:8]}"
+            }
+        )
+        
+        # Update last_login timestamp
+        update_last_login(None, user)
+        
+        refresh = ClaimsRefreshToken.for_user(user)
+        return Response({
+            'refresh': str(refresh),
+            'access': str(refresh.access_token),
+            'user': UserSerializer(user).data
+        })
 
 # --- 2. PROFILE & SEARCH VIEWS ---
 
@@ -175,7 +168,7 @@ class InitiateKYCView(APIView):
             
             KYCVerification.objects.update_or_create(
                 user=request.user,
-                defaults={'request_id': result['data']['entity_id'], 'status': 'INITIATED'}
+                defaults={'request_id': result['data']['entity_id'], 'status': 'INITIATED', **schedule_defaults()}
             )
             return Response(result['data'])
         
@@ -202,40 +195,41 @@ class KYCCallbackView(APIView):
         })
 
 class VerifyKYCStatusView(APIView):
+    """
+    Reports the caller's DigiLocker session from the local KYCVerification
+    row, which the poller (apps/users/kyc_polling.py) keeps up to date. If the
+    session is due it is polled inline, so upstream calls stay on the same
+    backoff schedule however often the client asks. The request never waits
+    for the session to settle (that would hold a sync worker); a pending
+    answer carries Retry-After, the time until the next scheduled poll.
+    """
     permission_classes = [IsAuthenticated]
 
+    # last_poll_code -> status reported while the session is still open
+    PENDING_STATUS = {429: 'RATE_LIMITED', 503: 'UNAVAILABLE'}
+
     def post(self, request):
-        entity_id = request.data.get('entity_id')
-        logger.debug(f"Verifying KYC ID: {entity_id}")
-        
-        result = sandbox.get_kyc_status(entity_id)
-        
-        if result.get('code') == 200:
-            aadhaar = result.get('data', {}).get('aadhaar_data', {})
-            
-            if not aadhaar or not aadhaar.get('name'):
-                 return Response({"status": "PROCESSING"}, status=202)
-
-            # SAVE DATA
-            kyc = KYCVerification.objects.get(user=request.user)
-            kyc.full_name = aadhaar.get('name')
-            kyc.dob = aadhaar.get('dob')
-            kyc.address_json = aadhaar.get('address')
-            kyc.status = 'VERIFIED'
-            kyc.save()
-            
-            # Update User profile AND cached KYC status
-            user = request.user
-            user.first_name = kyc.full_name.split(' ')[0]
-            user.is_kyc_verified = True  # Cache KYC status for performance
-            user.save()
+        try:
+            kyc = KYCVerification.objects.select_related('user').get(user=request.user)
+        except KYCVerification.DoesNotExist:
+            return Response({"error": "No KYC session found"}, status=404)
+        logger.debug(f"Verifying KYC ID: {kyc.request_id}")
 
-            logger.info(f"KYC verification successful for {user.email}")
-            return Response({"status": "SUCCESS", "data": {"name": kyc.full_name}})
+        poll_if_due(kyc)
+        kyc.refresh_from_db(fields=['status', 'full_name', 'next_poll_at', 'last_poll_code'])
 
-        # If rate limited or processing
-        status_code = 202 if result.get('code') in [202, 429] else 400
-        return Response({"status": "PROCESSING"}, status=status_code)
+        if kyc.status == 'VERIFIED':
+            return Response({"status": "SUCCESS", "data": {"name": kyc.full_name}})
+        if kyc.status == 'FAILED':
+            return Response({"status": "FAILED"}, status=400)
+
+        retry_after = 0
+        if kyc.next_poll_at:
+            retry_after = max(0, int((kyc.next_poll_at - timezone.now()).total_seconds()) + 1)
+        return Response(
+            {"status": self.PENDING_STATUS.get(kyc.last_poll_code, "PROCESSING"), "retry_after": retry_after},
+            status=202, headers={'Retry-After': str(retry_after)},
+        )
 
 class UploadAadhaarView(APIView):
     """
@@ -245,9 +239,14 @@ class UploadAadhaarView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
-        aadhaar_front = request.FILES.get('aadhaar_front')
-        aadhaar_back = request.FILES.get('aadhaar_back')
-        selfie = request.FILES.get('selfie')
+        # Images sent through the resumable upload API (apps/uploads) for
+        # this submission are already attached to the KYC record and were
+        # checked on completion; older images on the record don't count
+        existing = KYCVerification.objects.filter(user=request.user).first()
+        uploaded = completed_kyc_uploads(request.user, existing)
+        aadhaar_front = request.FILES.get('aadhaar_front') or uploaded.get('aadhaar_front_image')
+        aadhaar_back = request.FILES.get('aadhaar_back') or uploaded.get('aadhaar_back_image')
+        selfie = request.FILES.get('selfie') or uploaded.get('selfie_image')
         
         # Validation
         if not aadhaar_front or not aadhaar_back or not selfie:
@@ -257,9 +256,10 @@ class UploadAadhaarView(APIView):
         
         # Validate file types
         allowed_types = ['image/jpeg', 'image/jpg', 'image/png']
-        if (aadhaar_front.content_type not in allowed_types or 
-            aadhaar_back.content_type not in allowed_types or
-            selfie.content_type not in allowed_types):
+        if any(
+            isinstance(image, UploadedFile) and image.content_type not in allowed_types
+            for image in (aadhaar_front, aadhaar_back, selfie)
+        ):
             return Response({
                 "error": "Invalid file format. Please upload JPG or PNG images only."
             }, status=400)
@@ -298,6 +298,7 @@ class UploadAadhaarView(APIView):
                     'verified_by': 'AUTO_UPLOAD'
                 }
             )
+            consume_kyc_uploads(request.user)
             
             # Save requested role if provided
             requested_role = request.data.get('requested_role')
@@ -310,8 +311,12 @@ class UploadAadhaarView(APIView):
             user.is_kyc_verified = True
             
             # Set selfie as profile picture using the saved file from KYC verification
-            if kyc_verification.selfie_image:
-                user.profile_picture = kyc_verification.selfie_image
+            selfie_image = kyc_verification.selfie_image
+            if selfie_image and user.profile_picture.name != selfie_image.name:
+                # Counted through the selfie's storage; the replaced picture's
+                # reference is released on save (apps/uploads/signals.py)
+                retain_file(selfie_image)
+                user.profile_picture = selfie_image.name
             
             if requested_role:
                 user.role_category = requested_role
@@ -50,11 +50,13 @@ INSTALLED_APPS = [
     'corsheaders',
     
     # Custom Apps
+    'apps.core',
     'apps.users',
     'apps.properties',
     'apps.mandates',
     'apps.notifications',
     'apps.admin_panel',
+    'apps.uploads',
 ]
 
 MIDDLEWARE = [
@@ -107,6 +109,36 @@ DATABASES = {
 }
 
 
+# =============================================================================
+# CACHE
+# =============================================================================
+
+# e.g. CACHE_URL=rediscache://redis:6379/1 (docker-compose runs Redis). The
+# per-process memory cache is for runserver and tests only: `check --deploy`,
+# run by entrypoint.sh, rejects it (see apps/core/checks.py)
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+
+# Seconds a /api/properties/facets/ result is reused for the same filters
+PROPERTY_FACETS_CACHE_TIMEOUT = env.int('PROPERTY_FACETS_CACHE_TIMEOUT', default=60)
+
+# Comparables payloads are invalidated when a neighbour list changes
+PROPERTY_COMPARABLES_CACHE_TIMEOUT = env.int('PROPERTY_COMPARABLES_CACHE_TIMEOUT', default=3600)
+
+# Homepage feed; also dropped by every recompute_rank_scores run
+PROPERTY_FEATURED_CACHE_TIMEOUT = env.int('PROPERTY_FEATURED_CACHE_TIMEOUT', default=300)
+
+# Owner contact reveals: distinct listings per user and day (staff exempt)
+CONTACT_REVEAL_DAILY_QUOTA = env.int('CONTACT_REVEAL_DAILY_QUOTA', default=50)
+# ContactReveal audit rows are written in batches of this size / age
+CONTACT_REVEAL_BUFFER_SIZE = env.int('CONTACT_REVEAL_BUFFER_SIZE', default=100)
+CONTACT_REVEAL_BUFFER_SECONDS = env.int('CONTACT_REVEAL_BUFFER_SECONDS', default=10)
+
+# Verified X-API-KEY lookups (the PBKDF2 check runs once per key per timeout)
+API_KEY_AUTH_CACHE_TIMEOUT = env.int('API_KEY_AUTH_CACHE_TIMEOUT', default=300)
+
+
 # =============================================================================
 # PASSWORD VALIDATION
 # =============================================================================
@@ -141,6 +173,9 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 # Nginx serves /media/ from /app/media
 MEDIA_URL = '/media/'
 MEDIA_ROOT = '/app/media'
+# Property images/documents and KYC images are stored once per distinct content
+# (apps/uploads/storage.py); existing file names keep working either way
+MEDIA_CONTENT_ADDRESSED = env.bool('MEDIA_CONTENT_ADDRESSED', default=True)
 
 
 # =============================================================================
@@ -173,12 +208,19 @@ DEFAULT_FROM_EMAIL = _from_email_clean
 # REST FRAMEWORK & JWT
 # =============================================================================
 
+# Opt-in: authenticate JWTs from their role/staff/KYC claims (see apps/users/tokens.py).
+# Needs a shared CACHE_URL: the users.E001 check refuses to start otherwise.
+JWT_STATELESS_AUTH = env.bool('JWT_STATELESS_AUTH', default=False)
+
 REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        # JSONRenderer that uses orjson when installed
+        'apps.core.renderers.FastJSONRenderer',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # Stateless mode builds request.user from signed token claims (no user query)
+        'apps.users.authentication.ClaimsJWTAuthentication' if JWT_STATELESS_AUTH
+        else 'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
@@ -201,6 +243,8 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
+    # Refreshing re-reads the user so the embedded claims stay current
+    'TOKEN_REFRESH_SERIALIZER': 'apps.users.tokens.ClaimsTokenRefreshSerializer',
 }
 
 
@@ -311,6 +355,21 @@ LOGGING = {
 SANDBOX_API_KEY = env('SANDBOX_API_KEY', default='')
 SANDBOX_API_SECRET = env('SANDBOX_API_SECRET', default='')
 SANDBOX_BASE_URL = env('SANDBOX_BASE_URL', default='https://api.sandbox.co.in')
+# HTTP client (apps/users/services.py); point SANDBOX_BASE_URL at scripts/sandbox_stub.py for local testing
+SANDBOX_TIMEOUT = env.float('SANDBOX_TIMEOUT', default=20)
+SANDBOX_MAX_RETRIES = env.int('SANDBOX_MAX_RETRIES', default=2)
+SANDBOX_POOL_SIZE = env.int('SANDBOX_POOL_SIZE', default=10)
+SANDBOX_BREAKER_THRESHOLD = env.int('SANDBOX_BREAKER_THRESHOLD', default=5)
+SANDBOX_BREAKER_COOLDOWN = env.int('SANDBOX_BREAKER_COOLDOWN', default=30)
+# Parsed Aadhaar XML identity, keyed by file URL digest (holds PII; keep short)
+AADHAAR_XML_CACHE_TIMEOUT = env.int('AADHAAR_XML_CACHE_TIMEOUT', default=300)
+# DigiLocker status polling (apps/users/kyc_polling.py, poll_kyc_sessions command):
+# first poll after INITIAL_DELAY, then BASE * 2**n seconds apart up to MAX_INTERVAL
+KYC_POLL_INITIAL_DELAY = env.int('KYC_POLL_INITIAL_DELAY', default=10)
+KYC_POLL_BASE_INTERVAL = env.int('KYC_POLL_BASE_INTERVAL', default=3)
+KYC_POLL_MAX_INTERVAL = env.int('KYC_POLL_MAX_INTERVAL', default=60)
+KYC_POLL_MAX_ATTEMPTS = env.int('KYC_POLL_MAX_ATTEMPTS', default=30)
+KYC_POLL_CONCURRENCY = env.int('KYC_POLL_CONCURRENCY', default=4)
 
 # =============================================================================
 # GOOGLE MAPS CONFIGURATION
@@ -321,3 +380,11 @@ GOOGLE_MAPS_API_KEY = env('GOOGLE_MAPS_API_KEY', default='')
 # File upload settings
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10485760  # 10MB per file
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10485760  # 10MB per file
+
+# Resumable chunked uploads (apps/uploads). Partial files default to
+# MEDIA_ROOT/.uploads and must stay on the same filesystem as MEDIA_ROOT
+UPLOAD_PARTIAL_DIR = env('UPLOAD_PARTIAL_DIR', default='')
+UPLOAD_CHUNK_MAX_SIZE = env.int('UPLOAD_CHUNK_MAX_SIZE', default=8 * 1024 * 1024)
+UPLOAD_MAX_SIZE = env.int('UPLOAD_MAX_SIZE', default=25 * 1024 * 1024)  # Property images and documents
+UPLOAD_SESSION_TTL = env.int('UPLOAD_SESSION_TTL', default=24 * 3600)
+UPLOAD_MAX_ACTIVE_SESSIONS = env.int('UPLOAD_MAX_ACTIVE_SESSIONS', default=20)
@@ -22,6 +22,7 @@ urlpatterns = [
     path('api/', include('apps.properties.urls')),
     path('api/', include('apps.mandates.urls')),
     path('api/', include('apps.notifications.urls')),
+    path('api/', include('apps.uploads.urls')),
 
     # path('api/admin-panel/', include(admin_router.urls)),
 ]
@@ -0,0 +1,81 @@
+"""
+Peak memory of Aadhaar XML parsing: buffered ET.fromstring vs the streaming
+parser in apps/users/services.py.
+
+    python scripts/bench_aadhaar_xml.py [--sizes 1 5 20]
+
+Each sample carries a base64 "photo" of the given size in MB. The document is
+read from a temp file in 64 KB chunks, as requests' iter_content would
+deliver it. "photo-first" puts Pht before Poi/Poa (worst case for early stop).
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'saudapakka.settings')
+
+from apps.users.services import AADHAAR_XML_CHUNK_SIZE, iter_aadhaar_identity  # noqa: E402
+
+IDENTITY = b'<Poi name="Test User" dob="01-01-1990" gender="M"/><Poa house="12" dist="Pune" state="Maharashtra" pc="411001"/>'
+
+
+def write_sample(path, photo_mb, photo_first):
+    photo = b'<Pht>' + b'QUFB' * (photo_mb * 1024 * 1024 // 4) + b'</Pht>'
+    body = photo + IDENTITY if photo_first else IDENTITY + b'<LData/>' + photo
+    with open(path, 'wb') as f:
+        f.write(b'<?xml version="1.0" encoding="UTF-8"?><Certificate><CertificateData><KycRes><UidData>')
+        f.write(body)
+        f.write(b'</UidData></KycRes></CertificateData></Certificate>')
+
+
+def chunks(path):
+    with open(path, 'rb') as f:
+        while chunk := f.read(AADHAAR_XML_CHUNK_SIZE):
+            yield chunk
+
+
+def buffered(path):
+    # The previous implementation: response.text / content, then fromstring
+    root = ET.fromstring(b''.join(chunks(path)))
+    return root.find('.//Poi'), root.find('.//Poa')
+
+
+def streaming(path):
+    return iter_aadhaar_identity(chunks(path))
+
+
+def measure(func, path):
+    tracemalloc.start()
+    started = time.perf_counter()
+    poi, poa = func(path)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert poi is not None and poa is not None
+    return peak / 1024 / 1024, elapsed * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 5, 20], help='Photo sizes in MB')
+    options = parser.parse_args()
+
+    print(f'{"sample":>22}  {"buffered peak":>14}  {"streaming peak":>14}  {"buffered":>9}  {"streaming":>9}')
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in options.sizes:
+            for photo_first in (False, True):
+                path = os.path.join(tmp, f'{size}.xml')
+                write_sample(path, size, photo_first)
+                label = f'{size} MB{" photo-first" if photo_first else ""}'
+                old_peak, old_ms = measure(buffered, path)
+                new_peak, new_ms = measure(streaming, path)
+                print(f'{label:>22}  {old_peak:11.1f} MB  {new_peak:11.1f} MB  {old_ms:6.1f} ms  {new_ms:6.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
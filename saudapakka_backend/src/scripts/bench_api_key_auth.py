@@ -0,0 +1,67 @@
+"""
+Cost of X-API-KEY authentication: the full PBKDF2 check vs a cached
+verification (apps/users/authentication.py).
+
+    python scripts/bench_api_key_auth.py [--rounds 20]
+
+Runs against the configured database and cache. A throwaway user and key are
+created inside a transaction that is rolled back at the end. "uncached" drops
+the cache entry before every call; "cached" reuses the verification, but
+still reads the key and its user from the DB.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import django
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'saudapakka.settings')
+django.setup()
+
+from django.core.cache import cache  # noqa: E402
+from django.db import connection, transaction  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+
+from apps.users.authentication import APIKeyAuthentication, api_key_cache_key  # noqa: E402
+from apps.users.models import ExternalAPIKey, User  # noqa: E402
+
+
+def measure(raw_key, rounds, cold):
+    request = RequestFactory().get('/', HTTP_X_API_KEY=raw_key)
+    auth = APIKeyAuthentication()
+    cache_key = api_key_cache_key(raw_key.split('.')[0][4:])
+    timings, queries = [], 0
+    auth.authenticate(request)
+    for _ in range(rounds):
+        if cold:
+            cache.delete(cache_key)
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            auth.authenticate(request)
+            timings.append((time.perf_counter() - started) * 1000)
+        queries = len(context.captured_queries)
+    return statistics.median(timings), queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=20, help='Calls per mode')
+    options = parser.parse_args()
+
+    with transaction.atomic():
+        user = User.objects.create(email='bench-api-key@example.com', username='bench-api-key', phone_number='9999999999')
+        raw_key = ExternalAPIKey.objects.create(user=user, name='bench')._raw_key
+        print(f'{"mode":>9}  {"median":>10}  {"queries":>7}')
+        for label, cold in (('uncached', True), ('cached', False)):
+            median, queries = measure(raw_key, options.rounds, cold)
+            print(f'{label:>9}  {median:7.2f} ms  {queries:>7}')
+        cache.delete(api_key_cache_key(raw_key.split('.')[0][4:]))
+        transaction.set_rollback(True)
+
+
+if __name__ == '__main__':
+    main()
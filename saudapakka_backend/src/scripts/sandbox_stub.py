@@ -0,0 +1,103 @@
+"""
+Local stand-in for the Sandbox KYC API, for development and tests.
+
+    python scripts/sandbox_stub.py --port 8099 [--latency-ms 50] [--fail-rate 0.2] [--pending-polls 2]
+    SANDBOX_BASE_URL=http://127.0.0.1:8099 python manage.py runserver
+
+Implements /authenticate, /kyc/digilocker/sessions/init and
+/kyc/digilocker/sessions/<id>/documents/aadhaar (pending for --pending-polls
+calls, then a file URL serving a sample Aadhaar XML). --fail-rate makes that
+share of requests answer 503, for exercising retries and the circuit breaker.
+"""
+import argparse
+import json
+import random
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TOKEN = 'stub-access-token'
+SAMPLE_XML = b"""<?xml version="1.0" encoding="UTF-8"?>
+<Certificate><CertificateData><KycRes><UidData>
+<Poi name="Test User" dob="01-01-1990" gender="M"/>
+<Poa house="12" dist="Pune" state="Maharashtra" pc="411001"/>
+<Pht>AAAA</Pht>
+</UidData></KycRes></CertificateData></Certificate>
+"""
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so pooled clients reuse connections as they would upstream
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    polls = {}
+    options = None
+
+    def _send(self, status, body, content_type='application/json'):
+        payload = json.dumps(body).encode() if content_type == 'application/json' else body
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _prelude(self):
+        time.sleep(self.options.latency_ms / 1000)
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        if random.random() < self.options.fail_rate:
+            self._send(503, {'message': 'injected failure'})
+            return False
+        return True
+
+    def do_POST(self):
+        if not self._prelude():
+            return
+        if self.path == '/authenticate':
+            return self._send(200, {'data': {'access_token': TOKEN}})
+        if self.headers.get('Authorization') != TOKEN:
+            return self._send(401, {'message': 'Unauthorized'})
+        if self.path == '/kyc/digilocker/sessions/init':
+            session_id = str(uuid.uuid4())
+            return self._send(200, {'data': {
+                'session_id': session_id, 'authorization_url': f'http://{self.headers["Host"]}/digilocker/{session_id}',
+            }})
+        self._send(404, {'message': 'Not found'})
+
+    def do_GET(self):
+        if not self._prelude():
+            return
+        parts = self.path.strip('/').split('/')
+        if parts[0] == 'files':
+            return self._send(200, SAMPLE_XML, 'application/xml')
+        if self.headers.get('Authorization') != TOKEN:
+            return self._send(401, {'message': 'Unauthorized'})
+        if parts[:3] == ['kyc', 'digilocker', 'sessions'] and parts[4:] == ['documents', 'aadhaar']:
+            session_id = parts[3]
+            self.polls[session_id] = self.polls.get(session_id, 0) + 1
+            if self.polls[session_id] <= self.options.pending_polls:
+                return self._send(200, {'data': {}})
+            return self._send(200, {'data': {'files': [{'url': f'http://{self.headers["Host"]}/files/{session_id}.xml'}]}})
+        self._send(404, {'message': 'Not found'})
+
+    def log_message(self, format, *args):
+        if not self.options.quiet:
+            super().log_message(format, *args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--fail-rate', type=float, default=0)
+    parser.add_argument('--pending-polls', type=int, default=1)
+    parser.add_argument('--quiet', action='store_true')
+    StubHandler.options = parser.parse_args()
+    server = ThreadingHTTPServer(('127.0.0.1', StubHandler.options.port), StubHandler)
+    print(f'Sandbox stub listening on http://127.0.0.1:{StubHandler.options.port}')
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()